@@ -4,6 +4,17 @@ from .common.logging import Console, File
 from . import constants
 from . import accounts
 from . import session
+from . import presence
+from . import context
+from . import pagecache
+from . import ranksync
+from . import profile
+from . import forumstats
+from . import topicviews
+from . import imaging
+from . import avatars
+from . import conditional
+from . import replays
 from . import bbcode
 from . import common
 from . import routes
@@ -24,6 +35,7 @@ logging.basicConfig(
     handlers=[Console, File]
 )
 git.initialize_repository()
+wiki.sync.start()
 
 # Useless debug logging, very annoying
 font_manager = logging.getLogger('matplotlib.font_manager')
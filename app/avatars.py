@@ -0,0 +1,185 @@
+
+from app.common.database import users
+from app.imaging import ImageFormat
+from dataclasses import dataclass
+from typing import Dict
+from PIL import Image
+
+import hashlib
+import config
+import time
+import app
+import io
+
+# Sizes that are pre-rendered & served from the cache,
+# other sizes are answered with the largest one
+SIZES = (25, 128, 256)
+
+# Field of the variant hash, that contains the png/jpeg
+# fallback for browsers without support for modern formats
+FALLBACK = 'fallback'
+FALLBACK_MIMETYPE = 'fallback_mimetype'
+
+# Field of avatars that are served as they were uploaded,
+# because another worker is still rendering their variants
+ORIGINAL = 'original'
+
+# Amount of seconds to wait for another worker, that is already resizing an avatar
+LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+@dataclass
+class Avatar:
+    image: bytes
+    avatar_hash: str
+    size: int
+    field: str
+    mimetype: str
+
+    @property
+    def etag(self) -> str:
+        return variant_etag(self.avatar_hash, self.size, self.field)
+
+def variant_etag(avatar_hash: str, size: int, field: str) -> str:
+    # Known before any image is loaded, which allows answering conditional requests early
+    return f'{avatar_hash}-{size}-{field}'
+
+def variant_key(avatar_hash: str, size: int) -> str:
+    # Variants are addressed by the hash of the original image,
+    # which means they never have to be invalidated
+    return f'stern:avatars:variants:{avatar_hash}:{size}'
+
+def current_key(user_id: int) -> str:
+    # Avatars may be changed by other services, which is why
+    # this only caches the checksum of the user for a short time
+    return f'stern:avatars:current:{user_id}'
+
+def lock_key(avatar_hash: str) -> str:
+    # All sizes are rendered at once
+    return f'stern:avatars:lock:{avatar_hash}'
+
+def compute_hash(image: bytes) -> str:
+    # Same checksum as the "avatar_hash" of a user
+    return hashlib.md5(image).hexdigest()
+
+def create_variants(image: bytes) -> Dict[int, Dict[str, bytes]]:
+    """Encode every size of an avatar in all supported formats, plus a png/jpeg fallback"""
+    fallbacks = app.imaging.fallback_formats(Image.open(io.BytesIO(image)))
+    image_formats = app.imaging.supported_formats() + fallbacks
+    variants = app.imaging.encode_variants(image, SIZES, image_formats)
+
+    for encoded in variants.values():
+        # Flat images are usually smaller as a png, photos as a jpeg
+        candidates = {
+            image_format: encoded.pop(image_format.name)
+            for image_format in fallbacks
+        }
+        fallback = min(candidates, key=lambda image_format: len(candidates[image_format]))
+        encoded[FALLBACK] = candidates[fallback]
+        encoded[FALLBACK_MIMETYPE] = fallback.mimetype.encode()
+
+    return variants
+
+def store_variants(user_id: int, image: bytes, avatar_hash: str | None = None) -> Dict[int, Dict[str, bytes]]:
+    """Render every size of an avatar & store them under the hash of the original image"""
+    avatar_hash = avatar_hash or compute_hash(image)
+    variants = create_variants(image)
+
+    pipeline = app.session.redis.pipeline()
+    pipeline.set(current_key(user_id), avatar_hash, ex=config.AVATAR_HASH_CACHE_TTL)
+
+    for size, encoded in variants.items():
+        pipeline.delete(variant_key(avatar_hash, size))
+        pipeline.hset(variant_key(avatar_hash, size), mapping=encoded)
+        pipeline.expire(variant_key(avatar_hash, size), config.AVATAR_CACHE_TTL)
+
+    pipeline.execute()
+    return variants
+
+def fetch_current_hash(user_id: int) -> str | None:
+    """Fetch the checksum of the current avatar of a user, which is resolved from the database"""
+    if (avatar_hash := app.session.redis.get(current_key(user_id))) is not None:
+        return avatar_hash.decode() or None
+
+    with app.session.database.managed_session() as session:
+        user = users.fetch_by_id(user_id, session=session)
+        avatar_hash = user.avatar_hash if user else None
+
+    # Users without an avatar are cached as an empty string
+    app.session.redis.set(
+        current_key(user_id),
+        avatar_hash or '',
+        ex=config.AVATAR_HASH_CACHE_TTL
+    )
+    return avatar_hash
+
+def variant_field(image_format: ImageFormat) -> str:
+    if image_format in app.imaging.MODERN_FORMATS:
+        return image_format.name
+
+    return FALLBACK
+
+def fetch_variant(avatar_hash: str, size: int, image_format: ImageFormat) -> Avatar | None:
+    field = variant_field(image_format)
+    image, fallback_mimetype = app.session.redis.hmget(
+        variant_key(avatar_hash, size),
+        [field, FALLBACK_MIMETYPE]
+    )
+
+    if image is None:
+        return None
+
+    return create_avatar(image, avatar_hash, size, field, fallback_mimetype)
+
+def create_avatar(image: bytes, avatar_hash: str, size: int, field: str, fallback_mimetype: bytes) -> Avatar:
+    mimetype = (
+        fallback_mimetype.decode() if field in (FALLBACK, ORIGINAL) else
+        app.imaging.FORMATS[field].mimetype
+    )
+
+    return Avatar(image, avatar_hash, size, field, mimetype)
+
+def fetch(user_id: int, size: int, avatar_hash: str | None, image_format: ImageFormat) -> Avatar | None:
+    """Fetch a pre-rendered avatar in the given format, or render it if it doesn't exist yet"""
+    if avatar_hash and (avatar := fetch_variant(avatar_hash, size, image_format)):
+        return avatar
+
+    return render(user_id, size, image_format)
+
+def render(user_id: int, size: int, image_format: ImageFormat) -> Avatar | None:
+    """Render the variants of an avatar, while making sure that only one worker resizes it at a time"""
+    if not (original := app.session.storage.get_avatar(user_id)):
+        return None
+
+    # The requested checksum may be outdated, or made up
+    # by the client, so only the real one is used from here on
+    avatar_hash = compute_hash(original)
+
+    if (avatar := fetch_variant(avatar_hash, size, image_format)):
+        return avatar
+
+    lock = lock_key(avatar_hash)
+
+    if not app.session.redis.set(lock, 1, nx=True, ex=LOCK_TIMEOUT):
+        # Another worker is rendering this avatar, wait for its result
+        deadline = time.time() + LOCK_TIMEOUT
+
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+
+            if (avatar := fetch_variant(avatar_hash, size, image_format)):
+                return avatar
+
+        # Serve the original instead of rendering the same avatar twice
+        return create_avatar(original, avatar_hash, size, ORIGINAL, b'image/png')
+
+    try:
+        encoded = store_variants(user_id, original, avatar_hash)[size]
+        field = variant_field(image_format)
+
+        return create_avatar(
+            encoded[field], avatar_hash, size,
+            field, encoded[FALLBACK_MIMETYPE]
+        )
+    finally:
+        app.session.redis.delete(lock)
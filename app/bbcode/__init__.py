@@ -3,12 +3,14 @@
 # https://github.com/dcwatson/bbcode/blob/master/bbcode.py
 
 from .formatter import parser as formatter
+from .cache import render_cache, tree_cache
 from .regexes import _bbcode_url_re
-from .objects import TagOptions
+from .objects import TagOptions, Document
 from .parser import Parser
 
 import urllib.parse
 import regex
+import json
 
 def url_hotfix(input_text: str) -> str:
     """Fix the formatting of various URLs"""
@@ -17,14 +19,19 @@ def url_hotfix(input_text: str) -> str:
     except TimeoutError:
         return input_text
 
+    replacements = []
+
     for match in matches:
         url = match.group('url')
-        unquoted_url = urllib.parse.unquote(url)
+        quoted_url = urllib.parse.quote(urllib.parse.unquote(url), safe=':/')
+
+        # Most URLs are already quoted correctly, and
+        # don't need another pass over the whole text
+        if quoted_url != url:
+            replacements.append((url, quoted_url))
 
-        input_text = input_text.replace(
-            url,
-            urllib.parse.quote(unquoted_url, safe=':/')
-        )
+    for url, quoted_url in replacements:
+        input_text = input_text.replace(url, quoted_url)
 
     return input_text
 
@@ -35,3 +42,27 @@ def render_html(input_text, **context):
     """
     input_text = url_hotfix(input_text)
     return formatter.format(input_text, **context)
+
+def parse(input_text: str) -> Document:
+    """Parse the input string into a document tree, reusing the result for identical documents"""
+    data = tree_cache.fetch(
+        input_text,
+        lambda text: json.dumps(formatter.parse(url_hotfix(text)).serialize())
+    )
+    return Document.deserialize(json.loads(data))
+
+def render_html_cached(input_text: str) -> str:
+    """Render the input string as HTML, reusing the result for identical documents"""
+    return render_cache.fetch(
+        input_text,
+        lambda text: formatter.render(parse(text))
+    )
+
+def render_preview(input_text: str, length: int = 512) -> str:
+    """Render the input string as plain text, cut off after the given amount of characters"""
+    text = parse(input_text).text().strip()
+
+    if len(text) <= length:
+        return text
+
+    return text[:length].rstrip() + '...'
@@ -0,0 +1,105 @@
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Dict
+
+import hashlib
+import config
+import app
+
+# Increment this whenever the output of the formatter changes,
+# to invalidate all previously rendered documents
+RENDER_VERSION = 2
+
+class RenderCache:
+    """Content-addressed cache for bbcode documents, with an in-process LRU & a shared redis tier"""
+
+    def __init__(self, namespace: str, max_entries: int, ttl: int) -> None:
+        self.namespace = namespace
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = Lock()
+        self.counters = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0
+        }
+
+    @property
+    def configuration(self) -> str:
+        # Config values that are part of the rendered output
+        return f'{RENDER_VERSION}:{config.OSU_BASEURL}:{config.IMAGE_PROXY_BASEURL}'
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(f'{self.configuration}:{text}'.encode()).hexdigest()
+        return f'stern:{self.namespace}:{digest}'
+
+    def fetch(self, text: str, render: Callable[[str], str]) -> str:
+        key = self.key(text)
+
+        with self.lock:
+            if (html := self.entries.get(key)) is not None:
+                self.entries.move_to_end(key)
+                self.counters['local_hits'] += 1
+                return html
+
+        if (html := self.fetch_redis(key)) is not None:
+            self.store_local(key, html)
+            self.increment('redis_hits')
+            return html
+
+        html = render(text)
+        self.store_local(key, html)
+        self.store_redis(key, html)
+        self.increment('misses')
+        return html
+
+    def fetch_redis(self, key: str) -> str | None:
+        try:
+            html = app.session.redis.get(key)
+        except Exception as e:
+            app.session.logger.warning(f'Failed to read bbcode cache: {e}')
+            return None
+
+        return html.decode() if html is not None else None
+
+    def store_redis(self, key: str, html: str) -> None:
+        try:
+            app.session.redis.set(key, html, ex=self.ttl)
+        except Exception as e:
+            app.session.logger.warning(f'Failed to write bbcode cache: {e}')
+
+    def store_local(self, key: str, html: str) -> None:
+        with self.lock:
+            self.entries[key] = html
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def increment(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def metrics(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                **self.counters,
+                'local_entries': len(self.entries)
+            }
+
+# Rendered html of documents
+render_cache = RenderCache(
+    'bbcode',
+    config.BBCODE_CACHE_SIZE,
+    config.BBCODE_CACHE_TTL
+)
+
+# Serialized parse trees of documents, which are
+# reused for rendering html, plain text & previews
+tree_cache = RenderCache(
+    'bbcode:tree',
+    config.BBCODE_CACHE_SIZE,
+    config.BBCODE_CACHE_TTL
+)
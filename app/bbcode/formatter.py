@@ -8,7 +8,11 @@ import hashlib
 import config
 import hmac
 
-parser = Parser()
+# Parsing & rendering recurse once per nested tag. Tags nested more than
+# 128 levels deep keep their contents as text, to stay below the recursion
+# limit. Before, the limit was the recursion limit itself, which a request
+# would crash on long before reaching it.
+parser = Parser(max_tag_depth=128)
 parser.add_simple_formatter('b', '<b>%(value)s</b>')
 parser.add_simple_formatter('i', '<i>%(value)s</i>')
 parser.add_simple_formatter('u', '<u>%(value)s</u>')
@@ -84,3 +84,143 @@ class TagOptions:
         self.tag_name = tag_name
         for attr, value in list(kwargs.items()):
             setattr(self, attr, bool(value))
+
+class TextNode:
+    """Plain text between tags"""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+class NewlineNode:
+    """A single newline, which may be transformed into markup"""
+    __slots__ = ()
+    text = "\n"
+
+class MarkupNode:
+    """A tag token that is not rendered on its own, e.g. an unmatched closing tag"""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+class TagNode:
+    """
+    A recognized tag and everything between its opening and closing token.
+    Standalone tags have no children. Raw tags (i.e. tags that don't render embedded tags)
+    only contain text, newline & markup nodes, which are concatenated when rendering.
+    """
+    __slots__ = ("tag_name", "options", "text", "children", "raw", "closer", "trailing")
+
+    def __init__(self, tag_name, options, text, children=None, raw=False, closer=None, trailing=None):
+        self.tag_name = tag_name
+        self.options = options
+        self.text = text
+        self.children = children
+        self.raw = raw
+        # The consumed closing token, if there was one
+        self.closer = closer
+        # The newline that was swallowed after the closing token, if there was one
+        self.trailing = trailing
+
+NEWLINE = NewlineNode()
+
+class Document:
+    """The parse tree of a bbcode document, which can be rendered multiple times"""
+    __slots__ = ("nodes",)
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def text(self, strip_newlines=False):
+        """Returns the text of the document, without any tags"""
+        text = []
+        stack = [iter(self.nodes)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+            elif isinstance(node, TextNode):
+                text.append(node.text)
+            elif isinstance(node, NewlineNode):
+                if not strip_newlines:
+                    text.append(node.text)
+            elif isinstance(node, TagNode):
+                # The closing & trailing tokens come after all children
+                stack.append(iter([tail for tail in (node.closer, node.trailing) if tail is not None]))
+                if node.children:
+                    stack.append(iter(node.children))
+        return "".join(text)
+
+    def serialize(self):
+        """
+        Converts the document into a flat list of nodes in document order, e.g. for storing it as json.
+        Tags store the amount of their children instead of nesting them, so that deeply nested documents
+        don't exceed the recursion limit of the json module.
+        """
+        data = []
+        stack = [iter(self.nodes)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            data.append(serialize_node(node))
+            if isinstance(node, TagNode) and node.children:
+                stack.append(iter(node.children))
+        return data
+
+    @classmethod
+    def deserialize(cls, data):
+        nodes = []
+        # Lists that are still missing children, with the amount of children left.
+        # The document itself receives every entry that doesn't belong to a tag.
+        stack = [(nodes, len(data))]
+        for entry in data:
+            children, remaining = stack.pop()
+            node = deserialize_node(entry)
+            children.append(node)
+            if remaining > 1:
+                stack.append((children, remaining - 1))
+            if isinstance(node, TagNode) and node.children is not None and entry[4]:
+                stack.append((node.children, entry[4]))
+        return cls(nodes)
+
+def serialize_node(node):
+    """Serializes a single node, without its children"""
+    if isinstance(node, TextNode):
+        return ["t", node.text]
+    if isinstance(node, NewlineNode):
+        return ["n"]
+    if isinstance(node, MarkupNode):
+        return ["m", node.text]
+    return [
+        "g",
+        node.tag_name,
+        list(node.options.items()) if node.options else None,
+        node.text,
+        len(node.children) if node.children is not None else None,
+        node.raw,
+        serialize_node(node.closer) if node.closer is not None else None,
+        node.trailing is not None,
+    ]
+
+def deserialize_node(data):
+    """Deserializes a single node, the children of tags are appended by `Document.deserialize`"""
+    kind = data[0]
+    if kind == "t":
+        return TextNode(data[1])
+    if kind == "n":
+        return NEWLINE
+    if kind == "m":
+        return MarkupNode(data[1])
+    _, tag_name, options, text, children, raw, closer, trailing = data
+    return TagNode(
+        tag_name,
+        CaseInsensitiveDict(options) if options else {},
+        text,
+        [] if children is not None else None,
+        raw,
+        deserialize_node(closer) if closer is not None else None,
+        NEWLINE if trailing else None,
+    )
@@ -1,5 +1,13 @@
 
-from .objects import TagOptions, CaseInsensitiveDict
+from .objects import (
+    CaseInsensitiveDict,
+    TagOptions,
+    MarkupNode,
+    TextNode,
+    TagNode,
+    Document,
+    NEWLINE
+)
 from .regexes import _domain_re, _url_re
 
 import regex
@@ -58,6 +66,12 @@ class Parser:
         self.url_template = url_template
         self.default_context = default_context or {}
 
+        # Characters that are significant while scanning for the end of a tag.
+        # Quotes only matter after an equal sign, i.e. inside of option values.
+        delimiters = "(?P<opener>%s)|(?P<closer>%s)" % (regex.escape(tag_opener), regex.escape(tag_closer))
+        self._extent_re = regex.compile(delimiters + "|=")
+        self._quotable_extent_re = regex.compile(delimiters + "|[\"']")
+
     def add_formatter(self, tag_name, render_func, **kwargs):
         """
         Installs a render function for the specified tag name. The render function
@@ -131,6 +145,9 @@ class Parser:
         return a list of NEWLINE and DATA tokens such that if you concatenate
         their data, you will have the original string.
         """
+        if "\n" not in data:
+            # Short-circuit for the common case of a single line.
+            return [(self.TOKEN_DATA, None, None, data)]
         parts = data.split("\n")
         tokens = []
         for num, part in enumerate(parts):
@@ -239,27 +256,33 @@ class Parser:
     def _tag_extent(self, data, start):
         """
         Finds the extent of a tag, accounting for option quoting and new tags starting before the current one closes.
-        Returns (found_close, end_pos) where valid is False if another tag started before this one closed.
+        Returns (end_pos, found_close) where found_close is False if another tag started before this one closed.
+
+        Instead of stepping through every character, this jumps between the characters that can change
+        the scanner state, so that every character of the input is only looked at once by the regex engine.
         """
-        in_quote = False
         quotable = False
-        lto = len(self.tag_opener)
-        ltc = len(self.tag_closer)
-        for i in range(start + 1, len(data)):
-            ch = data[i]
+        pos = start + 1
+        while True:
+            pattern = self._quotable_extent_re if quotable else self._extent_re
+            match = pattern.search(data, pos)
+            if not match:
+                return len(data), False
+            if match.lastgroup == "opener":
+                return match.start(), False
+            if match.lastgroup == "closer":
+                return match.end(), True
+            ch = match.group()
             if ch == "=":
                 quotable = True
-            if ch in ('"', "'"):
-                if quotable and not in_quote:
-                    in_quote = ch
-                elif in_quote == ch:
-                    in_quote = False
-                    quotable = False
-            if not in_quote and data[i : i + lto] == self.tag_opener:
-                return i, False
-            if not in_quote and data[i : i + ltc] == self.tag_closer:
-                return i + ltc, True
-        return len(data), False
+                pos = match.end()
+                continue
+            # Skip to the matching quote, everything in between is part of the option value.
+            quote_end = data.find(ch, match.end())
+            if quote_end < 0:
+                return len(data), False
+            quotable = False
+            pos = quote_end + 1
 
     def tokenize(self, data):
         """
@@ -386,123 +409,216 @@ class Parser:
         Transforms the input string based on the options specified, taking into account
         whether the option is enabled globally for this parser.
         """
-        url_matches = {}
+        fragments = []
+        pos = 0
         if self.replace_links and replace_links:
-            # If we're replacing links in the text (i.e. not those in [url] tags) then we need to be
-            # careful to pull them out before doing any escaping or cosmetic replacement.
-            pos = 0
-            while True:
-                try:
-                    match = _url_re.search(data, pos, timeout=0.2)
-                except TimeoutError:
-                    match = None
-                if not match:
-                    break
-                # Replace any link with a token that we can substitute back in after replacements.
-                token = "{{ bbcode-link-%s }}" % len(url_matches)
-                url_matches[token] = self._link_replace(match, **context)
+            # Links are pulled out of the text before doing any escaping or cosmetic replacement,
+            # so only the text in between them is transformed, and the result is joined once at the end.
+            for match in self._link_matches(data):
                 start, end = match.span()
-                data = data[:start] + token + data[end:]
-                # To be perfectly accurate, this should probably be len(data[:start] + token), but
-                # start will work, because the token itself won't match as a URL.
-                pos = start
+                fragments.append(self._replace_text(data[pos:start], escape_html, replace_cosmetic))
+                fragments.append(self._link_replace(match, **context))
+                pos = end
+        fragments.append(self._replace_text(data[pos:], escape_html, replace_cosmetic))
+        data = "".join(fragments)
+        if transform_newlines:
+            data = data.replace("\n", "\r")
+        return data
+
+    def _replace_text(self, data, escape_html, replace_cosmetic):
+        """
+        Applies escaping and cosmetic replacements to a piece of text that contains no links.
+        """
         if escape_html:
             data = self._replace(data, self.REPLACE_ESCAPE)
         if replace_cosmetic:
             data = self._replace(data, self.REPLACE_COSMETIC)
-        # Now put the replaced links back in the text.
-        for token, replacement in url_matches.items():
-            data = data.replace(token, replacement)
-        if transform_newlines:
-            data = data.replace("\n", "\r")
         return data
 
-    def _format_tokens(
+    def _link_matches(self, data):
+        """
+        Yields all links inside the given string, stopping early if the regex takes too long.
+        """
+        pos = 0
+        while True:
+            try:
+                match = _url_re.search(data, pos, timeout=0.2)
+            except TimeoutError:
+                return
+            if not match:
+                return
+            yield match
+            pos = match.end()
+
+    def _match_closers(self, tokens):
+        """
+        Resolves the closing token of every opening tag in a single pass over the token list,
+        producing the same result as calling `_find_closing_token` on the whole list for each tag.
+        Returns a dictionary of {start_pos: (end_pos, consume)}. Tags that never close are missing,
+        and tags closed by newlines are left to `_find_closing_token`.
+        """
+        closers = {}
+        pending = {}
+        for pos, (token_type, tag_name, tag_opts, token_text) in enumerate(tokens):
+            if token_type not in (self.TOKEN_TAG_START, self.TOKEN_TAG_END):
+                continue
+            tag = self.recognized_tags[tag_name][1]
+            if tag.standalone or tag.newline_closes:
+                continue
+            waiting = pending.setdefault(tag_name, [])
+            if tag.same_tag_closes:
+                # Any start or end of the same tag closes all waiting tags.
+                for start in waiting:
+                    closers[start] = (pos, token_type == self.TOKEN_TAG_END)
+                waiting.clear()
+                if token_type == self.TOKEN_TAG_START:
+                    waiting.append(pos)
+            elif tag.render_embedded:
+                # Embedded tags of the same name need their own closing tag first.
+                if token_type == self.TOKEN_TAG_START:
+                    waiting.append(pos)
+                elif waiting:
+                    closers[waiting.pop()] = (pos, True)
+            else:
+                if token_type == self.TOKEN_TAG_START:
+                    waiting.append(pos)
+                else:
+                    for start in waiting:
+                        closers[start] = (pos, True)
+                    waiting.clear()
+        return closers
+
+    def _flat_node(self, token):
+        token_type, tag_name, tag_opts, token_text = token
+        if token_type == self.TOKEN_DATA:
+            return TextNode(token_text)
+        if token_type == self.TOKEN_NEWLINE:
+            return NEWLINE
+        return MarkupNode(token_text)
+
+    def _build_nodes(self, tokens, pos, end, depth, closers):
+        """
+        Builds the nodes for tokens[pos:end], without copying the token list.
+        """
+        nodes = []
+        while pos < end:
+            token_type, tag_name, tag_opts, token_text = tokens[pos]
+            if token_type != self.TOKEN_TAG_START:
+                nodes.append(self._flat_node(tokens[pos]))
+                pos += 1
+                continue
+            tag = self.recognized_tags[tag_name][1]
+            if tag.standalone:
+                nodes.append(TagNode(tag_name, tag_opts, token_text))
+                pos += 1
+                continue
+            if tag.newline_closes:
+                close, consume = self._find_closing_token(tag, tokens, pos + 1)
+            else:
+                close, consume = closers.get(pos, (len(tokens), True))
+            if close >= end:
+                # The tag is implicitly closed by the end of its parent.
+                close, consume = end, True
+            node = TagNode(tag_name, tag_opts, token_text)
+            if tag.render_embedded and depth < self.max_tag_depth:
+                node.children = self._build_nodes(tokens, pos + 1, close, depth + 1, closers)
+            else:
+                # Otherwise, the contents are rendered as text.
+                node.raw = True
+                node.children = [self._flat_node(token) for token in tokens[pos + 1 : close]]
+            nodes.append(node)
+            if not consume:
+                # Continue at the token that closed this tag.
+                pos = close
+                continue
+            if close < end:
+                node.closer = self._flat_node(tokens[close])
+            pos = close + 1
+            # If the tag should swallow the first trailing newline, check the token after the closing token.
+            if tag.swallow_trailing_newline and pos < end and tokens[pos][0] == self.TOKEN_NEWLINE:
+                node.trailing = NEWLINE
+                pos += 1
+        return nodes
+
+    def parse(self, data):
+        """
+        Parses the input text into a document tree, which can be rendered with `render`.
+        """
+        tokens = self.tokenize(data)
+        closers = self._match_closers(tokens)
+        return Document(self._build_nodes(tokens, 0, len(tokens), 1, closers))
+
+    def _render_nodes(
         self,
-        tokens,
+        nodes,
         parent,
         escape_html=None,
         replace_links=None,
         replace_cosmetic=None,
         transform_newlines=True,
-        depth=1,
         **context
     ):
-        # Allow the parser defaults to be overridden when formatting.
-        escape_html = self.escape_html if escape_html is None else escape_html
-        replace_links = self.replace_links if replace_links is None else replace_links
-        replace_cosmetic = self.replace_cosmetic if replace_cosmetic is None else replace_cosmetic
-        idx = 0
+        if parent is None:
+            # Allow the parser defaults to be overridden when formatting.
+            escape = self.escape_html if escape_html is None else escape_html
+            links = self.replace_links if replace_links is None else replace_links
+            cosmetic = self.replace_cosmetic if replace_cosmetic is None else replace_cosmetic
+            newlines = transform_newlines
+        else:
+            escape = parent.escape_html
+            links = parent.replace_links
+            cosmetic = parent.replace_cosmetic
+            newlines = parent.transform_newlines
         formatted = []
-        lt = len(tokens)
-        while idx < lt:
-            token_type, tag_name, tag_opts, token_text = tokens[idx]
-            if token_type == self.TOKEN_TAG_START:
-                render_func, tag = self.recognized_tags[tag_name]
-                if tag.standalone:
-                    formatted.append(render_func(tag_name, None, tag_opts, parent, context))
+        for node in nodes:
+            if isinstance(node, TextNode):
+                formatted.append(self._transform(node.text, escape, links, cosmetic, newlines, **context))
+            elif isinstance(node, TagNode):
+                render_func, tag = self.recognized_tags[node.tag_name]
+                if node.children is None:
+                    formatted.append(render_func(node.tag_name, None, node.options, parent, context))
+                    continue
+                if node.raw:
+                    inner = self._transform(
+                        "".join([child.text for child in node.children]),
+                        tag.escape_html,
+                        tag.replace_links,
+                        tag.replace_cosmetic,
+                        tag.transform_newlines,
+                        **context
+                    )
                 else:
-                    # First, find the extent of this tag's tokens.
-                    end, consume = self._find_closing_token(tag, tokens, idx + 1)
-                    subtokens = tokens[idx + 1 : end]
-                    # If the end tag should not be consumed, back up one (after grabbing the subtokens).
-                    if not consume:
-                        end = end - 1
-                    if tag.render_embedded and depth < self.max_tag_depth:
-                        # This tag renders embedded tags, simply recurse.
-                        inner = self._format_tokens(subtokens, tag, depth=depth + 1, **context)
-                    else:
-                        # Otherwise, just concatenate all the token text.
-                        inner = self._transform(
-                            "".join([t[3] for t in subtokens]),
-                            tag.escape_html,
-                            tag.replace_links,
-                            tag.replace_cosmetic,
-                            tag.transform_newlines,
-                            **context
-                        )
-                    if tag.strip:
-                        inner = inner.strip()
-                    # Append the rendered contents.
-                    formatted.append(render_func(tag_name, inner, tag_opts, parent, context))
-                    # If the tag should swallow the first trailing newline, check the token after the closing token.
-                    if tag.swallow_trailing_newline:
-                        next_pos = end + 1
-                        if next_pos < len(tokens) and tokens[next_pos][0] == self.TOKEN_NEWLINE:
-                            end = next_pos
-                    # Skip to the end tag.
-                    idx = end
-            elif token_type == self.TOKEN_NEWLINE:
+                    inner = self._render_nodes(node.children, tag, **context)
+                if tag.strip:
+                    inner = inner.strip()
+                formatted.append(render_func(node.tag_name, inner, node.options, parent, context))
+            elif isinstance(node, MarkupNode):
+                # Unmatched closing tags are dropped.
+                continue
+            else:
                 # If this is a top-level newline, replace it. Otherwise, it will be replaced (if necessary)
                 # by the code above.
-                formatted.append("\r" if parent is None or parent.transform_newlines else token_text)
-            elif token_type == self.TOKEN_DATA:
-                escape = escape_html if parent is None else parent.escape_html
-                links = replace_links if parent is None else parent.replace_links
-                cosmetic = replace_cosmetic if parent is None else parent.replace_cosmetic
-                newlines = transform_newlines if parent is None else parent.transform_newlines
-                formatted.append(self._transform(token_text, escape, links, cosmetic, newlines, **context))
-            idx += 1
+                formatted.append("\r" if parent is None or parent.transform_newlines else node.text)
         return "".join(formatted)
 
-    def format(self, data, **context):
+    def render(self, document, **context):
         """
-        Formats the input text using any installed renderers. Any context keyword arguments
+        Renders a parsed document using any installed renderers. Any context keyword arguments
         given here will be passed along to the render functions as a context dictionary.
         """
-        tokens = self.tokenize(data)
         full_context = self.default_context.copy()
         full_context.update(context)
-        return self._format_tokens(tokens, None, **full_context).replace("\r", self.newline)
+        return self._render_nodes(document.nodes, None, **full_context).replace("\r", self.newline)
+
+    def format(self, data, **context):
+        """
+        Formats the input text using any installed renderers. Any context keyword arguments
+        given here will be passed along to the render functions as a context dictionary.
+        """
+        return self.render(self.parse(data), **context)
 
     def strip(self, data, strip_newlines=False):
         """
         Strips out any tags from the input text, using the same tokenization as the formatter.
         """
-        text = []
-        for token_type, tag_name, tag_opts, token_text in self.tokenize(data):
-            if token_type == self.TOKEN_DATA:
-                text.append(token_text)
-            elif token_type == self.TOKEN_NEWLINE and not strip_newlines:
-                text.append(token_text)
-        return "".join(text)
+        return self.parse(data).text(strip_newlines)
@@ -0,0 +1,58 @@
+
+from flask import Response, request
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+def is_fresh(etag: str | None = None, last_modified: datetime | None = None) -> bool:
+    """Check if the client's cached copy is still valid, based on the request's conditional headers"""
+    if request.if_none_match:
+        # "If-None-Match" takes precedence over "If-Modified-Since"
+        return etag is not None and request.if_none_match.contains_weak(etag)
+
+    if request.if_modified_since and last_modified:
+        return to_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+
+    return False
+
+def not_modified(
+    etag: str | None = None,
+    last_modified: datetime | None = None,
+    headers: Dict[str, str] | None = None
+) -> Response:
+    """Create an empty "304 Not Modified" response, including the validators & caching headers"""
+    response = Response(status=304, headers=headers)
+    return apply_validators(response, etag, last_modified)
+
+def apply_validators(
+    response: Response,
+    etag: str | None = None,
+    last_modified: datetime | None = None
+) -> Response:
+    if etag is not None:
+        response.set_etag(etag)
+
+    if last_modified is not None:
+        response.last_modified = to_utc(last_modified)
+
+    return response
+
+def respond(
+    create_response: Callable[[], Response],
+    etag: str | None = None,
+    last_modified: datetime | None = None,
+    headers: Dict[str, str] | None = None
+) -> Response:
+    """Answer with a 304 if the client is up-to-date, otherwise create the full response"""
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified, headers)
+
+    response = create_response()
+    response.headers.update(headers or {})
+    return apply_validators(response, etag, last_modified)
+
+def to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        # Naive datetimes are in local time
+        value = value.astimezone()
+
+    return value.astimezone(timezone.utc)
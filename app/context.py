@@ -0,0 +1,84 @@
+
+from app.common.database import notifications
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import Dict
+
+import config
+import utils
+import time
+import app
+
+# Per-worker copy of the website stats stored in redis
+website_stats_cache: Dict[str, int] | None = None
+website_stats_expiry: float = 0
+
+counters = {
+    'website_stats_hits': 0,
+    'website_stats_misses': 0,
+    'notification_count_hits': 0,
+    'notification_count_misses': 0
+}
+
+lock = Lock()
+
+def fetch_website_stats() -> Dict[str, int]:
+    """Fetch website statistics, using the in-memory cache if possible"""
+    global website_stats_cache, website_stats_expiry
+
+    if website_stats_cache is not None and time.time() < website_stats_expiry:
+        with lock:
+            counters['website_stats_hits'] += 1
+        return website_stats_cache
+
+    stats = utils.fetch_website_stats()
+
+    with lock:
+        counters['website_stats_misses'] += 1
+        website_stats_cache = stats
+        website_stats_expiry = time.time() + config.WEBSITE_STATS_CACHE_TTL
+
+    return stats
+
+def fetch_notification_count(user_id: int, session: Session | None = None) -> int:
+    """Fetch the amount of unread notifications, using the redis cache if possible"""
+    cache_key = f'stern:notifications:count:{user_id}'
+
+    try:
+        if (count := app.session.redis.get(cache_key)) is not None:
+            with lock:
+                counters['notification_count_hits'] += 1
+            return int(count)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read notification count cache: {e}')
+
+    count = notifications.fetch_count(
+        user_id,
+        read=False,
+        session=session
+    )
+
+    with lock:
+        counters['notification_count_misses'] += 1
+
+    try:
+        app.session.redis.set(
+            cache_key, count,
+            ex=config.NOTIFICATION_COUNT_CACHE_TTL
+        )
+    except Exception as e:
+        app.session.logger.warning(f'Failed to update notification count cache: {e}')
+
+    return count
+
+def invalidate_notification_count(user_id: int) -> None:
+    """Remove the cached notification count, e.g. after a notification was created"""
+    try:
+        app.session.redis.delete(f'stern:notifications:count:{user_id}')
+    except Exception as e:
+        app.session.logger.warning(f'Failed to invalidate notification count cache: {e}')
+
+def metrics() -> Dict[str, int]:
+    """Return a snapshot of the cache hit/miss counters"""
+    with lock:
+        return dict(counters)
@@ -0,0 +1,168 @@
+
+from app.common.database import DBForumPost, DBForumTopic
+from sqlalchemy.orm import Session, selectinload
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+from sqlalchemy import func
+
+import config
+import app
+
+# All forum statistics are stored in a single hash,
+# with fields of the form "<forum_id>:<stat>"
+#
+# Creating & moving topics and posts updates the hash right away.
+# Posts & topics are only deleted or hidden by other services, e.g. the
+# admin panel, so the hash expires after FORUM_STATS_TTL to pick those up.
+# The only posts that this app deletes are drafts, which are hidden.
+STATS_KEY = 'stern:forums:stats'
+
+@dataclass
+class ForumStats:
+    topic_count: int = 0
+    post_count: int = 0
+    last_post_id: int | None = None
+
+def fetch(forum_ids: Iterable[int], session: Session) -> Dict[int, ForumStats]:
+    """Fetch the statistics of multiple forums in a single redis round-trip"""
+    forum_ids = list(forum_ids)
+    fields = ['built'] + [
+        f'{forum_id}:{stat}'
+        for forum_id in forum_ids
+        for stat in ('topics', 'posts', 'last_post')
+    ]
+
+    try:
+        values = app.session.redis.hmget(STATS_KEY, fields)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read forum stats: {e}')
+        values = [None]
+
+    if values[0] is None:
+        # The hash was invalidated, has expired or redis is unavailable
+        all_stats = rebuild(session)
+        return {
+            forum_id: all_stats.get(forum_id, ForumStats())
+            for forum_id in forum_ids
+        }
+
+    values = iter(values[1:])
+
+    return {
+        forum_id: ForumStats(
+            topic_count=int(next(values) or 0),
+            post_count=int(next(values) or 0),
+            last_post_id=int(last_post) if (last_post := next(values)) else None
+        )
+        for forum_id in forum_ids
+    }
+
+def fetch_last_posts(stats: Dict[int, ForumStats], session: Session) -> Dict[int, DBForumPost | None]:
+    """Fetch the last post of every forum, including the topic & author, in a single query"""
+    post_ids = [
+        forum_stats.last_post_id
+        for forum_stats in stats.values()
+        if forum_stats.last_post_id
+    ]
+
+    results: List[DBForumPost] = []
+
+    if post_ids:
+        results = session.query(DBForumPost) \
+            .options(
+                selectinload(DBForumPost.topic),
+                selectinload(DBForumPost.user)
+            ) \
+            .filter(DBForumPost.id.in_(post_ids)) \
+            .all()
+
+    posts_by_id = {post.id: post for post in results}
+
+    return {
+        forum_id: posts_by_id.get(forum_stats.last_post_id)
+        for forum_id, forum_stats in stats.items()
+    }
+
+def aggregate(session: Session) -> Dict[int, ForumStats]:
+    """Compute the statistics of all forums with grouped queries"""
+    stats: Dict[int, ForumStats] = {}
+
+    topic_counts = session.query(DBForumTopic.forum_id, func.count(DBForumTopic.id)) \
+        .filter(DBForumTopic.hidden == False) \
+        .group_by(DBForumTopic.forum_id) \
+        .all()
+
+    post_counts = session.query(DBForumPost.forum_id, func.count(DBForumPost.id), func.max(DBForumPost.id)) \
+        .filter(DBForumPost.hidden == False) \
+        .filter(DBForumPost.deleted == False) \
+        .group_by(DBForumPost.forum_id) \
+        .all()
+
+    for forum_id, topic_count in topic_counts:
+        stats.setdefault(forum_id, ForumStats()).topic_count = topic_count
+
+    for forum_id, post_count, last_post_id in post_counts:
+        forum_stats = stats.setdefault(forum_id, ForumStats())
+        forum_stats.post_count = post_count
+        forum_stats.last_post_id = last_post_id
+
+    return stats
+
+def rebuild(session: Session) -> Dict[int, ForumStats]:
+    """Recompute the statistics of all forums and store them in redis"""
+    stats = aggregate(session)
+    mapping = {'built': 1}
+
+    for forum_id, forum_stats in stats.items():
+        mapping[f'{forum_id}:topics'] = forum_stats.topic_count
+        mapping[f'{forum_id}:posts'] = forum_stats.post_count
+
+        if forum_stats.last_post_id:
+            mapping[f'{forum_id}:last_post'] = forum_stats.last_post_id
+
+    try:
+        pipeline = app.session.redis.pipeline()
+        pipeline.delete(STATS_KEY)
+        pipeline.hset(STATS_KEY, mapping=mapping)
+        pipeline.expire(STATS_KEY, config.FORUM_STATS_TTL)
+        pipeline.execute()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to store forum stats: {e}')
+
+    return stats
+
+def on_post_created(forum_id: int, post_id: int) -> None:
+    """Update the statistics of a forum after a post was created"""
+    try:
+        if not app.session.redis.hexists(STATS_KEY, 'built'):
+            return
+
+        pipeline = app.session.redis.pipeline()
+        pipeline.hincrby(STATS_KEY, f'{forum_id}:posts', 1)
+        pipeline.hset(STATS_KEY, f'{forum_id}:last_post', post_id)
+        pipeline.execute()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to update forum stats: {e}')
+        invalidate()
+
+def on_topic_created(forum_id: int, post_id: int) -> None:
+    """Update the statistics of a forum after a topic, including its initial post, was created"""
+    try:
+        if not app.session.redis.hexists(STATS_KEY, 'built'):
+            return
+
+        pipeline = app.session.redis.pipeline()
+        pipeline.hincrby(STATS_KEY, f'{forum_id}:topics', 1)
+        pipeline.hincrby(STATS_KEY, f'{forum_id}:posts', 1)
+        pipeline.hset(STATS_KEY, f'{forum_id}:last_post', post_id)
+        pipeline.execute()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to update forum stats: {e}')
+        invalidate()
+
+def invalidate() -> None:
+    """Remove all forum statistics, e.g. after topics were moved or deleted"""
+    try:
+        app.session.redis.delete(STATS_KEY)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to invalidate forum stats: {e}')
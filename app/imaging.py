@@ -0,0 +1,125 @@
+
+from PIL import Image, features
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Dict, Iterable, List
+
+import io
+
+@dataclass(frozen=True, eq=False)
+class ImageFormat:
+    name: str
+    mimetype: str
+    options: Dict[str, object] = field(default_factory=dict)
+
+AVIF = ImageFormat('avif', 'image/avif', {'quality': 70, 'speed': 6})
+WEBP = ImageFormat('webp', 'image/webp', {'quality': 85, 'method': 4})
+PNG = ImageFormat('png', 'image/png', {'optimize': True})
+JPEG = ImageFormat('jpeg', 'image/jpeg', {'quality': 90, 'optimize': True, 'progressive': True})
+
+# Modern formats, in order of preference
+MODERN_FORMATS = (AVIF, WEBP)
+FORMATS = {image_format.name: image_format for image_format in (AVIF, WEBP, PNG, JPEG)}
+
+@cache
+def is_supported(image_format: ImageFormat) -> bool:
+    """Check if the installed pillow build is able to encode the format"""
+    if image_format in (PNG, JPEG):
+        return True
+
+    return bool(features.check(image_format.name))
+
+def supported_formats() -> List[ImageFormat]:
+    """Modern formats, that can be encoded with the installed pillow build"""
+    return [
+        image_format for image_format in MODERN_FORMATS
+        if is_supported(image_format)
+    ]
+
+def negotiate(accept: str | None, fallback: ImageFormat = PNG) -> ImageFormat:
+    """Pick the best format the client has explicitly advertised in its "Accept" header"""
+    # Browsers only advertise modern image formats they can decode,
+    # older browsers like internet explorer will always get the fallback
+    accepted = {
+        value.split(';')[0].strip().lower()
+        for value in (accept or '').split(',')
+    }
+
+    for image_format in MODERN_FORMATS:
+        if image_format.mimetype in accepted and is_supported(image_format):
+            return image_format
+
+    return fallback
+
+def fallback_formats(image: Image.Image) -> List[ImageFormat]:
+    """Formats that can be used as a fallback, jpeg is only an option for opaque images"""
+    return [PNG] if has_transparency(image) else [PNG, JPEG]
+
+def has_transparency(image: Image.Image) -> bool:
+    if image.mode == 'P':
+        return 'transparency' in image.info
+
+    if 'A' not in image.getbands():
+        return False
+
+    minimum, _ = image.getchannel('A').getextrema()
+    return minimum < 255
+
+def resampling_filter(source_size: int, target_size: int) -> Image.Resampling:
+    """Choose a resampling filter for the given scale"""
+    if target_size >= source_size:
+        # Upscaling, or keeping the size
+        return Image.Resampling.BICUBIC
+
+    if target_size * 2 > source_size:
+        # Small reductions don't need a wide kernel
+        return Image.Resampling.BICUBIC
+
+    # Large reductions, e.g. 256 -> 25, would alias without lanczos
+    return Image.Resampling.LANCZOS
+
+def resize(image: Image.Image, target_size: int) -> Image.Image:
+    if image.size == (target_size, target_size):
+        return image
+
+    return image.resize(
+        (target_size, target_size),
+        resample=resampling_filter(max(image.size), target_size),
+        reducing_gap=3.0
+    )
+
+def encode(image: Image.Image, image_format: ImageFormat) -> bytes:
+    if image_format is JPEG:
+        image = image.convert('RGB')
+
+    elif image_format is PNG and image.mode in ('P', 'L', 'LA'):
+        # Palette & grayscale images are a lot smaller in their own mode
+        pass
+
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.name.upper(), **image_format.options)
+    return buffer.getvalue()
+
+def encode_variants(
+    data: bytes,
+    sizes: Iterable[int],
+    image_formats: Iterable[ImageFormat]
+) -> Dict[int, Dict[str, bytes]]:
+    """Resize an image into every size & encode each of them in every format, decoding the source only once"""
+    source = Image.open(io.BytesIO(data))
+    source.load()
+
+    variants = {}
+    image_formats = list(image_formats)
+
+    for size in sizes:
+        image = resize(source, size)
+        variants[size] = {
+            image_format.name: encode(image, image_format)
+            for image_format in image_formats
+        }
+
+    return variants
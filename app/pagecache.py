@@ -0,0 +1,113 @@
+
+from threading import Lock
+from typing import Callable, Dict
+
+import secrets
+import config
+import time
+import app
+
+counters = {
+    'hits': 0,
+    'misses': 0,
+    'waits': 0
+}
+
+lock = Lock()
+
+# Only delete the regeneration lock if it's still owned by this worker,
+# it may have expired & been acquired by another worker in the meantime
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def fetch(key: str, render: Callable[[], str], ttl: int) -> str:
+    """Fetch a rendered page from redis, or render it while holding a regeneration lock"""
+    cache_key = f'stern:pagecache:{key}'
+    lock_key = f'{cache_key}:lock'
+
+    if (content := read(cache_key)) is not None:
+        increment('hits')
+        return content
+
+    increment('misses')
+    token = secrets.token_hex(16)
+
+    try:
+        acquired = app.session.redis.set(
+            lock_key, token, nx=True,
+            ex=config.PAGE_CACHE_LOCK_TIMEOUT
+        )
+    except Exception as e:
+        app.session.logger.warning(f'Failed to acquire page cache lock: {e}')
+        return render()
+
+    if acquired:
+        try:
+            content = render()
+            write(cache_key, content, ttl)
+            return content
+        finally:
+            release(lock_key, token)
+
+    # Another worker is regenerating this page, wait for its result
+    increment('waits')
+    deadline = time.time() + config.PAGE_CACHE_LOCK_TIMEOUT
+
+    while time.time() < deadline:
+        time.sleep(0.05)
+
+        if (content := read(cache_key)) is not None:
+            return content
+
+        try:
+            if not app.session.redis.exists(lock_key):
+                break
+        except Exception:
+            break
+
+    # Regeneration failed or took too long
+    return render()
+
+def invalidate(key: str) -> None:
+    """Remove a cached page"""
+    try:
+        app.session.redis.delete(f'stern:pagecache:{key}')
+    except Exception as e:
+        app.session.logger.warning(f'Failed to invalidate page cache: {e}')
+
+def release(lock_key: str, token: str) -> None:
+    try:
+        app.session.redis.eval(RELEASE_SCRIPT, 1, lock_key, token)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to release page cache lock: {e}')
+
+def read(cache_key: str) -> str | None:
+    try:
+        content = app.session.redis.get(cache_key)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read page cache: {e}')
+        return None
+
+    if content is None:
+        return None
+
+    return content.decode()
+
+def write(cache_key: str, content: str, ttl: int) -> None:
+    try:
+        app.session.redis.set(cache_key, content, ex=ttl)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to write page cache: {e}')
+
+def increment(counter: str) -> None:
+    with lock:
+        counters[counter] += 1
+
+def metrics() -> Dict[str, int]:
+    """Return a snapshot of the page cache counters"""
+    with lock:
+        return dict(counters)
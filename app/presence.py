@@ -0,0 +1,143 @@
+
+from app.common.database import DBUser
+from sqlalchemy import Integer, DateTime
+from sqlalchemy import update, values, column
+from datetime import datetime
+from threading import Lock, Thread, Event
+from typing import Dict
+
+import config
+import atexit
+import time
+import app
+import os
+
+# Pending writes, keyed by user id
+pending_activity: Dict[int, datetime] = {}
+
+# Last time a latest_activity write was queued for a user
+last_activity_touch: Dict[int, float] = {}
+
+counters = {
+    'activity_touches': 0,
+    'activity_writes': 0,
+    'activity_saved': 0,
+    'flushes': 0
+}
+
+lock = Lock()
+shutdown_event = Event()
+flusher_thread: Thread | None = None
+flusher_pid: int | None = None
+
+def touch(user_id: int) -> None:
+    """Queue a latest_activity update for the given user"""
+    now = time.time()
+
+    with lock:
+        counters['activity_touches'] += 1
+        last_touch = last_activity_touch.get(user_id, 0)
+
+        if now - last_touch >= config.PRESENCE_RESOLUTION:
+            if user_id in pending_activity:
+                counters['activity_saved'] += 1
+
+            pending_activity[user_id] = datetime.fromtimestamp(now)
+            last_activity_touch[user_id] = now
+        else:
+            counters['activity_saved'] += 1
+
+    ensure_flusher()
+
+def flush() -> None:
+    """Write all pending updates to the database"""
+    with lock:
+        activity = dict(pending_activity)
+        pending_activity.clear()
+
+        # Forget touches that are older than the resolution
+        cutoff = time.time() - config.PRESENCE_RESOLUTION
+
+        for user_id, timestamp in list(last_activity_touch.items()):
+            if timestamp < cutoff:
+                del last_activity_touch[user_id]
+
+    if activity:
+        flush_activity(activity)
+
+    with lock:
+        counters['activity_writes'] += len(activity)
+        counters['flushes'] += 1
+
+def flush_activity(activity: Dict[int, datetime]) -> None:
+    """Update latest_activity for all users in a single statement"""
+    rows = values(
+        column('id', Integer),
+        column('latest_activity', DateTime),
+        name='activity'
+    ).data(list(activity.items()))
+
+    statement = (
+        update(DBUser)
+        .where(DBUser.id == rows.c.id)
+        .values(latest_activity=rows.c.latest_activity)
+    )
+
+    try:
+        with app.session.database.managed_session() as session:
+            session.execute(statement)
+            session.commit()
+    except Exception as e:
+        app.session.logger.error(
+            f'Failed to flush user activity: {e}',
+            exc_info=e
+        )
+
+def flusher() -> None:
+    while not shutdown_event.wait(config.PRESENCE_FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception as e:
+            app.session.logger.error(
+                f'Presence flusher failed: {e}',
+                exc_info=e
+            )
+
+    # Write out the remaining updates before exiting
+    flush()
+
+def ensure_flusher() -> None:
+    """Start the background flusher for the current process, if not running"""
+    global flusher_thread, flusher_pid
+
+    if flusher_thread and flusher_thread.is_alive() and flusher_pid == os.getpid():
+        return
+
+    with lock:
+        if flusher_thread and flusher_thread.is_alive() and flusher_pid == os.getpid():
+            return
+
+        flusher_pid = os.getpid()
+        flusher_thread = Thread(
+            target=flusher,
+            name='presence-flusher',
+            daemon=True
+        )
+        flusher_thread.start()
+
+def stop() -> None:
+    """Stop the background flusher & write out pending updates"""
+    shutdown_event.set()
+
+    if flusher_thread and flusher_thread.is_alive():
+        flusher_thread.join(timeout=5)
+
+def metrics() -> Dict[str, int]:
+    """Return a snapshot of the presence counters"""
+    with lock:
+        return {
+            **counters,
+            'pending_activity': len(pending_activity)
+        }
+
+atexit.register(stop)
@@ -0,0 +1,344 @@
+
+from app.common.database.repositories import (
+    collaborations,
+    relationships,
+    infringements,
+    nominations,
+    beatmapsets,
+    activities,
+    modding,
+    groups,
+    users,
+    stats
+)
+
+from app.common.database import DBUser, DBStats, DBBeatmapset
+from app.common.cache import status, leaderboards
+from app.common.constants import DatabaseStatus
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+import config
+import json
+import app
+
+executor = ThreadPoolExecutor(
+    max_workers=config.PROFILE_LOADER_WORKERS,
+    thread_name_prefix='profile-loader'
+)
+
+@dataclass
+class ProfileData:
+    rankings: Dict[str, dict] = field(default_factory=dict)
+    is_online: bool = False
+    infringements: List = field(default_factory=list)
+    followers: int = 0
+    current_stats: DBStats | None = None
+    total_posts: int = 0
+    groups: List[dict] = field(default_factory=list)
+    achievements: Dict[str, dict] = field(default_factory=dict)
+    beatmapset_categories: Dict[str, List[dict]] = field(default_factory=dict)
+    collaborations: List[dict] = field(default_factory=list)
+    nominations_bancho: List[dict] = field(default_factory=list)
+    nominations_titanic: List[dict] = field(default_factory=list)
+    total_kudosu: int = 0
+    recent_mods: List[dict] = field(default_factory=list)
+    activity: List = field(default_factory=list)
+
+    def rank(self, leaderboard: str, scope: str = 'global') -> int | None:
+        if not (ranking := self.rankings.get(leaderboard)):
+            return None
+
+        return ranking[scope]
+
+# Sections that rarely change are cached in redis as plain data,
+# mapped to the ProfileData attributes they contain
+cached_sections = {
+    'groups': ('groups',),
+    'total_posts': ('total_posts',),
+    'achievements': ('achievements',),
+    'beatmaps': ('beatmapset_categories',),
+    'collaborations': ('collaborations',),
+    'nominations': ('nominations_bancho', 'nominations_titanic'),
+    'kudosu': ('total_kudosu', 'recent_mods')
+}
+
+# Sections that are only changed by other services, e.g. bancho or the api.
+# This app can't invalidate them, so they expire after PROFILE_EXTERNAL_CACHE_TTL
+# instead, while the post count is invalidated on every new post or topic.
+external_sections = {
+    'groups',
+    'achievements',
+    'beatmaps',
+    'collaborations',
+    'nominations',
+    'kudosu'
+}
+
+def load(user: DBUser, mode: int, session: Session) -> ProfileData:
+    """Load all data for the profile of a user
+
+    Independent queries are split into groups, which run concurrently on
+    separate sessions. Workers only return plain data, which means their
+    sessions are released before the page gets rendered. Everything that
+    the template may still load lazily is fetched on the request session.
+    """
+    profile = ProfileData()
+    version, cached = fetch_cached_sections(user.id)
+    missing = set(cached_sections) - set(cached)
+
+    for section, data in cached.items():
+        for attribute, value in data.items():
+            setattr(profile, attribute, value)
+
+    with ExitStack() as stack:
+        # Only plain values are passed to the workers, since
+        # the user object is bound to the request session
+        tasks = [
+            executor.submit(load_rankings, profile, user.id, user.country, mode)
+        ]
+
+        if missing & {'beatmaps', 'collaborations', 'nominations'}:
+            beatmap_session = stack.enter_context(app.session.database.managed_session())
+            tasks.append(executor.submit(load_beatmaps, profile, user.id, missing, beatmap_session))
+
+        if 'kudosu' in missing:
+            modding_session = stack.enter_context(app.session.database.managed_session())
+            tasks.append(executor.submit(load_modding, profile, user.id, modding_session))
+
+        try:
+            # The overview queries run on the request session in the meantime
+            load_overview(profile, user, mode, missing, session)
+        finally:
+            # Sessions may only be closed once every worker is done
+            wait(tasks)
+
+        for task in tasks:
+            task.result()
+
+    store_cached_sections(user.id, version, profile, missing)
+    return profile
+
+def load_rankings(profile: ProfileData, user_id: int, country: str, mode: int) -> None:
+    profile.rankings = leaderboards.player_rankings(
+        user_id, mode, country,
+        leaderboards=(
+            "performance",
+            "rscore",
+            "tscore",
+            "ppv1",
+            "leader"
+        )
+    )
+    profile.is_online = status.exists(user_id)
+
+def load_overview(profile: ProfileData, user: DBUser, mode: int, missing: Set[str], session: Session) -> None:
+    if user.restricted:
+        profile.infringements = infringements.fetch_all(user.id, session=session)
+    else:
+        profile.infringements = infringements.fetch_recent_until(user.id, session=session)
+
+    profile.followers = relationships.fetch_count_by_target(user.id, session=session)
+    profile.current_stats = stats.fetch_by_mode(user.id, mode, session=session)
+    profile.activity = activities.fetch_recent(user.id, mode, session=session)
+
+    if 'total_posts' in missing:
+        profile.total_posts = users.fetch_post_count(user.id, session=session)
+
+    if 'groups' in missing:
+        profile.groups = [
+            serialize_group(group)
+            for group in groups.fetch_user_groups(user.id, session=session)
+        ]
+
+    if 'achievements' in missing:
+        profile.achievements = {
+            achievement.name: serialize_achievement(achievement)
+            for achievement in user.achievements
+        }
+
+def load_beatmaps(profile: ProfileData, user_id: int, missing: Set[str], session: Session) -> None:
+    if 'beatmaps' in missing:
+        profile.beatmapset_categories = {
+            category: [serialize_beatmapset(beatmapset) for beatmapset in entries]
+            for category, entries in categorize_beatmapsets(
+                beatmapsets.fetch_by_creator(user_id, session=session)
+            ).items()
+        }
+
+    if 'collaborations' in missing:
+        profile.collaborations = [
+            serialize_beatmap(beatmap)
+            for beatmap in collaborations.fetch_beatmaps_by_user(user_id, session=session)
+        ]
+
+    if 'nominations' in missing:
+        profile.nominations_bancho = [
+            serialize_nomination(nomination)
+            for nomination in nominations.fetch_by_user_and_server(user_id, 0, session=session)
+        ]
+        profile.nominations_titanic = [
+            serialize_nomination(nomination)
+            for nomination in nominations.fetch_by_user_and_server(user_id, 1, session=session)
+        ]
+
+def load_modding(profile: ProfileData, user_id: int, session: Session) -> None:
+    profile.total_kudosu = modding.total_amount_by_user(user_id, session=session)
+    profile.recent_mods = [
+        serialize_mod(mod)
+        for mod in modding.fetch_range_by_user(user_id, session=session)
+    ]
+
+def categorize_beatmapsets(user_beatmapsets: List[DBBeatmapset]) -> Dict[str, List[DBBeatmapset]]:
+    return {
+        'Ranked': [
+            s for s in user_beatmapsets
+            if s.status in (DatabaseStatus.Ranked, DatabaseStatus.Approved)
+        ],
+        'Loved': [
+            s for s in user_beatmapsets
+            if s.status == DatabaseStatus.Loved
+        ],
+        'Qualified': [
+            s for s in user_beatmapsets
+            if s.status == DatabaseStatus.Qualified
+        ],
+        'Pending': [
+            s for s in user_beatmapsets
+            if s.status == DatabaseStatus.Pending
+        ],
+        'WIP': [
+            s for s in user_beatmapsets
+            if s.status == DatabaseStatus.WIP
+        ],
+        'Graveyarded': [
+            s for s in user_beatmapsets
+            if s.status == DatabaseStatus.Graveyard
+        ]
+    }
+
+def fetch_cached_sections(user_id: int) -> Tuple[int, Dict[str, dict]]:
+    """Fetch the current cache version & all cached sections of a profile"""
+    try:
+        version = int(app.session.redis.get(f'stern:profile:{user_id}:version') or 0)
+        results = app.session.redis.mget([
+            f'stern:profile:{user_id}:{version}:{section}'
+            for section in cached_sections
+        ])
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read profile cache: {e}')
+        return 0, {}
+
+    return version, {
+        section: deserialize_section(section, json.loads(data))
+        for section, data in zip(cached_sections, results)
+        if data is not None
+    }
+
+def store_cached_sections(user_id: int, version: int, profile: ProfileData, sections: Set[str]) -> None:
+    if not sections:
+        return
+
+    try:
+        pipeline = app.session.redis.pipeline()
+
+        for section in sections:
+            data = {
+                attribute: getattr(profile, attribute)
+                for attribute in cached_sections[section]
+            }
+            pipeline.set(
+                f'stern:profile:{user_id}:{version}:{section}',
+                json.dumps(data, default=datetime.isoformat),
+                ex=(
+                    config.PROFILE_EXTERNAL_CACHE_TTL
+                    if section in external_sections else
+                    config.PROFILE_CACHE_TTL
+                )
+            )
+
+        pipeline.execute()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to write profile cache: {e}')
+
+def invalidate(user_id: int, *sections: str) -> None:
+    """Invalidate cached profile sections, or the whole profile if no sections are given"""
+    try:
+        if not sections:
+            # Bumping the version makes all previously cached sections unreachable
+            app.session.redis.incr(f'stern:profile:{user_id}:version')
+            return
+
+        version = int(app.session.redis.get(f'stern:profile:{user_id}:version') or 0)
+        app.session.redis.delete(*[
+            f'stern:profile:{user_id}:{version}:{section}'
+            for section in sections
+        ])
+    except Exception as e:
+        app.session.logger.warning(f'Failed to invalidate profile cache: {e}')
+
+def deserialize_section(section: str, data: dict) -> dict:
+    """Restore timestamps, which are stored as iso strings"""
+    if section == 'achievements':
+        for achievement in data['achievements'].values():
+            achievement['unlocked_at'] = datetime.fromisoformat(achievement['unlocked_at'])
+
+    if section == 'kudosu':
+        for mod in data['recent_mods']:
+            mod['time'] = datetime.fromisoformat(mod['time'])
+
+    return data
+
+def serialize_group(group) -> dict:
+    return {
+        'id': group.id,
+        'color': group.color,
+        'short_name': group.short_name
+    }
+
+def serialize_achievement(achievement) -> dict:
+    return {
+        'filename': achievement.filename,
+        'unlocked_at': achievement.unlocked_at
+    }
+
+def serialize_beatmapset(beatmapset: DBBeatmapset) -> dict:
+    return {
+        'id': beatmapset.id,
+        'artist': beatmapset.artist,
+        'title': beatmapset.title,
+        'server': beatmapset.server,
+        'creator': beatmapset.creator,
+        'creator_id': beatmapset.creator_id
+    }
+
+def serialize_beatmap(beatmap) -> dict:
+    return {
+        'id': beatmap.id,
+        'set_id': beatmap.set_id,
+        'full_name': beatmap.full_name,
+        'beatmapset': serialize_beatmapset(beatmap.beatmapset)
+    }
+
+def serialize_nomination(nomination) -> dict:
+    return {
+        'set_id': nomination.set_id,
+        'beatmapset': serialize_beatmapset(nomination.beatmapset)
+    }
+
+def serialize_mod(mod) -> dict:
+    return {
+        'amount': mod.amount,
+        'time': mod.time,
+        'post_id': mod.post_id,
+        'sender_id': mod.sender_id,
+        'target_id': mod.target_id,
+        'sender': {'name': mod.sender.name},
+        'target': {'name': mod.target.name},
+        'post': {'topic': {'title': mod.post.topic.title}}
+    }
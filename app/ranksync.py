@@ -0,0 +1,216 @@
+
+from app.common.database.repositories import histories
+from app.common.database import DBStats, DBUser
+from sqlalchemy import update, values, column, tuple_, Integer
+from threading import Lock, Thread
+from typing import Dict, List, Tuple
+from queue import Queue, Full, Empty
+
+import config
+import time
+import app
+import os
+
+# Queued entries are (user_id, mode, country, database rank, enqueue time)
+RankEntry = Tuple[int, int, str, int, float]
+
+queue: Queue = Queue(maxsize=config.RANK_SYNC_QUEUE_SIZE)
+pending: set = set()
+
+counters = {
+    'enqueued': 0,
+    'dropped': 0,
+    'duplicates': 0,
+    'batches': 0,
+    'checked': 0,
+    'updated': 0,
+    'last_batch_size': 0,
+    'last_lag_ms': 0,
+    'max_lag_ms': 0
+}
+
+lock = Lock()
+worker_thread: Thread | None = None
+worker_pid: int | None = None
+
+def enqueue(user_id: int, mode: int, country: str, rank: int) -> bool:
+    """Queue a (user, mode) pair to be checked against the redis leaderboard"""
+    with lock:
+        if (user_id, mode) in pending:
+            counters['duplicates'] += 1
+            return False
+
+        try:
+            queue.put_nowait((user_id, mode, country, rank, time.time()))
+        except Full:
+            # Drop the entry, it will be queued again on the next page view
+            counters['dropped'] += 1
+            return False
+
+        pending.add((user_id, mode))
+        counters['enqueued'] += 1
+
+    ensure_worker()
+    return True
+
+def enqueue_user(user: DBUser, mode: int) -> None:
+    """Queue the stats of a user for the given mode, if they have any plays"""
+    user_stats = next(
+        (entry for entry in user.stats if entry.mode == mode),
+        None
+    )
+
+    if not user_stats or user_stats.playcount <= 0:
+        return
+
+    enqueue(user.id, mode, user.country, user_stats.rank)
+
+def fetch_global_ranks(entries: List[RankEntry]) -> List[int]:
+    """Fetch the global ranks of all entries in a single redis pipeline"""
+    pipeline = app.session.redis.pipeline()
+
+    # NOTE: This is a batched version of leaderboards.global_rank,
+    #       which would need one round-trip for every entry
+    for user_id, mode, *_ in entries:
+        pipeline.zrevrank(f'bancho:performance:{mode}', user_id)
+
+    return [
+        (rank + 1 if rank is not None else 0)
+        for rank in pipeline.execute()
+    ]
+
+def process_batch(entries: List[RankEntry]) -> None:
+    """Apply rank changes for a batch of queued entries"""
+    global_ranks = fetch_global_ranks(entries)
+
+    changes = [
+        (entry, global_rank)
+        for entry, global_rank in zip(entries, global_ranks)
+        if entry[3] != global_rank
+    ]
+
+    if changes:
+        apply_changes(changes)
+
+    now = time.time()
+    lag = max(now - entry[4] for entry in entries)
+
+    with lock:
+        counters['batches'] += 1
+        counters['checked'] += len(entries)
+        counters['updated'] += len(changes)
+        counters['last_batch_size'] = len(entries)
+        counters['last_lag_ms'] = round(lag * 1000)
+        counters['max_lag_ms'] = max(counters['max_lag_ms'], counters['last_lag_ms'])
+
+def apply_changes(changes: List[Tuple[RankEntry, int]]) -> None:
+    """Update all desynced ranks in a single statement & update rank history"""
+    rows = values(
+        column('user_id', Integer),
+        column('mode', Integer),
+        column('rank', Integer),
+        name='ranks'
+    ).data([
+        (entry[0], entry[1], global_rank)
+        for entry, global_rank in changes
+    ])
+
+    statement = (
+        update(DBStats)
+        .where(DBStats.user_id == rows.c.user_id)
+        .where(DBStats.mode == rows.c.mode)
+        .values(rank=rows.c.rank)
+    )
+
+    with app.session.database.managed_session() as session:
+        session.execute(statement)
+        session.commit()
+
+        if config.FROZEN_RANK_UPDATES:
+            return
+
+        # Load the stats of all changed entries in one query
+        changed_stats = session.query(DBStats) \
+            .filter(tuple_(DBStats.user_id, DBStats.mode).in_([
+                (entry[0], entry[1]) for entry, _ in changes
+            ])) \
+            .all()
+
+        stats_by_key = {
+            (user_stats.user_id, user_stats.mode): user_stats
+            for user_stats in changed_stats
+        }
+
+        # NOTE: Rank history rows are still written one at a time through
+        #       the repository, since they are derived from the stats object
+        #       and the country rank, which is resolved by histories.update_rank
+        for entry, _ in changes:
+            user_id, mode, country, *_ = entry
+
+            if not (user_stats := stats_by_key.get((user_id, mode))):
+                continue
+
+            histories.update_rank(
+                user_stats,
+                country,
+                session=session
+            )
+
+def drain(first: RankEntry) -> List[RankEntry]:
+    """Collect up to one batch of entries from the queue"""
+    entries = [first]
+
+    while len(entries) < config.RANK_SYNC_BATCH_SIZE:
+        try:
+            entries.append(queue.get_nowait())
+        except Empty:
+            break
+
+    with lock:
+        for user_id, mode, *_ in entries:
+            pending.discard((user_id, mode))
+
+    return entries
+
+def worker() -> None:
+    while True:
+        first = queue.get()
+
+        # Give other pages some time to fill up the batch
+        time.sleep(config.RANK_SYNC_INTERVAL)
+        entries = drain(first)
+
+        try:
+            process_batch(entries)
+        except Exception as e:
+            app.session.logger.error(
+                f'Failed to sync ranks: {e}',
+                exc_info=e
+            )
+
+def ensure_worker() -> None:
+    """Start the rank sync worker for the current process, if not running"""
+    global worker_thread, worker_pid
+
+    if worker_thread and worker_thread.is_alive() and worker_pid == os.getpid():
+        return
+
+    with lock:
+        if worker_thread and worker_thread.is_alive() and worker_pid == os.getpid():
+            return
+
+        worker_pid = os.getpid()
+        worker_thread = Thread(
+            target=worker,
+            name='rank-sync',
+            daemon=True
+        )
+        worker_thread.start()
+
+def metrics() -> Dict[str, int]:
+    """Return a snapshot of the rank sync counters"""
+    with lock:
+        return {
+            **counters,
+            'queue_size': queue.qsize()
+        }
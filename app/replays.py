@@ -0,0 +1,165 @@
+
+from app.common.database import DBScore
+from werkzeug.datastructures import Range
+from typing import Callable, Iterator, List, Tuple
+from dataclasses import dataclass
+
+import hashlib
+import struct
+import config
+import app
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+# Amount of bytes of the frames, that are used to locate them inside of a serialized replay
+FRAMES_PREFIX_SIZE = 64
+
+@dataclass
+class Segment:
+    """A part of a replay file, which is read lazily from a byte range"""
+    length: int
+    read: Callable[[int, int], Iterator[bytes]]
+
+def memory_segment(data: bytes) -> Segment:
+    return Segment(
+        len(data),
+        lambda start, stop: iter((data[start:stop],))
+    )
+
+@dataclass
+class ReplayStream:
+    segments: List[Segment]
+
+    @property
+    def length(self) -> int:
+        return sum(segment.length for segment in self.segments)
+
+    def iter_range(self, start: int = 0, stop: int | None = None) -> Iterator[bytes]:
+        """Yield the bytes between start & stop, without loading more than one chunk at a time"""
+        stop = self.length if stop is None else stop
+        offset = 0
+
+        for segment in self.segments:
+            segment_start = max(start - offset, 0)
+            segment_stop = min(stop - offset, segment.length)
+
+            if segment_start < segment_stop:
+                yield from segment.read(segment_start, segment_stop)
+
+            offset += segment.length
+
+            if offset >= stop:
+                break
+
+def open_replay(score: DBScore) -> ReplayStream | None:
+    """Assemble a replay file from the cached parts around its frames & the compressed frames in storage"""
+    frames = open_frames(score.id)
+
+    if frames and (parts := fetch_parts(score)) is not None:
+        header, footer = parts
+        return ReplayStream([memory_segment(header), frames, memory_segment(footer)])
+
+    # The parts around the frames are taken from the replay serializer
+    # of the common package, which needs to load the frames once
+    if not (replay := app.session.storage.get_full_replay_from_score(score)):
+        return None
+
+    if frames and (parts := split_replay(replay, frames)) is not None:
+        store_parts(score, *parts)
+
+    return ReplayStream([memory_segment(replay)])
+
+def split_replay(replay: bytes, frames: Segment) -> Tuple[bytes, bytes] | None:
+    """Split a serialized replay into everything in front of & behind the compressed frames"""
+    # The frames are preceded by their length
+    prefix = b''.join(frames.read(0, min(frames.length, FRAMES_PREFIX_SIZE)))
+    offset = replay.find(struct.pack('<i', frames.length) + prefix)
+
+    frames_start = offset + 4
+    frames_end = frames_start + frames.length
+
+    if not prefix or offset < 0 or frames_end > len(replay):
+        app.session.logger.warning('Failed to locate replay frames, the replay will not be streamed')
+        return None
+
+    return replay[:frames_start], replay[frames_end:]
+
+def parts_key(score: DBScore) -> str:
+    # The header contains the name of the player & the checksum of the beatmap
+    checksum = hashlib.md5(f'{score.user.name}:{score.beatmap.md5}'.encode()).hexdigest()
+    return f'stern:replays:parts:{score.id}:{checksum}'
+
+def fetch_parts(score: DBScore) -> Tuple[bytes, bytes] | None:
+    try:
+        header, footer = app.session.redis.hmget(parts_key(score), ['header', 'footer'])
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read replay cache: {e}')
+        return None
+
+    if header is None or footer is None:
+        return None
+
+    return header, footer
+
+def store_parts(score: DBScore, header: bytes, footer: bytes) -> None:
+    try:
+        pipeline = app.session.redis.pipeline()
+        pipeline.hset(parts_key(score), mapping={'header': header, 'footer': footer})
+        pipeline.expire(parts_key(score), config.REPLAY_CACHE_TTL)
+        pipeline.execute()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to write replay cache: {e}')
+
+def open_frames(score_id: int) -> Segment | None:
+    if config.S3_ENABLED:
+        return open_s3_frames(score_id)
+
+    return open_local_frames(score_id)
+
+def open_local_frames(score_id: int) -> Segment | None:
+    path = os.path.join(config.DATA_PATH, 'replays', str(score_id))
+
+    try:
+        length = os.path.getsize(path)
+    except OSError:
+        return None
+
+    def read(start: int, stop: int) -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = stop - start
+
+            while remaining > 0 and (chunk := f.read(min(CHUNK_SIZE, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+
+    return Segment(length, read)
+
+def open_s3_frames(score_id: int) -> Segment | None:
+    if not (s3 := getattr(app.session.storage, 's3', None)):
+        return None
+
+    try:
+        length = s3.head_object(Bucket='replays', Key=str(score_id))['ContentLength']
+    except Exception as e:
+        app.session.logger.warning(f'Failed to open replay "{score_id}": {e}')
+        return None
+
+    def read(start: int, stop: int) -> Iterator[bytes]:
+        response = s3.get_object(
+            Bucket='replays',
+            Key=str(score_id),
+            Range=f'bytes={start}-{stop - 1}'
+        )
+        yield from response['Body'].iter_chunks(CHUNK_SIZE)
+
+    return Segment(length, read)
+
+def is_single_range(range_header: Range | None) -> bool:
+    """Only single byte ranges are supported, other requests are answered with the whole file"""
+    return (
+        range_header is not None and
+        range_header.units == 'bytes' and
+        len(range_header.ranges) == 1
+    )
@@ -146,6 +146,7 @@ def registration_request():
             'Enjoy your journey!',
             session=session
         )
+        app.context.invalidate_notification_count(user.id)
 
         # Add user to players & supporters group
         groups.create_entry(user.id, 999, session=session)
@@ -60,27 +60,44 @@ def update_avatar():
         return get_profile_page('This image is too large. Please lower the resolution!')
 
     buffer = io.BytesIO()
-    image = image.resize((256, 256))
-    image.save(buffer, format='PNG')
+    image = app.imaging.resize(image, 256)
+    image.save(buffer, format='PNG', optimize=True)
+
+    avatar_hash = hashlib.md5(buffer.getvalue()).hexdigest()
 
     app.session.storage.upload_avatar(
         current_user.id,
         buffer.getvalue()
     )
-    
+
     users.update(
         current_user.id,
         {
-            'avatar_hash': hashlib.md5(buffer.getvalue()).hexdigest(),
+            'avatar_hash': avatar_hash,
             'avatar_last_update': datetime.now()
         }
     )
 
-    # Remove avatar checksum cache, if it exists
+    # Remove avatar checksum caches, if they exist
     app.session.redis.delete(
-        f'bancho:avatar_hash:{current_user.id}'
+        f'bancho:avatar_hash:{current_user.id}',
+        app.avatars.current_key(current_user.id)
     )
 
+    try:
+        # Render all sizes now, instead of on the first request
+        app.avatars.store_variants(
+            current_user.id,
+            buffer.getvalue(),
+            avatar_hash
+        )
+    except Exception as e:
+        # The variants are still rendered lazily on the first request
+        app.session.logger.error(
+            f'Failed to render avatar variants: {e}',
+            exc_info=e
+        )
+
     app.session.logger.info(
         f'{current_user.name} changed their avatar.'
     )
@@ -12,6 +12,10 @@ router = Blueprint('overview', __name__)
 @router.get('/')
 @login_required
 def settings_overview():
+    # Notifications are marked as read through the api, so
+    # the cached count may be outdated when visiting this page
+    app.context.invalidate_notification_count(flask_login.current_user.id)
+
     with app.session.database.managed_session() as session:
         return utils.render_template(
             'settings/overview.html',
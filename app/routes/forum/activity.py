@@ -4,22 +4,32 @@ import app
 
 FORUM_ACTIVITY_EXPIRY = 60*5
 
+# Every forum has one sorted set of active users,
+# scored by the time they were last seen
+def active_users_key(forum_id: int) -> str:
+    return f"forum:{forum_id}:active"
+
 def mark_user_active(user_id: int, forum_id: int) -> None:
-    redis_key = f"forum:{forum_id}:active:{user_id}"
-    app.session.redis.set(redis_key, int(time.time()), ex=FORUM_ACTIVITY_EXPIRY)
-    
+    redis_key = active_users_key(forum_id)
+    now = time.time()
+
+    pipeline = app.session.redis.pipeline()
+    pipeline.zadd(redis_key, {user_id: int(now)})
+    # Trim users that are no longer active
+    pipeline.zremrangebyscore(redis_key, "-inf", f"({int(now - FORUM_ACTIVITY_EXPIRY)}")
+    # Remove the whole set, once nobody was browsing the forum for a while
+    pipeline.expire(redis_key, FORUM_ACTIVITY_EXPIRY)
+    pipeline.execute()
+
 def is_user_active(user_id: int, forum_id: int) -> bool:
-    redis_key = f"forum:{forum_id}:active:{user_id}"
-    last_active = app.session.redis.get(redis_key)
+    last_active = app.session.redis.zscore(active_users_key(forum_id), user_id)
 
     if last_active is None:
         return False
 
-    last_active = int(last_active)
     return (time.time() - last_active) < FORUM_ACTIVITY_EXPIRY
 
 def get_active_users(forum_id: int) -> list[int]:
-    pattern = f"forum:{forum_id}:active:*"
-    keys = app.session.redis.keys(pattern)
-    user_ids = [int(key.decode().split(":")[-1]) for key in keys]
-    return user_ids
+    cutoff = f"({int(time.time() - FORUM_ACTIVITY_EXPIRY)}"
+    user_ids = app.session.redis.zrangebyscore(active_users_key(forum_id), cutoff, "+inf")
+    return [int(user_id) for user_id in user_ids]
@@ -1,5 +1,5 @@
 
-from app.common.database import forums, topics, posts
+from app.common.database import forums, topics
 from flask import Blueprint, abort, redirect, request
 from flask_login import current_user
 from datetime import datetime
@@ -34,7 +34,13 @@ def forum_view(forum_id: int):
         topics_per_page = 25
 
         sub_forums = forums.fetch_sub_forums(forum.id, session)
-        topic_count = forums.fetch_topic_count(forum_id, session)
+
+        # Statistics of this forum & all subforums, in one round-trip
+        forum_stats = app.forumstats.fetch(
+            [forum.id] + [subforum.id for subforum in sub_forums],
+            session=session
+        )
+        topic_count = forum_stats.pop(forum.id).topic_count
 
         recent_topics = topics.fetch_recent_by_last_post(
             forum.id,
@@ -80,16 +86,16 @@ def forum_view(forum_id: int):
             forum=forum,
             sub_forums=sub_forums,
             subforum_stats={
-                subforum.id: (
-                    forums.fetch_topic_count(subforum.id, session),
-                    forums.fetch_post_count(subforum.id, session)
-                )
-                for subforum in sub_forums
-            },
-            subforum_recent={
-                forum.id: posts.fetch_last_by_forum(forum.id, session)
-                for forum in sub_forums
+                subforum_id: (stats.topic_count, stats.post_count)
+                for subforum_id, stats in forum_stats.items()
             },
+            subforum_recent=app.forumstats.fetch_last_posts(
+                forum_stats,
+                session=session
+            ),
+            pending_views=app.topicviews.fetch_pending(
+                topic.id for topic in announcements + recent_topics
+            ),
             has_custom_icons=has_custom_icons,
             announcements=announcements,
             recent_topics=recent_topics,
@@ -1,5 +1,5 @@
 
-from app.common.database import forums, posts
+from app.common.database import forums
 from flask import Blueprint
 
 import app.session
@@ -18,6 +18,11 @@ def home():
             for forum in main_forums
         }
 
+        sub_forum_stats = app.forumstats.fetch(
+            (forum.id for forum in itertools.chain(*forum_dict.values())),
+            session=session
+        )
+
         return utils.render_template(
             "forum/home.html",
             css='forums.css',
@@ -28,14 +33,11 @@ def home():
             forums=forum_dict,
             session=session,
             forum_stats={
-                forum.id: (
-                    forums.fetch_topic_count(forum.id, session),
-                    forums.fetch_post_count(forum.id, session)
-                )
-                for forum in itertools.chain(*forum_dict.values())
+                forum_id: (stats.topic_count, stats.post_count)
+                for forum_id, stats in sub_forum_stats.items()
             },
-            forum_recent={
-                forum.id: posts.fetch_last_by_forum(forum.id, session)
-                for forum in itertools.chain(*forum_dict.values())
-            }
+            forum_recent=app.forumstats.fetch_last_posts(
+                sub_forum_stats,
+                session=session
+            )
         )
@@ -42,7 +42,7 @@ def broadcast_post_activity(
             'topic_name': topic.title,
             'topic_id': topic.id,
             'topic_icon': topic.icon.location if topic.icon else None,
-            'content': post.content[:512] + ('...' if len(post.content) > 1024 else ''),
+            'content': app.bbcode.render_preview(post.content, 512),
         },
         is_announcement=True,
         is_hidden=True,
@@ -263,6 +263,7 @@ def update_topic_location(
         {'forum_id': forum_id},
         session=session
     )
+    app.forumstats.invalidate()
 
 def update_topic_status_text(
     beatmapset: DBBeatmapset,
@@ -379,6 +380,7 @@ def notify_subscribers(post: DBForumPost, topic: DBForumTopic, session: Session)
             link=f'/forum/{topic.forum_id}/p/{post.id}',
             session=session
         )
+        app.context.invalidate_notification_count(subscriber.user_id)
 
         # TODO: Send email, based on preferences
 
@@ -411,6 +413,12 @@ def handle_post(topic: DBForumTopic, _: int, session: Session) -> Response:
         session=session
     )
 
+    app.profile.invalidate(current_user.id, 'total_posts')
+    app.forumstats.on_post_created(topic.forum_id, post.id)
+
+    # Pre-render the post, so that the first view is served from cache
+    app.bbcode.render_html_cached(content)
+
     notify = request.form.get(
         'notify',
         type=bool,
@@ -569,6 +577,9 @@ def handle_post_edit(topic: DBForumTopic, post_id: int, session: Session) -> Res
         session=session
     )
 
+    # Pre-render the post, so that the first view is served from cache
+    app.bbcode.render_html_cached(content)
+
     app.session.logger.info(
         f'{current_user.name} edited their post ({post.id}).'
     )
@@ -1,11 +1,13 @@
 
 from app.common.database import DBForumTopic, DBForumPost, DBForum, DBUser
+from app.common.database import DBBeatmapset, DBGroup, DBGroupEntry, DBModding
 from app.common.constants import UserActivity
 from app.common.helpers import ip, activity
 from app.common.database import (
     beatmapsets,
     forums,
     topics,
+    users,
     posts
 )
 
@@ -13,6 +15,8 @@ from . import activity as forum_activity
 from flask_login import current_user, login_required
 from flask import Blueprint, redirect, request
 from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List
 
 import config
 import utils
@@ -20,23 +24,12 @@ import app
 
 router = Blueprint("forum-topics", __name__)
 
-def update_views(topic_id: int, session: Session) -> None:
-    ip_address = ip.resolve_ip_address_flask(request)
-    lock = app.session.redis.get(f'forums:viewlock:{topic_id}:{ip_address}')
-
-    if lock:
-        return
-
-    topics.update(
+def update_views(topic_id: int) -> None:
+    # Views are deduplicated & aggregated in redis,
+    # and written to the database in batches
+    app.topicviews.record_view(
         topic_id,
-        {'views': DBForumTopic.views + 1},
-        session=session
-    )
-
-    app.session.redis.set(
-        f'forums:viewlock:{topic_id}:{ip_address}',
-        value=1,
-        ex=60
+        ip.resolve_ip_address_flask(request)
     )
 
 def broadcast_topic_activity(
@@ -56,12 +49,71 @@ def broadcast_topic_activity(
             'forum_id': topic.forum_id,
             'topic_id': topic.id,
             'topic_icon': topic.icon.location if topic.icon else None,
-            'content': post.content[:512] + ('...' if len(post.content) > 1024 else ''),
+            'content': app.bbcode.render_preview(post.content, 512),
         },
         is_announcement=True,
         session=session
     )
 
+def load_post_metadata(
+    topic_posts: List[DBForumPost],
+    beatmapset: DBBeatmapset | None,
+    session: Session
+) -> dict:
+    """Load the author & kudosu information of all posts on a topic page, with one query each"""
+    if not topic_posts:
+        return {
+            'user_post_counts': {},
+            'user_groups': {},
+            'kudosu_totals': {},
+            'kudosu_entries': {}
+        }
+
+    post_ids = [post.id for post in topic_posts]
+    user_ids = list({post.user_id for post in topic_posts})
+
+    # Load all authors into the session, so that
+    # "post.user" does not need a query per post
+    users.fetch_many(user_ids, session=session)
+
+    post_counts = session.query(DBForumPost.user_id, func.count(DBForumPost.id)) \
+        .filter(DBForumPost.user_id.in_(user_ids)) \
+        .filter(DBForumPost.hidden == False) \
+        .group_by(DBForumPost.user_id) \
+        .all()
+
+    group_entries = session.query(DBGroupEntry.user_id, DBGroup) \
+        .join(DBGroup, DBGroup.id == DBGroupEntry.group_id) \
+        .filter(DBGroupEntry.user_id.in_(user_ids)) \
+        .order_by(DBGroup.id) \
+        .all()
+
+    user_groups = {user_id: [] for user_id in user_ids}
+
+    for user_id, group in group_entries:
+        user_groups[user_id].append(group)
+
+    kudosu_totals = {}
+    kudosu_entries = {}
+
+    if beatmapset:
+        # Kudosu is only shown inside of beatmap topics
+        entries = session.query(DBModding) \
+            .filter(DBModding.post_id.in_(post_ids)) \
+            .order_by(DBModding.time) \
+            .all()
+
+        for entry in entries:
+            kudosu_totals[entry.post_id] = kudosu_totals.get(entry.post_id, 0) + entry.amount
+            kudosu_entries.setdefault(entry.post_id, entry)
+
+    return {
+        'user_post_counts': dict(post_counts),
+        'user_groups': user_groups,
+        'kudosu_totals': kudosu_totals,
+        'kudosu_entries': kudosu_entries
+    }
+
 @router.get('/<forum_id>/t/<id>/')
 def topic(forum_id: str, id: str):
     if not forum_id.isdigit():
@@ -96,10 +148,7 @@ def topic(forum_id: str, id: str):
             session=session
         )
 
-        update_views(
-            topic.id,
-            session=session
-        )
+        update_views(topic.id)
 
         beatmapset = beatmapsets.fetch_by_topic(
             topic.id,
@@ -156,7 +205,12 @@ def topic(forum_id: str, id: str):
             is_bookmarked=is_bookmarked,
             is_subscribed=is_subscribed,
             initial_post=initial_post,
-            session=session
+            session=session,
+            **load_post_metadata(
+                topic_posts,
+                beatmapset,
+                session=session
+            )
         )
 
 @router.get('/<forum_id>/create')
@@ -274,6 +328,11 @@ def create_post_action(forum_id: str):
             content,
             session=session
         )
+        app.profile.invalidate(current_user.id, 'total_posts')
+        app.forumstats.on_topic_created(forum.id, post.id)
+
+        # Pre-render the post, so that the first view is served from cache
+        app.bbcode.render_html_cached(content)
 
         notify = request.form.get(
             'notify',
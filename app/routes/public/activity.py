@@ -7,10 +7,13 @@ from io import BytesIO
 from app.common.database.repositories import usercount
 from app.common.database import DBUserCount
 from app.common.helpers import caching
+from typing import Tuple
 
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 import numpy as np
+import hashlib
+import app
 
 router = Blueprint("activity", __name__)
 
@@ -34,7 +37,8 @@ def calculate_peak_x(
     )
 
 @caching.ttl_cache(ttl=60)
-def generate_activity_chart(width: int, height: int) -> bytes:
+def generate_activity_chart(width: int, height: int) -> Tuple[bytes, str, datetime]:
+    """Render the activity chart & return it, together with its checksum and generation time"""
     usercounts = usercount.fetch_range(
         datetime.now() - timedelta(hours=24),
         datetime.now()
@@ -112,16 +116,24 @@ def generate_activity_chart(width: int, height: int) -> bytes:
         bbox_inches='tight'
     )
     buffer.seek(0)
-    return buffer.read()
+    image = buffer.read()
+    return image, hashlib.md5(image).hexdigest(), datetime.now()
 
 @router.get('/image')
 def user_activity_chart(
     width: int = 600,
     height: int = 90
 ) -> Response:
-    return send_file(
-        BytesIO(generate_activity_chart(width, height)),
-        mimetype='image/png',
-        as_attachment=False,
-        download_name='useractivity.png'
+    image, checksum, generated_at = generate_activity_chart(width, height)
+
+    return app.conditional.respond(
+        lambda: send_file(
+            BytesIO(image),
+            mimetype='image/png',
+            as_attachment=False,
+            download_name='useractivity.png'
+        ),
+        etag=checksum,
+        last_modified=generated_at,
+        headers={'Cache-Control': 'public, max-age=60'}
     )
@@ -2,7 +2,6 @@
 from flask import Blueprint, Response, abort, request
 from typing import Optional
 
-import utils
 import app
 
 # NOTE: These endpoints act as a fallback for
@@ -36,34 +35,43 @@ def avatar(filename: str) -> Response:
         type=str
     )
 
-    # If a checksum is provided, we can cache the avatar
-    cache_header = (
-        {'Cache-Control': 'public, max-age=86400'}
-        if checksum is not None else {}
-    )
+    if size not in app.avatars.SIZES:
+        # Avatars are stored in their largest size
+        size = max(app.avatars.SIZES)
+
+    image_format = app.imaging.negotiate(request.headers.get('Accept'))
+    avatar_hash = checksum or app.avatars.fetch_current_hash(user_id)
+
+    # Avatars are addressed by their checksum, so they can
+    # be cached forever, if the checksum is up-to-date
+    headers = {
+        'Cache-Control': (
+            'public, max-age=31536000, immutable'
+            if checksum is not None else 'no-cache'
+        ),
+        'Vary': 'Accept'
+    }
 
-    if (image := app.session.redis.get(f'avatar:{user_id}:{size}')):
-        return Response(
-            image,
-            mimetype='image/png',
-            headers=cache_header
+    if avatar_hash:
+        etag = app.avatars.variant_etag(
+            avatar_hash, size,
+            app.avatars.variant_field(image_format)
         )
 
-    if not (image := app.session.storage.get_avatar(user_id)):
-        return default_avatar()
+        # Answer revalidations without loading the image
+        if app.conditional.is_fresh(etag):
+            return app.conditional.not_modified(etag, headers=headers)
 
-    allowed_sizes = (
-        25,
-        128,
-        256
-    )
+    if not (avatar := app.avatars.fetch(user_id, size, avatar_hash, image_format)):
+        return default_avatar()
 
-    if size is not None and size in allowed_sizes:
-        image = utils.resize_image(image, size)
-        app.session.redis.set(f'avatar:{user_id}:{size}', image, ex=3600)
+    if checksum != avatar.avatar_hash or avatar.field == app.avatars.ORIGINAL:
+        # The checksum was outdated, or the avatar is still being rendered
+        headers['Cache-Control'] = 'no-cache'
 
-    return Response(
-        image,
-        mimetype='image/png',
-        headers=cache_header
+    response = Response(
+        avatar.image,
+        mimetype=avatar.mimetype,
+        headers=headers
     )
+    return app.conditional.apply_validators(response, avatar.etag)
@@ -10,10 +10,11 @@ from flask_login import current_user
 from sqlalchemy.orm import Session
 from typing import List
 
+import config
 import utils
-import time
 import math
 import app
+import re
 
 router = Blueprint('rankings', __name__)
 
@@ -22,6 +23,9 @@ valid_order_types = (
     'ppv1', 'tscore', 'clears', 'leader'
 )
 
+# Placeholder for rows that get highlighted per user, see "rankings/leaderboard.html"
+row_placeholder = re.compile(r'<tr class="%%row:(\d+):(row-dark|row-light)%%">')
+
 order_name_mapping = {
     'performance': 'Performance',
     'rscore': 'Ranked Score',
@@ -80,27 +84,76 @@ def render_rankings_page(
     page: int,
     items_per_page: int,
 ) -> str:
-    with app.session.database.managed_session() as session:
-        jumpto = request.args.get('jumpto', default=None)
-        jumpto_id = request.args.get('jumpto_id', default=None, type=int)
-
-        if jumpto and (user := users.fetch_by_name_case_insensitive(jumpto, session)):
-            # Change the page to where the user is
-            user_rank = leaderboards.rank(
-                user.id, mode.value,
-                order_type, country
-            )
-            page = math.ceil(user_rank / items_per_page)
+    jumpto = request.args.get('jumpto', default=None)
+    jumpto_id = request.args.get('jumpto_id', default=None, type=int)
+    jumpto_user = None
+    friend_ids = []
+
+    if jumpto or jumpto_id or current_user.is_authenticated:
+        with app.session.database.managed_session() as session:
+            if jumpto:
+                jumpto_user = users.fetch_by_name_case_insensitive(jumpto, session)
+
+            if jumpto_id:
+                jumpto_user = users.fetch_by_id(jumpto_id, session=session) or jumpto_user
+
+            if current_user.is_authenticated:
+                friend_ids = relationships.fetch_target_ids(
+                    current_user.id,
+                    session=session
+                )
+
+    if jumpto_user:
+        # Change the page to where the user is
+        user_rank = leaderboards.rank(
+            jumpto_user.id, mode.value,
+            order_type, country
+        )
+        page = math.ceil(user_rank / items_per_page)
 
-        if jumpto_id and (user := users.fetch_by_id(jumpto_id, session=session)):
-            # Change the page to where the user is
-            user_rank = leaderboards.rank(
-                user.id, mode.value,
-                order_type, country
-            )
-            page = math.ceil(user_rank / items_per_page)
-            jumpto = user.name
+    order_name = order_name_mapping.get(order_type.lower())
+    site_title = (
+        f'{order_name} Ranking for '
+        f'{f"{COUNTRIES[country.upper()]}" if country else "All Locations"}'
+    )
+
+    # Leaderboard content is shared between all users, and
+    # gets personalized after it was loaded from the cache
+    content = app.pagecache.fetch(
+        f'rankings:{mode.value}:{order_type}:{country or "all"}:{page}',
+        lambda: render_rankings_content(
+            order_type, country,
+            mode, page,
+            items_per_page,
+            order_name,
+            site_title
+        ),
+        ttl=config.RANKINGS_CACHE_TTL
+    )
+
+    return utils.render_template(
+        'rankings.html',
+        css='rankings.css',
+        title=f'{order_name} Rankings - Titanic',
+        content=fill_user_fragments(
+            content,
+            friend_ids,
+            jumpto_user.id if jumpto_user else None
+        ),
+        canonical_url=request.base_url,
+        site_title=site_title
+    )
 
+def render_rankings_content(
+    order_type: str,
+    country: str,
+    mode: GameMode,
+    page: int,
+    items_per_page: int,
+    order_name: str,
+    site_title: str
+) -> str:
+    with app.session.database.managed_session() as session:
         leaderboard = leaderboards.top_players(
             mode.value,
             offset=(page - 1) * items_per_page,
@@ -109,19 +162,12 @@ def render_rankings_page(
             country=country
         )
 
-        # Fetch all users from leaderboard
-        users_db = users.fetch_many(
-            [user[0] for user in leaderboard],
+        # Fetch all users from leaderboard, sorted by redis leaderboard
+        users_with_score = utils.hydrate_leaderboard(
+            leaderboard,
             DBUser.stats,
             session=session
         )
-
-        # Sort users based on redis leaderboard
-        users_with_score = [
-            (next(filter(lambda user: id == user.id, users_db)), score)
-            for id, score in leaderboard
-            if score > 0
-        ]
         sorted_users = [
             user for user, _ in users_with_score
         ]
@@ -129,10 +175,9 @@ def render_rankings_page(
         # Ensure all users have stats & they are sorted
         ensure_user_stats(sorted_users, session)
 
-        if (time.time() - app.session.last_rank_sync) > 30:
-            # Sync ranks from cache to database in background once in a while
-            app.session.executor.submit(sync_ranks, sorted_users, mode)
-            app.session.last_rank_sync = time.time()
+        for user in sorted_users:
+            # Sync ranks from cache to database in background
+            app.ranksync.enqueue_user(user, mode.value)
 
         player_count = leaderboards.player_count(mode.value, order_type, country)
         total_pages = max(1, min(10000, math.ceil(player_count / items_per_page)))
@@ -143,20 +188,9 @@ def render_rankings_page(
 
         # Fetch top countries for country selection
         top_countries = top_countries_cached(mode)
-        order_name = order_name_mapping.get(order_type.lower())
 
-        friend_ids = (
-            relationships.fetch_target_ids(
-                current_user.id,
-                session=session
-            )
-            if current_user.is_authenticated else []
-        )
-
-        return utils.render_template(
-            'rankings.html',
-            css='rankings.css',
-            title=f'{order_name} Rankings - Titanic',
+        return utils.render_fragment(
+            'rankings/leaderboard.html',
             mode=mode.value,
             page=page,
             country=country,
@@ -167,25 +201,66 @@ def render_rankings_page(
             max_page_display=max_page_display,
             min_page_display=min_page_display,
             items_per_page=items_per_page,
-            canonical_url=request.base_url,
             order_name=order_name,
-            friends=friend_ids,
-            session=session,
-            jumpto=jumpto,
+            site_title=site_title,
             total_beatmaps=(
                 beatmaps.fetch_count_with_leaderboards(mode, session)
                 if order_type == 'clears' else 0
-            ),
-            site_title=(
-                f'{order_name} Ranking for '
-                f'{f"{COUNTRIES[country.upper()]}" if country else "All Locations"}'
             )
         )
 
+def fill_user_fragments(
+    content: str,
+    friend_ids: List[int],
+    jumpto_id: int | None
+) -> str:
+    """Apply the row highlighting for the current user to a cached leaderboard"""
+    friend_ids = set(friend_ids)
+    user_id = (
+        current_user.id
+        if current_user.is_authenticated
+        else None
+    )
+
+    def replace_row(match: re.Match) -> str:
+        player_id = int(match.group(1))
+
+        if player_id == jumpto_id:
+            return '<tr class="row-jumpto" id="jumpto">'
+
+        if player_id == user_id:
+            return '<tr class="row-self">'
+
+        if player_id in friend_ids:
+            return '<tr class="row-friend">'
+
+        return f'<tr class="{match.group(2)}">'
+
+    return row_placeholder.sub(replace_row, content)
+
 def render_country_page(
     items_per_page: int,
     page: int,
     mode: GameMode
+) -> str:
+    content = app.pagecache.fetch(
+        f'rankings:{mode.value}:country:all:{page}',
+        lambda: render_country_content(items_per_page, page, mode),
+        ttl=config.RANKINGS_CACHE_TTL
+    )
+
+    return utils.render_template(
+        'country.html',
+        css='country.css',
+        title='Country Rankings - Titanic',
+        site_title='Country Rankings',
+        content=content
+    )
+
+def render_country_content(
+    items_per_page: int,
+    page: int,
+    mode: GameMode
 ) -> str:
     # Get country ranking
     leaderboard = [country for country in leaderboards.top_countries(mode) if country['name'] != 'xx']
@@ -199,18 +274,15 @@ def render_country_page(
     max_page_display = max(page, min(total_pages, page + 8))
     min_page_display = max(1, min(total_pages, max_page_display - 9))
 
-    return utils.render_template(
-        'country.html',
-        css='country.css',
-        title='Country Rankings - Titanic',
+    return utils.render_fragment(
+        'rankings/country.html',
         mode=mode.value,
         page=page,
         total_pages=total_pages,
         leaderboard=leaderboard,
         max_page_display=max_page_display,
         min_page_display=min_page_display,
-        items_per_page=items_per_page,
-        site_title='Country Rankings'
+        items_per_page=items_per_page
     )
 
 def render_kudosu_page(items_per_page: int, page: int, session: Session) -> str:
@@ -229,20 +301,13 @@ def render_kudosu_page(items_per_page: int, page: int, session: Session) -> str:
     max_page_display = max(page, min(total_pages, page + 8))
     min_page_display = max(1, min(total_pages, max_page_display - 9))
 
-    # Fetch all users from leaderboard
-    users_db = users.fetch_many(
-        [user[0] for user in leaderboard],
+    # Fetch all users from leaderboard, sorted by redis leaderboard
+    sorted_users = utils.hydrate_leaderboard(
+        leaderboard,
         DBUser.stats,
         session=session
     )
 
-    # Sort users based on redis leaderboard
-    sorted_users = [
-        (next(filter(lambda user: id == user.id, users_db)), score)
-        for id, score in leaderboard
-        if score > 0
-    ]
-
     friend_ids = (
         relationships.fetch_target_ids(
             current_user.id,
@@ -271,11 +336,6 @@ def ensure_user_stats(users: List[DBUser], session: Session) -> None:
         user.stats = user.stats or create_user_stats(user, session)
         user.stats.sort(key=lambda s:s.mode)
 
-def sync_ranks(users: List[DBUser], mode: GameMode) -> None:
-    with app.session.database.managed_session() as session:
-        for user in users:
-            utils.sync_ranks(user, mode.value, session)
-
 def create_user_stats(user: DBUser, session) -> List[DBStats]:
     return [
         stats.create(user.id, 0, session),
@@ -3,13 +3,15 @@ from app.common.constants import GameMode
 from app.common.database import scores
 from flask import (
     Blueprint,
-    send_file,
+    Response,
     redirect,
+    request,
     abort
 )
+from urllib.parse import quote
 
+import unicodedata
 import app
-import io
 
 router = Blueprint('scores', __name__)
 
@@ -27,15 +29,51 @@ def download_replay(id: int):
         if not (score := scores.fetch_by_id(id, session)):
             return abort(404)
 
-        if not (replay := app.session.storage.get_full_replay_from_score(score)):
-            return redirect('about:blank')
-
         formatted_time = score.submitted_at.strftime("%Y-%m-%d %H-%M-%S")
         mode = GameMode(score.mode).name
+        filename = f'{score.user.name} - {score.beatmap.full_name} ({formatted_time}) {mode}.osr'
+
+        # The header is loaded while the session is still open,
+        # the frames are streamed from storage afterwards
+        if not (replay := app.replays.open_replay(score)):
+            return redirect('about:blank')
+
+    length = replay.length
+    start, stop = 0, length
+    status = 200
+
+    if app.replays.is_single_range(request.range):
+        if not (byte_range := request.range.range_for_length(length)):
+            return Response(
+                status=416,
+                headers={'Content-Range': f'bytes */{length}'}
+            )
+
+        start, stop = byte_range
+        status = 206
+
+    response = Response(
+        replay.iter_range(start, stop),
+        status=status,
+        mimetype='application/octet-stream',
+        direct_passthrough=True
+    )
+    response.headers.set('Content-Disposition', 'attachment', **content_disposition(filename))
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.content_length = stop - start
+
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+
+    return response
 
-        return send_file(
-            io.BytesIO(replay),
-            mimetype='application/octet-stream',
-            as_attachment=True,
-            download_name=f'{score.user.name} - {score.beatmap.full_name} ({formatted_time}) {mode}.osr'
-        )
+def content_disposition(filename: str) -> dict:
+    """Encode non-ascii filenames like send_file does (RFC 5987)"""
+    try:
+        filename.encode('ascii')
+        return {'filename': filename}
+    except UnicodeEncodeError:
+        return {
+            'filename': unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode(),
+            'filename*': f"UTF-8''{quote(filename, safe='')}"
+        }
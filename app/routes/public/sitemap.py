@@ -7,9 +7,13 @@ from dataclasses import dataclass, field
 from flask import Blueprint, Response
 from typing import List, Callable
 
+import hashlib
 import config
 import app
 
+# Amount of seconds that the modification time of a sitemap's content is kept
+LAST_MODIFIED_TTL = 60*60*24*7
+
 @dataclass
 class SitemapEntry:
     location: str
@@ -21,9 +25,8 @@ class SitemapIndex:
     sitemaps: List['Sitemap']
 
     def render(self) -> str:
-        for entry in self.sitemaps:
-            entry.refresh()
-
+        # The index only lists the locations of the sitemaps,
+        # which means they don't need to be refreshed here
         return (
             '<?xml version="1.0" encoding="UTF-8"?>' +
             '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' +
@@ -41,23 +44,34 @@ class Sitemap:
     location: str
     generator: Callable
     entries: List[SitemapEntry] = field(default_factory=list)
-    last_modified: datetime = datetime.now()
+    content: str = ''
+    etag: str = ''
+    last_modified: datetime | None = None
+    refreshed_at: datetime | None = None
     refresh_interval: timedelta = timedelta(hours=1)
 
     def refresh(self) -> None:
         time_since_refresh = (
-            datetime.now() - self.last_modified
+            datetime.now() - (self.refreshed_at or datetime.min)
         )
 
         if time_since_refresh < self.refresh_interval and self.entries:
             return
 
         self.entries = self.generator()
-        self.last_modified = datetime.now()
+        self.content = self.render_entries()
+
+        # Every worker refreshes on its own, so the validators are based on the content,
+        # and the time it was first seen, to stay the same across all workers
+        self.etag = content_hash(self.content)
+        self.last_modified = fetch_last_modified(self.location, self.etag)
+        self.refreshed_at = datetime.now()
 
     def render(self) -> str:
         self.refresh()
+        return self.content
 
+    def render_entries(self) -> str:
         return (
             '<?xml version="1.0" encoding="UTF-8"?>' +
             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' +
@@ -72,6 +86,27 @@ class Sitemap:
             '</urlset>'
         )
 
+def content_hash(content: str) -> str:
+    return hashlib.md5(content.encode()).hexdigest()
+
+def last_modified_key(location: str, etag: str) -> str:
+    return f'stern:sitemaps:last_modified:{location}:{etag}'
+
+def fetch_last_modified(location: str, etag: str) -> datetime:
+    """Return the time a sitemap's content was first seen by any worker"""
+    key = last_modified_key(location, etag)
+    now = datetime.now()
+
+    try:
+        # Only the first worker to see this content gets to set the time
+        app.session.redis.set(key, now.timestamp(), nx=True, ex=LAST_MODIFIED_TTL)
+        timestamp = app.session.redis.get(key)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to fetch sitemap modification time: {e}')
+        return now
+
+    return datetime.fromtimestamp(float(timestamp)) if timestamp else now
+
 def get_main_sites() -> List[SitemapEntry]:
     return [
         SitemapEntry('/', 1.0),
@@ -152,8 +187,21 @@ def get_recent_beatmaps() -> List[SitemapEntry]:
 
 router = Blueprint('sitemap', __name__)
 
+def sitemap_response(render: Callable[[], str], etag: str, last_modified: datetime | None = None) -> Response:
+    # Sitemaps only change when they are refreshed, so the
+    # validators can be used to skip rendering them
+    return app.conditional.respond(
+        lambda: Response(render(), mimetype='application/xml'),
+        etag=etag,
+        last_modified=last_modified
+    )
+
+def render_sitemap(entry: Sitemap) -> Response:
+    entry.refresh()
+    return sitemap_response(entry.render, entry.etag, entry.last_modified)
+
 def register_sitemap_url(entry: Sitemap) -> None:
-    view_func = lambda entry=entry: Response(entry.render(), mimetype='application/xml')
+    view_func = lambda entry=entry: render_sitemap(entry)
     view_func.__name__ = f'sitemap_{entry.generator.__name__}'
     router.add_url_rule(
         entry.location,
@@ -178,9 +226,12 @@ index_sitemap = SitemapIndex(
 for entry in index_sitemap.sitemaps:
     register_sitemap_url(entry)
 
+# The index only contains the locations of the sitemaps, so it never changes
+index_etag = content_hash(index_sitemap.render())
+
 @router.get('/sitemap.xml')
 def sitemap_xml():
-    return Response(
-        index_sitemap.render(),
-        mimetype='application/xml'
+    return sitemap_response(
+        index_sitemap.render,
+        index_etag
     )
@@ -1,21 +1,8 @@
 
-from app.common.database.repositories import (
-    collaborations,
-    relationships,
-    infringements,
-    nominations,
-    beatmapsets,
-    activities,
-    modding,
-    groups,
-    names,
-    users,
-    stats
-)
+from app.common.database.repositories import names, users
 
 from flask import Response, abort, Blueprint, redirect, request
-from app.common.constants import GameMode, DatabaseStatus
-from app.common.cache import status, leaderboards
+from app.common.constants import GameMode
 from app.common.database.objects import DBUser
 from sqlalchemy.orm import Session
 
@@ -24,7 +11,7 @@ import utils
 import app
 
 router = Blueprint('users', __name__)
-preload = (DBUser.favourites, DBUser.relationships, DBUser.achievements)
+preload = (DBUser.favourites, DBUser.relationships)
 
 @router.get('/<query>')
 def userpage(query: str):
@@ -49,82 +36,18 @@ def userpage(query: str):
         if mode_query and mode_query.isdigit():
             mode = int(mode_query)
 
-        if user.restricted:
-            infs = infringements.fetch_all(
-                user.id,
-                session=session
-            )
-
-        else:
-            infs = infringements.fetch_recent_until(
-                user.id,
-                session=session
-            )
+        mode = int(mode)
 
-        followers = relationships.fetch_count_by_target(
-            user.id,
-            session=session
-        )
-
-        user_beatmapsets = beatmapsets.fetch_by_creator(
-            user.id,
-            session=session
-        )
+        profile = app.profile.load(user, mode, session)
+        pp_rank = profile.rank("performance")
+        pp_rank_country = profile.rank("performance", "country")
 
-        beatmapset_categories = {
-            'Ranked': [
-                s for s in user_beatmapsets
-                if s.status in (DatabaseStatus.Ranked, DatabaseStatus.Approved)
-            ],
-            'Loved': [
-                s for s in user_beatmapsets
-                if s.status == DatabaseStatus.Loved
-            ],
-            'Qualified': [
-                s for s in user_beatmapsets
-                if s.status == DatabaseStatus.Qualified
-            ],
-            'Pending': [
-                s for s in user_beatmapsets
-                if s.status == DatabaseStatus.Pending
-            ],
-            'WIP': [
-                s for s in user_beatmapsets
-                if s.status == DatabaseStatus.WIP
-            ],
-            'Graveyarded': [
-                s for s in user_beatmapsets
-                if s.status == DatabaseStatus.Graveyard
-            ]
-        }
-        
-        rankings = leaderboards.player_rankings(
-            user.id, mode, user.country,
-            leaderboards=(
-                "performance",
-                "rscore",
-                "tscore",
-                "ppv1",
-                "leader"
+        if profile.current_stats and profile.current_stats.playcount > 0:
+            # Sync cached rank with database in background
+            app.ranksync.enqueue(
+                user.id, mode, user.country,
+                profile.current_stats.rank
             )
-        )
-
-        pp_ranking = rankings.get("performance", None)
-        pp_rank = pp_ranking["global"] if pp_ranking else None
-        pp_rank_country = pp_ranking["country"] if pp_ranking else None
-
-        score_ranking = rankings.get("rscore", None)
-        score_rank = score_ranking["global"] if score_ranking else None
-        score_rank_country = score_ranking["country"] if score_ranking else None
-
-        tscore_ranking = rankings.get("tscore", None)
-        total_score_rank = tscore_ranking["global"] if tscore_ranking else None
-
-        firsts_ranking = rankings.get("leader", None)
-        firsts_rank = firsts_ranking["global"] if firsts_ranking else None
-
-        ppv1_ranking = rankings.get("ppv1", None)
-        ppv1_rank = ppv1_ranking["global"] if ppv1_ranking else None
 
         return utils.render_template(
             template_name='user.html',
@@ -133,33 +56,33 @@ def userpage(query: str):
             css='user.css',
             title=f"{user.name} - Titanic",
             site_title=f"{user.name} - Player Info",
-            site_description=f"Rank ({GameMode(int(mode)).formatted}): Global: #{pp_rank or '-'} | Country: #{pp_rank_country or '-'}",
+            site_description=f"Rank ({GameMode(mode).formatted}): Global: #{pp_rank or '-'} | Country: #{pp_rank_country or '-'}",
             site_image=f'{config.OSU_BASEURL}{app.filters.avatar_url(user)}',
             site_url=f"{config.OSU_BASEURL}/u/{user.id}",
             canonical_url=f"/u/{user.id}",
-            is_online=status.exists(user.id),
+            is_online=profile.is_online,
             achievement_categories=app.constants.ACHIEVEMENTS,
-            achievements={a.name:a for a in user.achievements},
-            collaborations=collaborations.fetch_beatmaps_by_user(user.id, session=session),
-            total_kudosu=modding.total_amount_by_user(user.id, session=session),
-            recent_mods=modding.fetch_range_by_user(user.id, session=session),
-            nominations_bancho=nominations.fetch_by_user_and_server(user.id, 0, session=session),
-            nominations_titanic=nominations.fetch_by_user_and_server(user.id, 1, session=session),
-            activity=activities.fetch_recent(user.id, int(mode), session=session),
-            current_stats=stats.fetch_by_mode(user.id, int(mode), session=session),
-            total_posts=users.fetch_post_count(user.id, session=session),
-            groups=groups.fetch_user_groups(user.id, session=session),
-            beatmapset_categories=beatmapset_categories,
-            total_score_rank=total_score_rank,
-            score_rank_country=score_rank_country,
-            score_rank=score_rank,
+            achievements=profile.achievements,
+            collaborations=profile.collaborations,
+            total_kudosu=profile.total_kudosu,
+            recent_mods=profile.recent_mods,
+            nominations_bancho=profile.nominations_bancho,
+            nominations_titanic=profile.nominations_titanic,
+            activity=profile.activity,
+            current_stats=profile.current_stats,
+            total_posts=profile.total_posts,
+            groups=profile.groups,
+            beatmapset_categories=profile.beatmapset_categories,
+            total_score_rank=profile.rank("tscore"),
+            score_rank_country=profile.rank("rscore", "country"),
+            score_rank=profile.rank("rscore"),
             pp_rank_country=pp_rank_country,
             pp_rank=pp_rank,
-            ppv1_rank=ppv1_rank,
-            firsts_rank=firsts_rank,
-            followers=followers,
-            infringements=infs,
-            rankings=rankings,
+            ppv1_rank=profile.rank("ppv1"),
+            firsts_rank=profile.rank("leader"),
+            followers=profile.followers,
+            infringements=profile.infringements,
+            rankings=profile.rankings,
             session=session
         )
 
@@ -23,6 +23,8 @@ def home_wiki_page(language: str):
     available_languages.pop(language.lower())
 
     with app.session.database.managed_session() as session:
+        home = wiki.home.fetch_home(language.lower(), session)
+
         return utils.render_template(
             f'wiki/home/{language.lower()}.html',
             css='wiki.css',
@@ -33,13 +35,11 @@ def home_wiki_page(language: str):
             source_url=wiki.GITHUB_BASEURL,
             discussion_url=f'{wiki.GITHUB_BASEURL}/pulls',
             history_url=wiki.HISTORY_BASEURL,
-            page_count=wiki.fetch_page_count(session=session),
-            categories=wiki.fetch_main_categories(session=session),
+            page_count=home.page_count,
+            categories=home.categories,
             available_languages=available_languages,
             requested_language=language,
-            language=language,
-            session=session,
-            wiki=wiki
+            language=language
         )
 
 @router.get('/<language>/search/')
@@ -48,8 +48,11 @@ def wiki_search_page(language: str):
         return abort(404)
 
     query = request.args.get('query', None)
+    results = (
+        wiki.search.search(query[:256], language.lower())
+        if query else []
+    )
 
-    # TODO: Implement search functionality
     return utils.render_template(
         f'wiki/search/{language.lower()}.html',
         css='wiki.css',
@@ -58,7 +61,8 @@ def wiki_search_page(language: str):
         canonical_url=f'/wiki/en/search',
         requested_language=language,
         language=language,
-        search_query=query
+        search_query=query,
+        results=results
     )
 
 @router.get('/<language>/<path:path>')
@@ -82,7 +86,7 @@ def wiki_page(path: str, language: str = config.WIKI_DEFAULT_LANGUAGE):
         return utils.render_template(
             f'wiki/content/{language}.html',
             css='wiki.css',
-            content=wiki.process_markdown(entry.content),
+            content=wiki.fetch_html(entry),
             title=f'{entry.title} - Titanic! Wiki',
             site_title=f'{entry.title} - Titanic! Wiki',
             site_url=f'/wiki/en/{path}',
@@ -31,7 +31,6 @@ events = EventQueue(
 )
 
 logger = logging.getLogger('stern')
-last_rank_sync = time.time()
 startup_time = time.time()
 
 storage = Storage()
@@ -0,0 +1,284 @@
+
+from app.common.database import DBForumTopic, topics
+from sqlalchemy import update, values, column, Integer
+from threading import Lock, Thread, Event
+from typing import Dict, Iterable
+
+import secrets
+import config
+import atexit
+import time
+import app
+import os
+
+# View increments that were not yet written to the database, keyed by topic id
+PENDING_KEY = 'stern:topics:views:pending'
+AVERAGE_KEY = 'stern:topics:views:average'
+
+# Set of the keys, whose views are currently being written by a worker.
+# Every flush key contains the time it was created at, so that flushes of
+# workers that exited in between can be told apart from running ones.
+FLUSHING_KEY = f'{PENDING_KEY}:flushing'
+
+# Amount of seconds until the average views per topic are recalculated
+AVERAGE_TTL = 60 * 5
+
+# Amount of seconds after which an unfinished flush is considered orphaned
+FLUSH_TIMEOUT = 60 * 5
+
+# Move the pending views to a flush key & register it in the same step,
+# so that they can't get lost if the worker exits in between
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('SADD', KEYS[3], KEYS[2])
+return 1
+"""
+
+# Move the views of an orphaned flush to a new flush key,
+# only if no other worker has recovered them already
+RECOVER_SCRIPT = """
+if redis.call('SREM', KEYS[3], KEYS[1]) == 0 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('SADD', KEYS[3], KEYS[2])
+return 1
+"""
+
+counters = {
+    'views': 0,
+    'duplicates': 0,
+    'flushes': 0,
+    'flushed_topics': 0,
+    'flushed_views': 0
+}
+
+lock = Lock()
+shutdown_event = Event()
+flusher_thread: Thread | None = None
+flusher_pid: int | None = None
+
+def record_view(topic_id: int, ip_address: str) -> bool:
+    """Count a view of a topic, at most once per minute for every ip address"""
+    try:
+        is_new_view = app.session.redis.set(
+            f'forums:viewlock:{topic_id}:{ip_address}', 1,
+            nx=True, ex=config.TOPIC_VIEW_LOCK_TIME
+        )
+
+        if not is_new_view:
+            increment('duplicates')
+            return False
+
+        app.session.redis.hincrby(PENDING_KEY, topic_id, 1)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to record topic view: {e}')
+        return False
+
+    increment('views')
+    ensure_flusher()
+    return True
+
+def fetch_pending(topic_ids: Iterable[int]) -> Dict[int, int]:
+    """Fetch the views of multiple topics, which were not yet written to the database"""
+    topic_ids = list(topic_ids)
+
+    if not topic_ids:
+        return {}
+
+    try:
+        results = app.session.redis.hmget(PENDING_KEY, topic_ids)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read pending topic views: {e}')
+        return {}
+
+    return {
+        topic_id: int(pending)
+        for topic_id, pending in zip(topic_ids, results)
+        if pending is not None
+    }
+
+def fetch_average_views() -> int:
+    """Fetch the average amount of views per topic, which is recalculated every few minutes"""
+    try:
+        if (average := app.session.redis.get(AVERAGE_KEY)) is not None:
+            return int(average)
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read average topic views: {e}')
+
+    return update_average_views()
+
+def update_average_views() -> int:
+    average = int(topics.fetch_average_views())
+
+    try:
+        app.session.redis.set(
+            AVERAGE_KEY, average,
+            ex=AVERAGE_TTL
+        )
+    except Exception as e:
+        app.session.logger.warning(f'Failed to store average topic views: {e}')
+
+    return average
+
+def flush_key() -> str:
+    return f'{FLUSHING_KEY}:{int(time.time())}:{secrets.token_hex(8)}'
+
+def flush() -> None:
+    """Write all pending views to the database in a single statement"""
+    # Take ownership of the pending views, so that new views
+    # can be counted while the database is being updated
+    key = flush_key()
+
+    if not app.session.redis.eval(CLAIM_SCRIPT, 3, PENDING_KEY, key, FLUSHING_KEY):
+        # There are no pending views
+        return
+
+    pending = {
+        int(topic_id): int(views)
+        for topic_id, views in app.session.redis.hgetall(key).items()
+    }
+
+    try:
+        write_views(pending)
+    except Exception as e:
+        app.session.logger.error(
+            f'Failed to flush topic views: {e}',
+            exc_info=e
+        )
+
+        # Put the views back, to retry them on the next flush
+        requeue(key, pending)
+        return
+
+    pipeline = app.session.redis.pipeline()
+    pipeline.delete(key)
+    pipeline.srem(FLUSHING_KEY, key)
+    pipeline.execute()
+
+    with lock:
+        counters['flushes'] += 1
+        counters['flushed_topics'] += len(pending)
+        counters['flushed_views'] += sum(pending.values())
+
+def requeue(key: str, pending: Dict[int, int]) -> None:
+    pipeline = app.session.redis.pipeline()
+
+    for topic_id, views in pending.items():
+        pipeline.hincrby(PENDING_KEY, topic_id, views)
+
+    pipeline.delete(key)
+    pipeline.srem(FLUSHING_KEY, key)
+    pipeline.execute()
+
+def recover_orphaned_views() -> None:
+    """Put back views of flushes, whose worker exited before finishing them"""
+    deadline = time.time() - FLUSH_TIMEOUT
+
+    for orphan in app.session.redis.smembers(FLUSHING_KEY):
+        orphan = orphan.decode()
+        started = int(orphan.removeprefix(f'{FLUSHING_KEY}:').split(':')[0])
+
+        if started > deadline:
+            # The flush may still be running
+            continue
+
+        # Take ownership, in case other workers are recovering at the same time
+        key = flush_key()
+
+        if not app.session.redis.eval(RECOVER_SCRIPT, 3, orphan, key, FLUSHING_KEY):
+            continue
+
+        pending = {
+            int(topic_id): int(views)
+            for topic_id, views in app.session.redis.hgetall(key).items()
+        }
+
+        requeue(key, pending)
+        app.session.logger.info(
+            f'Recovered {sum(pending.values())} topic views of an unfinished flush'
+        )
+
+def write_views(pending: Dict[int, int]) -> None:
+    if not pending:
+        return
+
+    rows = values(
+        column('id', Integer),
+        column('views', Integer),
+        name='views'
+    ).data(list(pending.items()))
+
+    statement = (
+        update(DBForumTopic)
+        .where(DBForumTopic.id == rows.c.id)
+        .values(views=DBForumTopic.views + rows.c.views)
+    )
+
+    with app.session.database.managed_session() as session:
+        session.execute(statement)
+        session.commit()
+
+def flusher() -> None:
+    try:
+        recover_orphaned_views()
+    except Exception as e:
+        app.session.logger.error(
+            f'Failed to recover topic views: {e}',
+            exc_info=e
+        )
+
+    while not shutdown_event.wait(config.TOPIC_VIEWS_FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception as e:
+            app.session.logger.error(
+                f'Topic view flusher failed: {e}',
+                exc_info=e
+            )
+
+    # Write out the remaining views before exiting
+    flush()
+
+def ensure_flusher() -> None:
+    """Start the background flusher for the current process, if not running"""
+    global flusher_thread, flusher_pid
+
+    if flusher_thread and flusher_thread.is_alive() and flusher_pid == os.getpid():
+        return
+
+    with lock:
+        if flusher_thread and flusher_thread.is_alive() and flusher_pid == os.getpid():
+            return
+
+        flusher_pid = os.getpid()
+        flusher_thread = Thread(
+            target=flusher,
+            name='topic-view-flusher',
+            daemon=True
+        )
+        flusher_thread.start()
+
+def stop() -> None:
+    """Stop the background flusher & write out pending views"""
+    shutdown_event.set()
+
+    if flusher_thread and flusher_thread.is_alive():
+        flusher_thread.join(timeout=5)
+
+def increment(counter: str) -> None:
+    with lock:
+        counters[counter] += 1
+
+def metrics() -> Dict[str, int]:
+    """Return a snapshot of the topic view counters"""
+    with lock:
+        return dict(counters)
+
+atexit.register(stop)
@@ -3,4 +3,9 @@ from app.common.database.repositories.wiki import *
 
 from .engine import fetch_page, format_path
 from .processor import process_markdown
+from .cache import fetch_html
+from . import repository
+from . import sync
+from . import search
+from . import home
 from .constants import *
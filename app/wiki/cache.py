@@ -0,0 +1,41 @@
+
+from app.common.database import DBWikiContent
+from .processor import process_markdown, PROCESSOR_VERSION
+
+import hashlib
+import config
+import app
+
+def html_key(page_id: int, language: str, content: str) -> str:
+    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    return (
+        f'stern:wiki:html:{page_id}:{language}'
+        f':{PROCESSOR_VERSION}:{content_hash}'
+    )
+
+def fetch_html(entry: DBWikiContent) -> str:
+    """Fetch the rendered html of a wiki page, or render it if it was not cached yet"""
+    key = html_key(entry.page_id, entry.language, entry.content)
+
+    try:
+        if (html := app.session.redis.get(key)) is not None:
+            return html.decode()
+    except Exception as e:
+        app.session.logger.warning(f'Failed to read wiki cache: {e}')
+
+    return render(entry, key)
+
+def render(entry: DBWikiContent, key: str | None = None) -> str:
+    """Render a wiki page & store the result in the cache"""
+    html = process_markdown(entry.content)
+    store(key or html_key(entry.page_id, entry.language, entry.content), html)
+    return html
+
+def store(key: str, html: str) -> None:
+    try:
+        app.session.redis.set(
+            key, html,
+            ex=config.WIKI_HTML_CACHE_TTL
+        )
+    except Exception as e:
+        app.session.logger.warning(f'Failed to write wiki cache: {e}')
@@ -3,6 +3,7 @@ from __future__ import annotations
 from app.common.database import DBWikiPage, DBWikiContent, wiki
 from app.wiki.constants import CONTENT_BASEURL, WIKI_LINK_REGEX
 from app.common.helpers import caching
+from app.wiki import cache, repository, sync, home
 from typing import Set, Tuple, List
 from sqlalchemy.orm import Session
 
@@ -14,6 +15,11 @@ logger = logging.getLogger("wiki")
 
 def fetch_page(path: str, language: str, session: Session) -> Tuple[DBWikiPage, DBWikiContent] | None:
     """Fetch a wiki page, or create it if it doesn't exist"""
+    if sync.is_synchronized():
+        # Pages are kept up-to-date by the background sync
+        repository.update_in_background()
+        return fetch_synchronized_page(path, language, session)
+
     if not (page := wiki.fetch_page_by_path(get_page_path(path), session)):
         logger.info(f"Page '{path}' not found in database, creating...")
         return create_page(path, language, session)
@@ -47,17 +53,51 @@ def fetch_page(path: str, language: str, session: Session) -> Tuple[DBWikiPage,
             language,
             session=session
         )
+        home.invalidate()
         return page, content
     
     return page, update_content(page.path, content, session)
 
-@caching.ttl_cache(ttl=60*5)
 def fetch_markdown_cached(path: str, language: str) -> str | None:
     """Fetch the raw markdown text of a wiki page, with caching"""
-    return fetch_markdown(path, language)
+    if repository.is_available():
+        # Reading from the local repository is cheap enough
+        return fetch_markdown(path, language)
+
+    return fetch_remote_markdown_cached(path, language)
 
 def fetch_markdown(path: str, language: str) -> str | None:
     """Fetch the raw markdown text of a wiki page"""
+    if not repository.is_available():
+        return fetch_remote_markdown(path, language)
+
+    if (markdown := repository.fetch_markdown(path, language)) is None:
+        return None
+
+    return sanitize_markdown(markdown)
+
+def fetch_synchronized_page(path: str, language: str, session: Session) -> Tuple[DBWikiPage, DBWikiContent] | None:
+    """Fetch a wiki page from the database, without creating or updating it"""
+    if not (page := wiki.fetch_page_by_path(get_page_path(path), session)):
+        return None
+
+    content = (
+        wiki.fetch_content(page.id, language, session=session) or
+        wiki.fetch_content(page.id, config.WIKI_DEFAULT_LANGUAGE, session=session)
+    )
+
+    if not content:
+        return None
+
+    return page, content
+
+@caching.ttl_cache(ttl=60*5)
+def fetch_remote_markdown_cached(path: str, language: str) -> str | None:
+    """Fetch the raw markdown text of a wiki page from github, with caching"""
+    return fetch_remote_markdown(path, language)
+
+def fetch_remote_markdown(path: str, language: str) -> str | None:
+    """Fetch the raw markdown text of a wiki page from github"""
     response = app.session.requests.get(
         f'{CONTENT_BASEURL}/{path.replace(" ", "_").removesuffix("/")}/{language}.md',
         allow_redirects=True
@@ -95,6 +135,8 @@ def create_page(path: str, language: str, session: Session) -> Tuple[DBWikiPage,
         f"Page '{path}' created in default language"
     )
 
+    home.invalidate()
+
     create_outlinks(
         page.id,
         default_content_markdown,
@@ -123,6 +165,7 @@ def create_page(path: str, language: str, session: Session) -> Tuple[DBWikiPage,
         session=session
     )
 
+    home.invalidate()
     return page, content
 
 def update_content(
@@ -147,6 +190,7 @@ def update_content(
         wiki.delete_outlinks(entry.page_id, session)
         wiki.delete_content(entry.page_id, session)
         wiki.delete_page(entry.page_id, session)
+        home.invalidate()
         return entry
 
     if content_markdown == entry.content:
@@ -167,6 +211,10 @@ def update_content(
     )
 
     entry.content = content_markdown
+    home.invalidate()
+
+    # Pre-render the new content, since the cached html is keyed by the content hash
+    cache.render(entry)
     return entry
 
 def create_outlinks(page_id: int, content: str, session: Session) -> List[DBWikiPage]:
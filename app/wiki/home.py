@@ -0,0 +1,113 @@
+
+from app.common.database import DBWikiContent, wiki
+from dataclasses import dataclass, asdict
+from sqlalchemy.orm import Session
+from typing import Dict, List
+
+from .constants import LANGUAGES
+
+import logging
+import config
+import json
+import app
+
+logger = logging.getLogger("wiki")
+
+@dataclass
+class HomePage:
+    id: int
+    name: str
+    path: str
+    title: str | None
+
+@dataclass
+class HomeCategory:
+    name: str
+    translations: Dict[str, str]
+    pages: List[HomePage]
+
+@dataclass
+class HomeModel:
+    page_count: int
+    categories: List[HomeCategory]
+
+def home_key(language: str) -> str:
+    return f'stern:wiki:home:{language}'
+
+def fetch_home(language: str, session: Session) -> HomeModel:
+    """Fetch everything that is displayed on the wiki home page, in the given language"""
+    try:
+        if (cached := app.session.redis.get(home_key(language))) is not None:
+            return deserialize(json.loads(cached))
+    except Exception as e:
+        logger.warning(f"Failed to read wiki home cache: '{e}'")
+
+    model = create_home(language, session)
+
+    try:
+        app.session.redis.set(
+            home_key(language),
+            json.dumps(asdict(model)),
+            ex=config.WIKI_HOME_CACHE_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Failed to write wiki home cache: '{e}'")
+
+    return model
+
+def create_home(language: str, session: Session) -> HomeModel:
+    categories = wiki.fetch_main_categories(session=session)
+    page_ids = {page.id for category in categories for page in category.pages}
+    titles = fetch_translated_titles(page_ids, language, session)
+
+    return HomeModel(
+        page_count=wiki.fetch_page_count(session=session),
+        categories=[
+            HomeCategory(
+                name=category.name,
+                translations=dict(category.translations or {}),
+                pages=[
+                    HomePage(
+                        id=page.id,
+                        name=page.name,
+                        path=page.path,
+                        title=titles.get(page.id)
+                    )
+                    for page in sorted(category.pages, key=lambda page: page.id)
+                ]
+            )
+            for category in categories
+        ]
+    )
+
+def fetch_translated_titles(page_ids: set, language: str, session: Session) -> Dict[int, str]:
+    """Fetch the titles of multiple pages in the given language, in a single query"""
+    if not page_ids or language == config.WIKI_DEFAULT_LANGUAGE:
+        return {}
+
+    return dict(
+        session.query(DBWikiContent.page_id, DBWikiContent.title)
+            .filter(DBWikiContent.page_id.in_(page_ids))
+            .filter(DBWikiContent.language == language)
+            .all()
+    )
+
+def deserialize(data: dict) -> HomeModel:
+    return HomeModel(
+        page_count=data['page_count'],
+        categories=[
+            HomeCategory(
+                name=category['name'],
+                translations=category['translations'],
+                pages=[HomePage(**page) for page in category['pages']]
+            )
+            for category in data['categories']
+        ]
+    )
+
+def invalidate() -> None:
+    """Remove the cached home pages, e.g. after pages were added or translated"""
+    try:
+        app.session.redis.delete(*(home_key(language) for language in LANGUAGES))
+    except Exception as e:
+        logger.warning(f"Failed to invalidate wiki home cache: '{e}'")
@@ -0,0 +1,42 @@
+
+from app.common.database import DBWikiContent
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+from .processor import process_markdown
+from .cache import html_key, store
+
+import logging
+import os
+import app
+
+logger = logging.getLogger("wiki")
+
+def render_entry(entry: Tuple[int, str, str]) -> Tuple[str, str]:
+    """Render a single (page_id, language, content) entry inside of a worker process"""
+    page_id, language, content = entry
+    return html_key(page_id, language, content), process_markdown(content)
+
+def prerender_all(workers: int | None = None) -> int:
+    """Render every wiki page into the html cache, spread across all cpu cores"""
+    with app.session.database.managed_session() as session:
+        entries = [
+            (page_id, language, content)
+            for page_id, language, content in session.query(
+                DBWikiContent.page_id,
+                DBWikiContent.language,
+                DBWikiContent.content
+            )
+        ]
+
+    logger.info(f'Pre-rendering {len(entries)} wiki pages...')
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for key, html in executor.map(render_entry, entries, chunksize=16):
+            store(key, html)
+
+    logger.info(f'Pre-rendered {len(entries)} wiki pages.')
+    return len(entries)
+
+if __name__ == '__main__':
+    prerender_all()
@@ -1,37 +1,130 @@
 
 from app.wiki.extensions import WikiLinks
+from queue import Queue, Empty
+from threading import Lock
 from markdown import Markdown
+from typing import Dict
 
-MarkdownInstance = Markdown(
-    extensions=[
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.toc',
-        'markdown.extensions.abbr',
-        'markdown.extensions.footnotes',
-        'markdown.extensions.meta',
-        'app.wiki.extensions.wikilinks',
-    ],
-    extension_configs={
-        'markdown.extensions.toc': {
-            'title': 'Contents',
-            'marker': '[TOC]',
-        },
-        'markdown.extensions.footnotes': {
-            'PLACE_MARKER': '// Footnotes //',
-            'UNIQUE_IDS': True,
-        },
-        'app.wiki.extensions.wikilinks': {
-            'base_url': '/wiki/',
-            'end_url': '',
-            'html_class': 'wikilink',
-            'build_url': WikiLinks.buildUrl,
+import config
+import time
+
+# Increment this whenever the extensions or their configuration
+# change, to invalidate all previously rendered pages
+PROCESSOR_VERSION = 1
+
+def create_processor() -> Markdown:
+    return Markdown(
+        extensions=[
+            'markdown.extensions.tables',
+            'markdown.extensions.fenced_code',
+            'markdown.extensions.codehilite',
+            'markdown.extensions.toc',
+            'markdown.extensions.abbr',
+            'markdown.extensions.footnotes',
+            'markdown.extensions.meta',
+            'app.wiki.extensions.wikilinks',
+        ],
+        extension_configs={
+            'markdown.extensions.toc': {
+                'title': 'Contents',
+                'marker': '[TOC]',
+            },
+            'markdown.extensions.footnotes': {
+                'PLACE_MARKER': '// Footnotes //',
+                'UNIQUE_IDS': True,
+            },
+            'app.wiki.extensions.wikilinks': {
+                'base_url': '/wiki/',
+                'end_url': '',
+                'html_class': 'wikilink',
+                'build_url': WikiLinks.buildUrl,
+            }
         }
-    }
-)
+    )
+
+# Markdown instances keep state while converting, so every
+# instance may only be used by one thread at a time
+pool: Queue = Queue(maxsize=config.WIKI_PROCESSOR_POOL_SIZE)
+pool_size = 0
+
+counters = {
+    'conversions': 0,
+    'processors': 0,
+    'convert_time_ms': 0.0,
+    'max_convert_time_ms': 0.0,
+    'wait_time_ms': 0.0,
+    'max_wait_time_ms': 0.0
+}
+
+lock = Lock()
+
+def acquire_processor() -> Markdown:
+    """Take an idle processor from the pool, or create one if the pool is not full yet"""
+    global pool_size
+
+    try:
+        return pool.get_nowait()
+    except Empty:
+        pass
+
+    with lock:
+        # Reserve a slot in the pool, so that concurrent
+        # requests can't create more processors than allowed
+        if pool_size < config.WIKI_PROCESSOR_POOL_SIZE:
+            pool_size += 1
+            create = True
+        else:
+            create = False
+
+    if create:
+        try:
+            processor = create_processor()
+        except Exception:
+            # Give the slot back, otherwise the pool would shrink with
+            # every failure, until every request waits forever
+            with lock:
+                pool_size -= 1
+            raise
+
+        with lock:
+            counters['processors'] += 1
+
+        return processor
+
+    # All processors are busy, wait for one to be released
+    return pool.get()
+
+def release_processor(processor: Markdown) -> None:
+    pool.put_nowait(processor)
 
 def process_markdown(text: str) -> str:
     """Process markdown text into HTML"""
-    MarkdownInstance.reset()
-    return MarkdownInstance.convert(text)
+    wait_start = time.perf_counter()
+    processor = acquire_processor()
+    convert_start = time.perf_counter()
+
+    try:
+        processor.reset()
+        return processor.convert(text)
+    finally:
+        release_processor(processor)
+        record_timings(
+            (convert_start - wait_start) * 1000,
+            (time.perf_counter() - convert_start) * 1000
+        )
+
+def record_timings(wait_time: float, convert_time: float) -> None:
+    with lock:
+        counters['conversions'] += 1
+        counters['wait_time_ms'] += wait_time
+        counters['convert_time_ms'] += convert_time
+        counters['max_wait_time_ms'] = max(counters['max_wait_time_ms'], wait_time)
+        counters['max_convert_time_ms'] = max(counters['max_convert_time_ms'], convert_time)
+
+def metrics() -> Dict[str, float]:
+    """Return a snapshot of the processor pool counters"""
+    with lock:
+        return {
+            **counters,
+            'idle_processors': pool.qsize()
+        }
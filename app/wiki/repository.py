@@ -0,0 +1,219 @@
+
+from git import Repo, Blob, Commit, Tree
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Set
+
+import tempfile
+import logging
+import shutil
+import config
+import time
+import os
+
+logger = logging.getLogger("wiki")
+
+# Local mirror of the wiki repository, which is used instead of
+# fetching every page from raw.githubusercontent.com
+repository: Repo | None = None
+current_commit: Commit | None = None
+
+# Markdown blobs by their path relative to WIKI_REPOSITORY_PATH, e.g. "Ranking_Criteria/en.md"
+index: Dict[str, Blob] = {}
+
+# Functions that are called after every background update
+listeners: List[Callable[[], None]] = []
+
+lock = Lock()
+# GitPython reads objects through a single persistent "git cat-file" process
+read_lock = Lock()
+last_update: float = 0
+update_thread: Thread | None = None
+
+def initialize_repository() -> None:
+    """Open the local mirror of the wiki repository, or clone it if it doesn't exist yet"""
+    global repository
+
+    try:
+        if not os.path.isdir(config.WIKI_REPOSITORY_LOCAL_PATH):
+            # Disable cloning in debug mode
+            if config.DEBUG:
+                return
+
+            clone_repository()
+
+        local_repository = Repo(config.WIKI_REPOSITORY_LOCAL_PATH)
+        load_commit(local_repository.commit(f'refs/heads/{config.WIKI_REPOSITORY_BRANCH}'))
+        repository = local_repository
+    except Exception as e:
+        logger.warning(f"Failed to initialize wiki repository: '{e}'")
+        repository = None
+
+def clone_repository() -> None:
+    logger.info(f"Cloning wiki repository from '{config.WIKI_REPOSITORY_URL}'...")
+    parent = os.path.dirname(config.WIKI_REPOSITORY_LOCAL_PATH)
+    os.makedirs(parent, exist_ok=True)
+
+    # Clone into a temporary directory first, in case
+    # multiple workers are starting up at the same time
+    target = tempfile.mkdtemp(dir=parent, prefix='.wiki-clone-')
+
+    try:
+        Repo.clone_from(
+            config.WIKI_REPOSITORY_URL,
+            target,
+            mirror=True
+        )
+        os.rename(target, config.WIKI_REPOSITORY_LOCAL_PATH)
+    except OSError:
+        # Another worker finished cloning first
+        pass
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+def fetch_branch_commit() -> Commit:
+    return repository.commit(f'refs/heads/{config.WIKI_REPOSITORY_BRANCH}')
+
+def content_tree(commit: Commit) -> Tree:
+    if not config.WIKI_REPOSITORY_PATH:
+        return commit.tree
+
+    return commit.tree / config.WIKI_REPOSITORY_PATH
+
+def load_commit(commit: Commit) -> None:
+    """Build the path index for the given commit"""
+    global current_commit, index, last_update
+
+    tree = content_tree(commit)
+    prefix = f'{tree.path}/' if tree.path else ''
+
+    new_index = {
+        item.path.removeprefix(prefix): item
+        for item in tree.traverse()
+        if item.type == 'blob' and item.path.endswith('.md')
+    }
+
+    with lock:
+        index = new_index
+        current_commit = commit
+        last_update = time.time()
+
+    logger.info(f"Loaded {len(new_index)} wiki files from commit {commit.hexsha[:8]}")
+
+def update() -> Set[str]:
+    """Fetch the latest changes & update the index, returning the paths of all changed files"""
+    global current_commit, index, last_update
+
+    if repository is None:
+        return set()
+
+    with read_lock:
+        repository.remotes.origin.fetch()
+        commit = fetch_branch_commit()
+
+    if current_commit is None:
+        load_commit(commit)
+        return set(index)
+
+    if commit == current_commit:
+        with lock:
+            last_update = time.time()
+        return set()
+
+    prefix = f'{config.WIKI_REPOSITORY_PATH}/' if config.WIKI_REPOSITORY_PATH else ''
+    changed_paths = set()
+    new_index = dict(index)
+
+    for diff in diff_commits(current_commit, commit):
+        for path in (diff.a_path, diff.b_path):
+            if path and path.endswith('.md'):
+                changed_paths.add(path.removeprefix(prefix))
+
+        if diff.deleted_file or diff.renamed_file:
+            new_index.pop(diff.a_path.removeprefix(prefix), None)
+
+        if diff.b_blob is not None and diff.b_path.endswith('.md'):
+            new_index[diff.b_path.removeprefix(prefix)] = diff.b_blob
+
+    with lock:
+        index = new_index
+        current_commit = commit
+        last_update = time.time()
+
+    logger.info(f"Updated wiki to commit {commit.hexsha[:8]} ({len(changed_paths)} changed files)")
+    return changed_paths
+
+def diff_commits(old: Commit, new: Commit) -> list:
+    with read_lock:
+        return list(old.diff(new, paths=config.WIKI_REPOSITORY_PATH or None))
+
+def changed_files(old_hexsha: str) -> Set[str] | None:
+    """Return all files that changed between the given commit & the current one, if the commit is known"""
+    prefix = f'{config.WIKI_REPOSITORY_PATH}/' if config.WIKI_REPOSITORY_PATH else ''
+
+    try:
+        # Commits are resolved lazily, e.g. after a force push
+        # the old commit is only found missing while diffing
+        with read_lock:
+            old = repository.commit(old_hexsha)
+
+        diffs = diff_commits(old, current_commit)
+    except Exception:
+        return None
+
+    return {
+        path.removeprefix(prefix)
+        for diff in diffs
+        for path in (diff.a_path, diff.b_path)
+        if path and path.endswith('.md')
+    }
+
+def update_in_background() -> None:
+    """Start a repository update, if the last one is older than WIKI_SYNC_INTERVAL"""
+    global update_thread
+
+    if repository is None:
+        return
+
+    if time.time() - last_update < config.WIKI_SYNC_INTERVAL:
+        return
+
+    with lock:
+        if update_thread and update_thread.is_alive():
+            return
+
+        update_thread = Thread(
+            target=safe_update,
+            name='wiki-update',
+            daemon=True
+        )
+        update_thread.start()
+
+def safe_update() -> None:
+    try:
+        update()
+    except Exception as e:
+        logger.warning(f"Failed to update wiki repository: '{e}'")
+
+    for listener in listeners:
+        try:
+            listener()
+        except Exception as e:
+            logger.error(f"Wiki update listener failed: '{e}'", exc_info=e)
+
+def is_available() -> bool:
+    return repository is not None and current_commit is not None
+
+def file_path(path: str, language: str) -> str:
+    return f'{path.replace(" ", "_").removesuffix("/")}/{language}.md'
+
+def fetch_markdown(path: str, language: str) -> str | None:
+    """Read the raw markdown text of a wiki page from the local repository"""
+    return read_file(file_path(path, language))
+
+def read_file(path: str) -> str | None:
+    """Read a file by its path in the index, e.g. 'Ranking_Criteria/en.md'"""
+    if not (blob := index.get(path)):
+        return None
+
+    with read_lock:
+        return blob.data_stream.read().decode('utf-8')
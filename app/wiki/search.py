@@ -0,0 +1,487 @@
+
+from app.common.database import DBWikiPage, DBWikiContent
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+from threading import Lock, Thread
+from sqlalchemy.orm import Session
+from markupsafe import escape
+
+from .constants import LANGUAGES
+
+import logging
+import config
+import struct
+import bisect
+import math
+import mmap
+import json
+import time
+import app
+import os
+import re
+
+logger = logging.getLogger("wiki")
+
+# Layout of the index file:
+#   MAGIC | header length (u32) | header (json) | postings | texts
+# Every posting is a (document, term frequency) pair, and the postings of a term
+# are stored next to each other, so that they can be read straight from the mmap.
+MAGIC = b'STWIKIX1'
+HEADER = struct.Struct('<I')
+POSTING = struct.Struct('<IH')
+
+LOCK_KEY = 'stern:wiki:search:lock'
+
+# Occurrences in the title count as multiple occurrences in the text
+TITLE_BOOST = 5
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Amount of terms, that the last word of a query is expanded to
+PREFIX_EXPANSIONS = 16
+# Amount of seconds between checks for a newer index file
+RELOAD_INTERVAL = 10
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MARKDOWN_PATTERNS = (
+    (re.compile(r'```.*?```', re.DOTALL), ' '),
+    (re.compile(r'!\[[^\]]*\]\([^)]*\)'), ' '),
+    (re.compile(r'\[\[([^|\]]+)\|([^\]]+)\]\]'), r'\2'),
+    (re.compile(r'\[\[([^\]]+)\]\]'), r'\1'),
+    (re.compile(r'\[([^\]]*)\]\([^)]*\)'), r'\1'),
+    (re.compile(r'<[^>]+>'), ' '),
+    (re.compile(r'[#*_`>|~]+|-{3,}'), ' '),
+    (re.compile(r'\s+'), ' ')
+)
+
+@dataclass
+class IndexedDocument:
+    page_id: int
+    language: str
+    path: str
+    title: str
+    text: str
+    terms: Dict[str, int]
+    length: int
+
+@dataclass
+class SearchResult:
+    page_id: int
+    language: str
+    path: str
+    title: str
+    snippet: str
+    score: float
+
+class SearchIndex:
+    """Read-only view of an index file, which is shared between all workers through the page cache"""
+
+    def __init__(self, file_path: str) -> None:
+        with open(file_path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{file_path}' is not a wiki search index")
+
+        header_offset = len(MAGIC) + HEADER.size
+        header_length, = HEADER.unpack_from(self.buffer, len(MAGIC))
+        header = json.loads(self.buffer[header_offset:header_offset + header_length])
+
+        self.documents: List[list] = header['documents']
+        self.languages: Dict[str, dict] = header['languages']
+        self.postings_offset = header_offset + header_length
+        self.texts_offset = self.postings_offset + header['postings_length']
+
+        # Sorted terms are used for expanding prefixes
+        self.sorted_terms = {
+            language: sorted(entry['terms'])
+            for language, entry in self.languages.items()
+        }
+
+    def postings(self, language: str, term: str) -> Iterable[Tuple[int, int]]:
+        if not (entry := self.languages[language]['terms'].get(term)):
+            return ()
+
+        offset, count = entry
+        start = self.postings_offset + offset * POSTING.size
+        return POSTING.iter_unpack(self.buffer[start:start + count * POSTING.size])
+
+    def text(self, document: int) -> str:
+        offset, length = self.documents[document][4:6]
+        start = self.texts_offset + offset
+        return self.buffer[start:start + length].decode()
+
+    def expand(self, language: str, prefix: str) -> List[str]:
+        terms = self.sorted_terms[language]
+        position = bisect.bisect_left(terms, prefix)
+        expansions = []
+
+        while (
+            position < len(terms) and
+            len(expansions) < PREFIX_EXPANSIONS and
+            terms[position].startswith(prefix)
+        ):
+            expansions.append(terms[position])
+            position += 1
+
+        return expansions
+
+    def search(self, query: str, language: str, limit: int) -> List[SearchResult]:
+        if language not in self.languages:
+            return []
+
+        words = list(dict.fromkeys(tokenize(query)))
+
+        if not words:
+            return []
+
+        entry = self.languages[language]
+        document_count = entry['count']
+        average_length = entry['average_length'] or 1
+
+        scores: Dict[int, float] = defaultdict(float)
+        matches: Dict[int, int] = defaultdict(int)
+
+        for index, word in enumerate(words):
+            # The last word may still be incomplete
+            terms = (
+                self.expand(language, word)
+                if index == len(words) - 1 else [word]
+            )
+
+            matched = set()
+
+            for term in terms:
+                count = entry['terms'][term][1] if term in entry['terms'] else 0
+                idf = math.log(1 + (document_count - count + 0.5) / (count + 0.5))
+                # Exact matches are preferred over expanded prefixes
+                weight = idf if term == word else idf * 0.5
+
+                for document, frequency in self.postings(language, term):
+                    length = self.documents[document][6]
+                    normalization = K1 * (1 - B + B * length / average_length)
+                    scores[document] += weight * frequency * (K1 + 1) / (frequency + normalization)
+                    matched.add(document)
+
+            for document in matched:
+                matches[document] += 1
+
+        # Prefer documents that contain every word of the query
+        ranked = sorted(
+            scores,
+            key=lambda document: scores[document] * matches[document] / len(words),
+            reverse=True
+        )
+
+        return [
+            SearchResult(
+                page_id=self.documents[document][0],
+                language=self.documents[document][1],
+                path=self.documents[document][2],
+                title=self.documents[document][3],
+                snippet=create_snippet(self.text(document), words),
+                score=scores[document] * matches[document] / len(words)
+            )
+            for document in ranked[:limit]
+        ]
+
+    def forward(self) -> Dict[Tuple[int, str], IndexedDocument]:
+        """Reconstruct the indexed documents, so that unchanged documents can be reused"""
+        documents = {
+            index: IndexedDocument(
+                page_id=page_id,
+                language=language,
+                path=path,
+                title=title,
+                text=self.text(index),
+                terms={},
+                length=length
+            )
+            for index, (page_id, language, path, title, _, _, length) in enumerate(self.documents)
+        }
+
+        for language, entry in self.languages.items():
+            for term in entry['terms']:
+                for document, frequency in self.postings(language, term):
+                    # Documents in the default language are part of every language
+                    if documents[document].language == language:
+                        documents[document].terms[term] = frequency
+
+        return {
+            (document.page_id, document.language): document
+            for document in documents.values()
+        }
+
+lock = Lock()
+index: SearchIndex | None = None
+last_check: float = 0
+build_thread: Thread | None = None
+last_build: float = 0
+
+def search(query: str, language: str, limit: int = 50) -> List[SearchResult]:
+    """Search the wiki for the given query, in the requested language"""
+    if not (current := current_index()):
+        build_in_background()
+        return []
+
+    return current.search(query, language, limit)
+
+def current_index() -> SearchIndex | None:
+    """Return the loaded index, and reopen it if the file was replaced"""
+    global index, last_check
+
+    if index and time.time() - last_check < RELOAD_INTERVAL:
+        return index
+
+    with lock:
+        if index and time.time() - last_check < RELOAD_INTERVAL:
+            return index
+
+        last_check = time.time()
+
+        try:
+            stat = os.stat(config.WIKI_SEARCH_INDEX_PATH)
+        except FileNotFoundError:
+            return index
+
+        if index and index.signature == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return index
+
+        try:
+            index = SearchIndex(config.WIKI_SEARCH_INDEX_PATH)
+        except Exception as e:
+            logger.warning(f"Failed to load wiki search index: '{e}'")
+
+        return index
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.casefold())
+
+def plain_text(markdown: str) -> str:
+    """Strip the markdown syntax of a page, for tokenizing & snippets"""
+    for pattern, replacement in MARKDOWN_PATTERNS:
+        markdown = pattern.sub(replacement, markdown)
+
+    return markdown.strip()
+
+def create_snippet(text: str, words: List[str], width: int = 200) -> str:
+    """Cut out the part of the text around the first match, and highlight all matches"""
+    pattern = re.compile(
+        r'\b(' + '|'.join(re.escape(word) for word in words) + r')\w*',
+        re.IGNORECASE
+    )
+
+    start = 0
+
+    if match := pattern.search(text):
+        start = max(0, match.start() - width // 4)
+
+    excerpt = text[start:start + width]
+    snippet = ''
+    position = 0
+
+    for match in pattern.finditer(excerpt):
+        snippet += str(escape(excerpt[position:match.start()]))
+        snippet += f'<b>{escape(match.group(0))}</b>'
+        position = match.end()
+
+    snippet += str(escape(excerpt[position:]))
+
+    return (
+        ('…' if start > 0 else '') + snippet +
+        ('…' if start + width < len(text) else '')
+    )
+
+def index_document(page_id: int, language: str, path: str, title: str, markdown: str) -> IndexedDocument:
+    text = plain_text(markdown)
+    tokens = tokenize(text)
+    terms = Counter(tokens)
+
+    for token in tokenize(title):
+        terms[token] += TITLE_BOOST
+
+    return IndexedDocument(
+        page_id=page_id,
+        language=language,
+        path=path,
+        title=title,
+        text=text,
+        terms={term: min(frequency, 0xFFFF) for term, frequency in terms.items()},
+        length=len(tokens)
+    )
+
+def update(session: Session, changed: Set[Tuple[int, str]] | None = None) -> int:
+    """Rebuild the index file, while only re-tokenizing contents that have changed"""
+    previous = {}
+
+    if changed is not None and (current := current_index()):
+        previous = current.forward()
+
+    entries = session.query(
+            DBWikiContent.page_id,
+            DBWikiContent.language,
+            DBWikiContent.title,
+            DBWikiPage.path
+        ) \
+        .join(DBWikiPage, DBWikiPage.id == DBWikiContent.page_id) \
+        .all()
+
+    documents: Dict[Tuple[int, str], IndexedDocument] = {}
+    missing: Set[Tuple[int, str]] = set()
+
+    for page_id, language, title, path in entries:
+        key = (page_id, language)
+
+        if key in previous and key not in (changed or ()):
+            documents[key] = previous[key]
+            documents[key].path = path
+            continue
+
+        missing.add(key)
+
+    if missing:
+        contents = session.query(
+                DBWikiContent.page_id,
+                DBWikiContent.language,
+                DBWikiContent.title,
+                DBWikiContent.content
+            ) \
+            .filter(DBWikiContent.page_id.in_({page_id for page_id, _ in missing})) \
+            .all()
+
+        paths = {page_id: path for page_id, _, _, path in entries}
+
+        for page_id, language, title, content in contents:
+            if (page_id, language) not in missing:
+                continue
+
+            documents[(page_id, language)] = index_document(
+                page_id, language, paths[page_id],
+                title, content
+            )
+
+    write(config.WIKI_SEARCH_INDEX_PATH, list(documents.values()))
+
+    logger.info(
+        f'Updated wiki search index: {len(documents)} documents, '
+        f'{len(missing)} tokenized'
+    )
+    return len(documents)
+
+def write(file_path: str, documents: List[IndexedDocument]) -> None:
+    """Write the index file & atomically replace the previous one"""
+    texts = bytearray()
+    header_documents = []
+
+    for document in documents:
+        text = document.text.encode()
+        header_documents.append([
+            document.page_id, document.language,
+            document.path, document.title,
+            len(texts), len(text), document.length
+        ])
+        texts += text
+
+    translated = {
+        (document.page_id, document.language)
+        for document in documents
+    }
+
+    postings = bytearray()
+    languages = {}
+
+    for language in LANGUAGES:
+        # Pages without a translation are searchable in the default language
+        members = [
+            index for index, document in enumerate(documents)
+            if document.language == language or (
+                document.language == config.WIKI_DEFAULT_LANGUAGE and
+                (document.page_id, language) not in translated
+            )
+        ]
+
+        term_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        for index in members:
+            for term, frequency in documents[index].terms.items():
+                term_postings[term].append((index, frequency))
+
+        terms = {}
+
+        for term, entries in term_postings.items():
+            terms[term] = [len(postings) // POSTING.size, len(entries)]
+
+            for entry in entries:
+                postings += POSTING.pack(*entry)
+
+        languages[language] = {
+            'count': len(members),
+            'average_length': (
+                sum(documents[index].length for index in members) / len(members)
+                if members else 0
+            ),
+            'terms': terms
+        }
+
+    header = json.dumps({
+        'documents': header_documents,
+        'languages': languages,
+        'postings_length': len(postings)
+    }, separators=(',', ':')).encode()
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temporary_path = f'{file_path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(len(header)))
+        f.write(header)
+        f.write(postings)
+        f.write(texts)
+
+    # Workers keep using their mapping of the previous file until they reload
+    os.replace(temporary_path, file_path)
+
+def build() -> None:
+    """Build the whole index, if no other worker is already doing it"""
+    if not app.session.redis.set(LOCK_KEY, 1, nx=True, ex=60*10):
+        return
+
+    try:
+        with app.session.database.managed_session() as session:
+            update(session)
+    finally:
+        app.session.redis.delete(LOCK_KEY)
+
+def build_in_background() -> None:
+    global build_thread, last_build
+
+    with lock:
+        if build_thread and build_thread.is_alive():
+            return
+
+        if time.time() - last_build < RELOAD_INTERVAL:
+            # Another worker may still be building the index
+            return
+
+        last_build = time.time()
+
+        build_thread = Thread(
+            target=safe_build,
+            name='wiki-search-build',
+            daemon=True
+        )
+        build_thread.start()
+
+def safe_build() -> None:
+    try:
+        build()
+    except Exception as e:
+        logger.error(f"Failed to build wiki search index: '{e}'", exc_info=e)
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,247 @@
+
+from app.common.database import DBWikiPage, DBWikiContent, DBWikiOutlink, wiki
+from sqlalchemy import update, delete, insert, values, column, String, Integer
+from app.wiki.constants import WIKI_LINK_REGEX
+from app.wiki import repository, engine, search, home
+from sqlalchemy.orm import Session
+from typing import Dict, Set, Tuple
+from threading import Thread
+
+import hashlib
+import logging
+import config
+import app
+
+logger = logging.getLogger("wiki")
+
+SYNC_LOCK_KEY = 'stern:wiki:sync:lock'
+SYNC_COMMIT_KEY = 'stern:wiki:sync:commit'
+
+# Set once the database was synchronized at least once
+synchronized = False
+
+def is_synchronized() -> bool:
+    """Check if the database contains all pages of the repository"""
+    global synchronized
+
+    if not synchronized and repository.is_available():
+        synchronized = bool(app.session.redis.exists(SYNC_COMMIT_KEY))
+
+    return synchronized
+
+def start() -> None:
+    """Open the repository in the background, and synchronize the database after every update"""
+    repository.listeners.append(run)
+
+    Thread(
+        target=initialize,
+        name='wiki-sync',
+        daemon=True
+    ).start()
+
+def initialize() -> None:
+    # Cloning the repository may take a while, which
+    # would otherwise block every worker on startup
+    repository.initialize_repository()
+    repository.safe_update()
+
+def run() -> None:
+    """Synchronize the database with the current commit, if no other worker is already doing it"""
+    if not repository.is_available():
+        return
+
+    commit = repository.current_commit.hexsha
+    acquired = app.session.redis.set(SYNC_LOCK_KEY, commit, nx=True, ex=60*10)
+
+    if not acquired:
+        return
+
+    try:
+        synced_commit = app.session.redis.get(SYNC_COMMIT_KEY)
+        synced_commit = synced_commit.decode() if synced_commit else None
+
+        if synced_commit == commit:
+            return
+
+        # Only look at changed files, if we know which commit was synced last
+        changed = (
+            repository.changed_files(synced_commit)
+            if synced_commit else None
+        )
+
+        with app.session.database.managed_session() as session:
+            changed_contents = synchronize(changed, session)
+            session.commit()
+
+            # A full synchronization also rebuilds the whole search index
+            search.update(session, changed_contents if changed is not None else None)
+
+        home.invalidate()
+
+        app.session.redis.set(SYNC_COMMIT_KEY, commit)
+    finally:
+        app.session.redis.delete(SYNC_LOCK_KEY)
+
+def synchronize(changed: Set[str] | None, session: Session) -> Set[Tuple[int, str]]:
+    """Upsert all pages & contents for the given files, or for the whole repository, and return the changed contents"""
+    files = set(repository.index) if changed is None else changed
+
+    pages: Dict[str, int] = dict(
+        session.query(DBWikiPage.path, DBWikiPage.id).all()
+    )
+
+    contents: Dict[Tuple[int, str], str] = {
+        (page_id, language): content_hash(content)
+        for page_id, language, content in session.query(
+            DBWikiContent.page_id,
+            DBWikiContent.language,
+            DBWikiContent.content
+        )
+    }
+
+    present: Dict[Tuple[str, str], str] = {}
+    deleted: Set[Tuple[str, str]] = set()
+
+    if changed is None:
+        # Everything that is not part of the repository was deleted
+        paths_by_id = {page_id: path for path, page_id in pages.items()}
+        deleted = {
+            (paths_by_id[page_id], language)
+            for page_id, language in contents
+            if page_id in paths_by_id
+        }
+
+    for file in files:
+        directory, _, filename = file.rpartition('/')
+        language = filename.removesuffix('.md')
+
+        if not directory:
+            continue
+
+        key = (engine.get_page_path(directory), language)
+
+        if (markdown := repository.read_file(file)) is None:
+            deleted.add(key)
+            continue
+
+        present[key] = engine.sanitize_markdown(markdown)
+        deleted.discard(key)
+
+    # Create all missing pages in one batch
+    new_pages = [
+        DBWikiPage(name=engine.get_page_name(path), path=path)
+        for path in {path for path, _ in present}
+        if path not in pages
+    ]
+
+    session.add_all(new_pages)
+    session.flush()
+    pages.update({page.path: page.id for page in new_pages})
+
+    created = []
+    updated = []
+    changed_pages: Dict[int, str] = {}
+
+    for (path, language), markdown in present.items():
+        page_id = pages[path]
+        entry = {
+            'page_id': page_id,
+            'language': language,
+            'title': engine.parse_title(markdown),
+            'content': markdown
+        }
+
+        if (page_id, language) not in contents:
+            created.append(entry)
+        elif contents[(page_id, language)] != content_hash(markdown):
+            updated.append(entry)
+        else:
+            continue
+
+        if language == config.WIKI_DEFAULT_LANGUAGE:
+            changed_pages[page_id] = markdown
+
+    if created:
+        session.execute(insert(DBWikiContent), created)
+
+    if updated:
+        rows = values(
+            column('page_id', Integer),
+            column('language', String),
+            column('title', String),
+            column('content', String),
+            name='contents'
+        ).data([
+            (entry['page_id'], entry['language'], entry['title'], entry['content'])
+            for entry in updated
+        ])
+
+        session.execute(
+            update(DBWikiContent)
+            .where(DBWikiContent.page_id == rows.c.page_id)
+            .where(DBWikiContent.language == rows.c.language)
+            .values(title=rows.c.title, content=rows.c.content)
+        )
+
+    delete_contents(deleted, pages, session)
+    update_outlinks(changed_pages, pages, session)
+
+    logger.info(
+        f'Synchronized wiki: {len(new_pages)} new pages, '
+        f'{len(created)} new contents, {len(updated)} updated contents, '
+        f'{len(deleted)} deleted contents'
+    )
+
+    return {
+        (entry['page_id'], entry['language'])
+        for entry in created + updated
+    }
+
+def delete_contents(deleted: Set[Tuple[str, str]], pages: Dict[str, int], session: Session) -> None:
+    for path, language in deleted:
+        if not (page_id := pages.get(path)):
+            continue
+
+        if language != config.WIKI_DEFAULT_LANGUAGE:
+            session.execute(
+                delete(DBWikiContent)
+                .where(DBWikiContent.page_id == page_id)
+                .where(DBWikiContent.language == language)
+            )
+            continue
+
+        # Pages without content in the default language are removed entirely
+        wiki.delete_outlinks(page_id, session)
+        wiki.delete_content(page_id, session)
+        wiki.delete_page(page_id, session)
+
+def update_outlinks(changed_pages: Dict[int, str], pages: Dict[str, int], session: Session) -> None:
+    """Recompute the outlinks of all pages whose default content changed"""
+    if not changed_pages:
+        return
+
+    pages_by_path = {path.lower(): page_id for path, page_id in pages.items()}
+    outlinks = []
+
+    for page_id, markdown in changed_pages.items():
+        targets = {
+            target_id
+            for match in WIKI_LINK_REGEX.findall(markdown)
+            if (target_id := pages_by_path.get(engine.get_page_path(match[0]).lower()))
+        }
+
+        outlinks.extend(
+            {'page_id': page_id, 'target_id': target_id}
+            for target_id in targets
+        )
+
+    session.execute(
+        delete(DBWikiOutlink)
+        .where(DBWikiOutlink.page_id.in_(changed_pages))
+    )
+
+    if outlinks:
+        session.execute(insert(DBWikiOutlink), outlinks)
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
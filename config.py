@@ -29,6 +29,34 @@ FRONTEND_REFRESH_EXPIRY = int(os.environ.get('FRONTEND_REFRESH_EXPIRY', 3600*24*
 SCORE_RESPONSE_LIMIT = int(os.environ.get('SCORE_RESPONSE_LIMIT', 50))
 DOMAIN_NAME = os.environ.get('DOMAIN_NAME')
 
+PRESENCE_RESOLUTION = int(os.environ.get('PRESENCE_RESOLUTION', 60))
+PRESENCE_FLUSH_INTERVAL = int(os.environ.get('PRESENCE_FLUSH_INTERVAL', 5))
+
+WEBSITE_STATS_CACHE_TTL = int(os.environ.get('WEBSITE_STATS_CACHE_TTL', 10))
+NOTIFICATION_COUNT_CACHE_TTL = int(os.environ.get('NOTIFICATION_COUNT_CACHE_TTL', 10))
+
+RANKINGS_CACHE_TTL = int(os.environ.get('RANKINGS_CACHE_TTL', 60))
+PAGE_CACHE_LOCK_TIMEOUT = int(os.environ.get('PAGE_CACHE_LOCK_TIMEOUT', 10))
+
+RANK_SYNC_QUEUE_SIZE = int(os.environ.get('RANK_SYNC_QUEUE_SIZE', 5000))
+RANK_SYNC_BATCH_SIZE = int(os.environ.get('RANK_SYNC_BATCH_SIZE', 500))
+RANK_SYNC_INTERVAL = float(os.environ.get('RANK_SYNC_INTERVAL', 1))
+
+PROFILE_LOADER_WORKERS = int(os.environ.get('PROFILE_LOADER_WORKERS', 8))
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 60*30))
+PROFILE_EXTERNAL_CACHE_TTL = int(os.environ.get('PROFILE_EXTERNAL_CACHE_TTL', 60*2))
+
+BBCODE_CACHE_SIZE = int(os.environ.get('BBCODE_CACHE_SIZE', 2048))
+BBCODE_CACHE_TTL = int(os.environ.get('BBCODE_CACHE_TTL', 60*60*24))
+
+FORUM_STATS_TTL = int(os.environ.get('FORUM_STATS_TTL', 60*5))
+
+TOPIC_VIEW_LOCK_TIME = int(os.environ.get('TOPIC_VIEW_LOCK_TIME', 60))
+TOPIC_VIEWS_FLUSH_INTERVAL = int(os.environ.get('TOPIC_VIEWS_FLUSH_INTERVAL', 10))
+AVATAR_CACHE_TTL = int(os.environ.get('AVATAR_CACHE_TTL', 60*60*24*30))
+AVATAR_HASH_CACHE_TTL = int(os.environ.get('AVATAR_HASH_CACHE_TTL', 60))
+REPLAY_CACHE_TTL = int(os.environ.get('REPLAY_CACHE_TTL', 60*60*24))
+
 DEBUG = eval(os.environ.get('DEBUG', 'False').capitalize())
 S3_ENABLED = eval(os.environ.get('ENABLE_S3', 'True').capitalize())
 ENABLE_SSL = eval(os.environ.get('ENABLE_SSL', 'False').capitalize())
@@ -75,6 +103,13 @@ WIKI_REPOSITORY_NAME = os.environ.get('WIKI_REPOSITORY_NAME', 'wiki')
 WIKI_REPOSITORY_BRANCH = os.environ.get('WIKI_REPOSITORY_BRANCH', 'main')
 WIKI_REPOSITORY_PATH = os.environ.get('WIKI_REPOSITORY_PATH', 'wiki')
 WIKI_DEFAULT_LANGUAGE = os.environ.get('WIKI_DEFAULT_LANGUAGE', 'en')
+WIKI_HTML_CACHE_TTL = int(os.environ.get('WIKI_HTML_CACHE_TTL', 60*60*24*7))
+WIKI_PROCESSOR_POOL_SIZE = int(os.environ.get('WIKI_PROCESSOR_POOL_SIZE', 4))
+WIKI_REPOSITORY_URL = os.environ.get('WIKI_REPOSITORY_URL', f'https://github.com/{WIKI_REPOSITORY_OWNER}/{WIKI_REPOSITORY_NAME}.git')
+WIKI_REPOSITORY_LOCAL_PATH = os.environ.get('WIKI_REPOSITORY_LOCAL_PATH', os.path.join(DATA_PATH, 'wiki.git'))
+WIKI_SYNC_INTERVAL = int(os.environ.get('WIKI_SYNC_INTERVAL', 60*5))
+WIKI_HOME_CACHE_TTL = int(os.environ.get('WIKI_HOME_CACHE_TTL', 60*60))
+WIKI_SEARCH_INDEX_PATH = os.environ.get('WIKI_SEARCH_INDEX_PATH', os.path.join(DATA_PATH, 'wiki-search.idx'))
 
 DEFAULT_API_BASEURL = f'http{"s" if ENABLE_SSL else ""}://api.{DOMAIN_NAME}'
 DEFAULT_OSU_BASEURL = f'http{"s" if ENABLE_SSL else ""}://osu.{DOMAIN_NAME}'
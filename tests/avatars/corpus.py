@@ -0,0 +1,73 @@
+"""
+Sample avatars for the imaging tests & benchmarks, which cover the kinds of images users upload.
+Every avatar is generated from a fixed seed, which keeps every run reproducible.
+"""
+
+from PIL import Image, ImageDraw, ImageFilter
+from typing import Callable, Dict
+
+import random
+import io
+
+SOURCE_SIZE = 512
+
+def flat() -> Image.Image:
+    """A flat illustration with a few solid shapes"""
+    image = Image.new('RGB', (SOURCE_SIZE, SOURCE_SIZE), (255, 102, 170))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((96, 96, 416, 416), fill=(255, 255, 255))
+    draw.ellipse((176, 176, 336, 336), fill=(34, 34, 34))
+    draw.rectangle((0, 448, SOURCE_SIZE, SOURCE_SIZE), fill=(68, 170, 221))
+    return image
+
+def transparent() -> Image.Image:
+    """A logo on a transparent background"""
+    image = Image.new('RGBA', (SOURCE_SIZE, SOURCE_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((32, 32, 480, 480), fill=(255, 204, 34, 255), outline=(0, 0, 0, 255), width=16)
+    draw.polygon([(256, 96), (384, 384), (128, 384)], fill=(255, 255, 255, 200))
+    return image
+
+def gradient() -> Image.Image:
+    """A smooth two-color gradient"""
+    horizontal = Image.linear_gradient('L').resize((SOURCE_SIZE, SOURCE_SIZE))
+    vertical = horizontal.rotate(90)
+    return Image.merge('RGB', (horizontal, vertical, Image.new('L', horizontal.size, 160)))
+
+def photo() -> Image.Image:
+    """Smoothed noise with fine grain, which compresses like a photo"""
+    generator = random.Random(0)
+    coarse = Image.new('RGB', (16, 16))
+    coarse.putdata([tuple(generator.randrange(256) for _ in range(3)) for _ in range(16 * 16)])
+    image = coarse.resize((SOURCE_SIZE, SOURCE_SIZE), Image.Resampling.BICUBIC)
+
+    grain = Image.effect_noise((SOURCE_SIZE, SOURCE_SIZE), 24).convert('RGB')
+    return Image.blend(image, grain, 0.15).filter(ImageFilter.GaussianBlur(0.6))
+
+def pixel_art() -> Image.Image:
+    """A palette image with hard edges"""
+    generator = random.Random(1)
+    palette = [tuple(generator.randrange(256) for _ in range(3)) for _ in range(8)]
+    image = Image.new('RGB', (32, 32))
+    image.putdata([generator.choice(palette) for _ in range(32 * 32)])
+    return image.resize((SOURCE_SIZE, SOURCE_SIZE), Image.Resampling.NEAREST).convert('P', colors=8)
+
+AVATARS: Dict[str, Callable[[], Image.Image]] = {
+    'flat': flat,
+    'transparent': transparent,
+    'gradient': gradient,
+    'photo': photo,
+    'pixel art': pixel_art
+}
+
+def encode_png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def uploads() -> Dict[str, bytes]:
+    """The avatars as they were stored before, i.e. resized to 256px & saved as an unoptimized png"""
+    return {
+        name: encode_png(create().resize((256, 256)))
+        for name, create in AVATARS.items()
+    }
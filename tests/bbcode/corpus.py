@@ -0,0 +1,106 @@
+"""
+Documents for the differential bbcode tests & benchmarks.
+Random documents are generated from a fixed seed, which keeps every run reproducible.
+"""
+
+from typing import Iterator
+
+import random
+
+# Hand-picked documents, that cover edge cases of the tokenizer, link transform & tree builder
+DOCUMENTS = [
+    '',
+    'plain text',
+    'line one\nline two\r\nline three\rline four',
+    '[b]bold[/b] [i]italic[/i] [u]underline[/u]',
+    '[B]upper case[/B] [b]mixed case[/B]',
+    '[b]never closed',
+    'never opened[/b]',
+    '[b][i]overlapping[/b][/i]',
+    '[quote]a[quote]b[quote]c[/quote][/quote][/quote]',
+    '[quote=peppy]named quote[/quote]',
+    '[quote="some user"]quoted name[/quote]',
+    "[quote='single quotes']quoted name[/quote]",
+    '[quote="unterminated]quote[/quote]',
+    '[quote="a]b"]brackets inside of quotes[/quote]',
+    '[url=http://example.com/"a"]link with quotes[/url]',
+    '[url]http://example.com/a?b=c&d=e[/url]',
+    '[url="http://example.com/a b"]spaces[/url]',
+    '[code][b]not bold[/b][/code]',
+    '[code]a[code]b[/code]c[/code]',
+    '[c]inline [i]code[/i][/c]',
+    '[list][*]one\n[*]two\n[*]three[/list]',
+    '[list=1][*]numbered[*]items[/list]',
+    '[color=red]red[/color] [size=150]big[/size]',
+    '[box=Title]content[/box] [spoilerbox]hidden[/spoilerbox]',
+    '[heading]heading[/heading]\nafter heading',
+    '[img]http://example.com/image.png[/img]',
+    '[youtube]dQw4w9WgXcQ[/youtube]',
+    '[email]someone@example.com[/email]',
+    '[profile]peppy[/profile]',
+    '[unknown]unrecognized tags[/unknown]',
+    '[[b]]double brackets[[/b]]',
+    '[] [/] [=] [ b ] [/ b]',
+    '[' * 50 + ']' * 50,
+    '[b' * 20,
+    '01:23:456 (1,2,3) - [note] and [1,2,3] arrays',
+    'http://example.com www.example.org example.com/path ftp://files.example.com',
+    'https://osu.ppy.sh/b/1 https://osu.ppy.sh/s/1?m=0#top',
+    'http://example.com/"><script>alert(1)</script>',
+    '<b>&amp; "quotes" \'apostrophes\'</b>',
+    '... -- --- (c) (reg) (tm)',
+    'text-http://example.com-text',
+    'https://example.com/%7Euser path%20with%20spaces',
+    '[url=https://example.com/%7Ex y]hotfixed[/url]',
+    '\t indented \t text',
+    'emoji 🎵 and unicode ünïcödé',
+]
+
+TAGS = [
+    'b', 'i', 'u', 'code', 'c', 'quote', 'quote=bob', 'quote="a b"', "quote='x'",
+    'url', 'url=http://a.com', 'url="http://b.com/x y"', 'list', 'list=1', '*',
+    'color=red', 'size=150', 'spoilerbox', 'box=Title', 'img', 'youtube', 'email',
+    'profile', 'heading', 'strike', 'centre', 'google', 'video', 'unknown', 'B', 'QUOTE'
+]
+
+ATOMS = [
+    'hello', ' ', '\n', '\r\n', 'http://example.com/a?b=c&d=e', 'www.test.org', 'a.com/path',
+    '<b>&amp;', '...', '--', '(c)', '"', "'", '=', ']', '[', '[/', 'ftp://x',
+    'https://osu.ppy.sh/b/1', 'foo@bar.com', '\t', '[[', ']]', '%20', 'https://a.b/%7Ex y'
+]
+
+def generate(count: int, seed: int = 0, max_length: int = 40) -> Iterator[str]:
+    """Generate random documents out of tags & text fragments"""
+    generator = random.Random(seed)
+
+    for _ in range(count):
+        fragments = []
+
+        for _ in range(generator.randint(0, max_length)):
+            value = generator.random()
+
+            if value < 0.25:
+                fragments.append(f'[{generator.choice(TAGS)}]')
+            elif value < 0.45:
+                fragments.append(f'[/{generator.choice(TAGS).split("=")[0]}]')
+            else:
+                fragments.append(generator.choice(ATOMS))
+
+        yield ''.join(fragments)
+
+def nested(tag: str, depth: int, text: str = 'x') -> str:
+    return f'[{tag}]' * depth + text + f'[/{tag}]' * depth
+
+def unmatched_brackets(count: int) -> str:
+    return 'text [' * count
+
+def large_post(size: int) -> str:
+    """A post of roughly the given size, with a mix of tags, links & brackets"""
+    paragraph = (
+        '[b]Map feedback[/b] 01:23:456 (1,2,3) - [i]spacing[/i] is off, see '
+        'https://osu.ppy.sh/b/1 and [url=http://example.com]this[/url]... [note]\n'
+    )
+    return paragraph * (size // len(paragraph) + 1)
+
+def linked_post(links: int) -> str:
+    return ' '.join(f'see http://example.com/{index} -- and' for index in range(links))
@@ -0,0 +1,33 @@
+"""
+Benchmarks for the hot paths of the frontend, which print their timings as a table.
+Run them from the repository root, e.g. `python -m tests.benchmarks.leaderboard`.
+"""
+
+from typing import Callable, Iterable, List
+
+import timeit
+
+def measure(func: Callable[[], object], repeat: int = 5, number: int = 1) -> float:
+    """Return the best time of all runs in milliseconds"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+
+def report(title: str, columns: List[str], rows: Iterable[tuple]) -> None:
+    rows = [[format_cell(value) for value in row] for row in rows]
+    widths = [
+        max(len(column), *(len(row[index]) for row in rows))
+        for index, column in enumerate(columns)
+    ]
+
+    print(title)
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+    print()
+
+def format_cell(value: object) -> str:
+    if isinstance(value, float):
+        return f'{value:.3f}'
+
+    return str(value)
@@ -0,0 +1,69 @@
+"""
+Compares the bytes of the pre-rendered avatar variants with the unoptimized
+png, that was resized on every cache miss before, over the sample avatars.
+"""
+
+from tests.avatars import corpus
+from PIL import Image
+
+from . import measure, report
+
+import app
+import io
+
+def resize_png(image: bytes, target_size: int) -> bytes:
+    # Previous implementation of utils.resize_image
+    img = Image.open(io.BytesIO(image))
+    img = img.resize((target_size, target_size))
+    image_buffer = io.BytesIO()
+    img.save(image_buffer, format='PNG')
+    return image_buffer.getvalue()
+
+def main() -> None:
+    rows = []
+    totals = {'png': 0, 'fallback': 0, 'modern': 0}
+    timings = []
+
+    for name, upload in corpus.uploads().items():
+        variants = app.avatars.create_variants(upload)
+        timings.append((name, measure(lambda: app.avatars.create_variants(upload), repeat=3)))
+
+        for size in app.avatars.SIZES:
+            encoded = variants[size]
+            png = len(resize_png(upload, size))
+            fallback = len(encoded[app.avatars.FALLBACK])
+            mimetype = encoded[app.avatars.FALLBACK_MIMETYPE].decode()
+
+            # Browsers that advertise a modern format get the first supported one
+            modern_format = app.imaging.negotiate('image/avif,image/webp', fallback=None)
+            modern = len(encoded[modern_format.name]) if modern_format else fallback
+
+            totals['png'] += png
+            totals['fallback'] += fallback
+            totals['modern'] += modern
+
+            rows.append((
+                name, size, png,
+                f'{fallback} ({mimetype.removeprefix("image/")})',
+                modern, f'{1 - modern / png:.0%}'
+            ))
+
+    rows.append((
+        'total', '', totals['png'], totals['fallback'], totals['modern'],
+        f'{1 - totals["modern"] / totals["png"]:.0%}'
+    ))
+
+    report(
+        'Avatar bytes',
+        ['avatar', 'size', 'png', 'fallback', 'avif/webp', 'saved'],
+        rows
+    )
+
+    report(
+        'Rendering all variants of an upload (ms)',
+        ['avatar', 'time'],
+        timings
+    )
+
+if __name__ == '__main__':
+    main()
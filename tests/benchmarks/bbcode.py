@@ -0,0 +1,71 @@
+"""
+Compares the bbcode parser with the baseline implementation on pathological inputs.
+"""
+
+from app.bbcode import formatter, render_html
+from tests.bbcode import baseline, corpus
+
+from . import measure, report
+
+def benchmark_tokenizer() -> None:
+    documents = {
+        '10k unmatched brackets': corpus.unmatched_brackets(10_000),
+        '1k nested quotes': corpus.nested('quote', 1000),
+        '1 MB post': corpus.large_post(1024 * 1024)
+    }
+
+    report(
+        'Tokenizer (ms)',
+        ['document', 'baseline', 'current', 'speedup'],
+        [
+            (name, old, new, old / new)
+            for name, document in documents.items()
+            for old, new in [(
+                measure(lambda: baseline.parser.tokenize(document), repeat=3),
+                measure(lambda: formatter.tokenize(document), repeat=3)
+            )]
+        ]
+    )
+
+def benchmark_links() -> None:
+    report(
+        'Link transform (ms)',
+        ['links', 'baseline', 'current', 'speedup'],
+        [
+            (links, old, new, old / new)
+            for links in (100, 1000)
+            for document in [corpus.linked_post(links)]
+            for old, new in [(
+                measure(lambda: baseline.render_html(document), repeat=3),
+                measure(lambda: render_html(document), repeat=3)
+            )]
+        ]
+    )
+
+def benchmark_tree() -> None:
+    documents = {
+        '100 nested quotes': corpus.nested('quote', 100),
+        '500 nested quotes': corpus.nested('quote', 500),
+        '100 KB post': corpus.large_post(100_000)
+    }
+
+    report(
+        'Parse & render (ms)',
+        ['document', 'baseline', 'current', 'speedup'],
+        [
+            (name, old, new, old / new)
+            for name, document in documents.items()
+            for old, new in [(
+                measure(lambda: baseline.parser.format(document), repeat=3),
+                measure(lambda: formatter.format(document), repeat=3)
+            )]
+        ]
+    )
+
+def main() -> None:
+    benchmark_tokenizer()
+    benchmark_links()
+    benchmark_tree()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compares the forum presence lookup with the KEYS scan, that the forum pages used
+before, with 100k unrelated keys in redis, e.g. the ones of bancho.
+
+The keys are written to a separate database of the configured redis server,
+which has to be empty, and is flushed afterwards. Set BENCHMARK_REDIS_DB to change it.
+"""
+
+from app.routes.forum import activity
+from unittest import mock
+from redis import Redis
+
+from . import measure, report
+
+import config
+import time
+import app
+import os
+
+BENCHMARK_DB = int(os.environ.get('BENCHMARK_REDIS_DB', 15))
+UNRELATED_KEYS = 100_000
+SIZES = (10, 100, 1000)
+FORUM_ID = 1
+
+def mark_user_active_keys(redis: Redis, user_id: int, forum_id: int) -> None:
+    redis_key = f"forum:{forum_id}:active:{user_id}"
+    redis.set(redis_key, int(time.time()), ex=activity.FORUM_ACTIVITY_EXPIRY)
+
+def get_active_users_keys(redis: Redis, forum_id: int) -> list[int]:
+    pattern = f"forum:{forum_id}:active:*"
+    keys = redis.keys(pattern)
+    return [int(key.decode().split(":")[-1]) for key in keys]
+
+def populate(redis: Redis) -> None:
+    pipeline = redis.pipeline(transaction=False)
+
+    for index in range(UNRELATED_KEYS):
+        pipeline.set(f'bancho:benchmark:{index}', index)
+
+    pipeline.execute()
+
+def main() -> None:
+    redis = Redis(config.REDIS_HOST, config.REDIS_PORT, db=BENCHMARK_DB)
+
+    if redis.dbsize():
+        raise SystemExit(f'Redis database {BENCHMARK_DB} is not empty')
+
+    rows = []
+
+    try:
+        populate(redis)
+
+        with mock.patch.object(app.session, 'redis', redis):
+            for size in SIZES:
+                for user_id in range(size):
+                    mark_user_active_keys(redis, user_id, FORUM_ID)
+                    activity.mark_user_active(user_id, FORUM_ID)
+
+                assert (
+                    sorted(get_active_users_keys(redis, FORUM_ID)) ==
+                    sorted(activity.get_active_users(FORUM_ID))
+                )
+
+                scan = measure(lambda: get_active_users_keys(redis, FORUM_ID))
+                lookup = measure(lambda: activity.get_active_users(FORUM_ID))
+                rows.append((size, scan, lookup, scan / lookup))
+    finally:
+        redis.flushdb()
+
+    report(
+        f'Active users with {UNRELATED_KEYS} unrelated keys (ms)',
+        ['users', 'keys', 'sorted set', 'speedup'],
+        rows
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares the hydration of redis leaderboard entries with the linear
+user lookup, that the rankings pages used before, at 50/500/5000 entries.
+"""
+
+from types import SimpleNamespace
+from unittest import mock
+
+from . import measure, report
+
+import utils
+
+SIZES = (50, 500, 5000)
+
+def create_leaderboard(size: int) -> tuple:
+    leaderboard = [(user_id, float(size - user_id)) for user_id in range(size)]
+    # Users are returned by the database in an arbitrary order
+    users_db = [SimpleNamespace(id=user_id) for user_id in reversed(range(size))]
+    return leaderboard, users_db
+
+def hydrate_linear(leaderboard: list, users_db: list) -> list:
+    return [
+        (next(filter(lambda user: id == user.id, users_db)), score)
+        for id, score in leaderboard
+        if score > 0
+    ]
+
+def main() -> None:
+    rows = []
+
+    for size in SIZES:
+        leaderboard, users_db = create_leaderboard(size)
+
+        with mock.patch.object(utils.users, 'fetch_many', return_value=users_db):
+            hydrated = measure(lambda: utils.hydrate_leaderboard(leaderboard, session=None))
+
+        linear = measure(lambda: hydrate_linear(leaderboard, users_db), repeat=1)
+        rows.append((size, linear, hydrated, linear / hydrated))
+
+    report(
+        'Leaderboard hydration (ms)',
+        ['entries', 'linear', 'dict index', 'speedup'],
+        rows
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures the wiki search on generated corpora, which are roughly
+the size of the wiki & four times as large.
+"""
+
+from app.wiki import search
+from tests.wiki import corpus
+
+from . import measure, report
+
+import tempfile
+import os
+
+SIZES = (1200, 5000)
+QUERIES = (
+    'beatmap',
+    'ranking criteria',
+    'performance points accuracy',
+    'hitci',
+    'osu mania skin',
+    'qwertyuiop'
+)
+
+def build(directory: str, pages: int) -> tuple:
+    file_path = os.path.join(directory, f'wiki-search-{pages}.idx')
+    entries = list(corpus.generate(pages))
+
+    def write():
+        search.write(file_path, [search.index_document(*entry) for entry in entries])
+
+    build_time = measure(write, repeat=1)
+    return len(entries), build_time, search.SearchIndex(file_path)
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        indexes = [build(directory, pages) for pages in SIZES]
+
+        report(
+            'Index build',
+            ['pages', 'documents', 'build (ms)'],
+            [
+                (pages, documents, build_time)
+                for pages, (documents, build_time, _) in zip(SIZES, indexes)
+            ]
+        )
+
+        report(
+            'Search with snippets, 50 results (ms)',
+            ['query', *(f'{pages} pages' for pages in SIZES)],
+            [
+                (query, *(
+                    measure(lambda: index.search(query, 'en', 50))
+                    for _, _, index in indexes
+                ))
+                for query in QUERIES
+            ]
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares the incremental update of the wiki mirror with rebuilding
+the whole index, after a commit that changes a few pages.
+
+The wiki repository is replaced by a local bare repository in a temporary directory.
+"""
+
+from app.wiki import repository
+from tests.wiki.standin import StandInRepository, generate_pages
+
+from . import measure, report
+
+import tempfile
+import config
+import os
+
+SIZES = (500, 2000)
+CHANGED_PAGES = 5
+
+def benchmark(size: int, directory: str) -> tuple:
+    origin = StandInRepository(directory)
+    origin.commit(generate_pages(size), 'Initial pages')
+
+    config.WIKI_REPOSITORY_URL = origin.url
+    config.WIKI_REPOSITORY_LOCAL_PATH = os.path.join(directory, 'mirror.git')
+    config.WIKI_REPOSITORY_BRANCH = origin.branch
+    config.WIKI_REPOSITORY_PATH = 'wiki'
+
+    repository.initialize_repository()
+    old_commit, old_index = repository.current_commit, repository.index
+
+    origin.commit({
+        f'wiki/Page_{index}/en.md': f'# Page {index}\n\nEdited.\n'
+        for index in range(CHANGED_PAGES)
+    })
+
+    def update():
+        repository.current_commit, repository.index = old_commit, old_index
+        return repository.update()
+
+    incremental = measure(update)
+    full = measure(lambda: repository.load_commit(repository.fetch_branch_commit()))
+    repository.repository.close()
+
+    return size * 2, full, incremental, full / incremental
+
+def main() -> None:
+    config.DEBUG = False
+    rows = []
+
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            rows.append(benchmark(size, directory))
+
+    report(
+        f'Wiki mirror update after {CHANGED_PAGES} changed pages (ms)',
+        ['files', 'full index', 'incremental', 'speedup'],
+        rows
+    )
+
+if __name__ == '__main__':
+    main()
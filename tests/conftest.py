@@ -0,0 +1,35 @@
+"""
+Fixtures that are shared between all tests.
+
+Tests that need the common package, the database, redis or storage are skipped if they're unavailable.
+"""
+
+import pytest
+
+@pytest.fixture
+def session():
+    pytest.importorskip('app.common.database')
+
+    from sqlalchemy import select
+    import app
+
+    with app.session.database.managed_session() as session:
+        try:
+            session.execute(select(1))
+        except Exception as e:
+            pytest.skip(f'Database is not available: {e}')
+
+        yield session
+
+@pytest.fixture
+def redis():
+    pytest.importorskip('app.common.database')
+
+    import app
+
+    try:
+        app.session.redis.ping()
+    except Exception as e:
+        pytest.skip(f'Redis is not available: {e}')
+
+    return app.session.redis
@@ -0,0 +1,48 @@
+"""
+Differential tests of the bbcode link transform against the baseline implementation.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.bbcode import render_html, url_hotfix
+from tests.bbcode import baseline, corpus
+
+GENERATED_DOCUMENTS = 5000
+
+# The baseline swaps links for this placeholder while escaping the text,
+# which means that a literal placeholder inside of a post is replaced as well.
+PLACEHOLDER = '{{ bbcode-link-'
+
+def documents():
+    yield from corpus.DOCUMENTS
+    yield from corpus.generate(GENERATED_DOCUMENTS)
+    yield corpus.linked_post(100)
+    yield corpus.large_post(100_000)
+
+def outcome(render, document):
+    # Some tag renderers raise on malformed input, which has to happen in both implementations
+    try:
+        return render(document)
+    except ValueError as e:
+        return type(e)
+
+def test_url_hotfix_matches_baseline():
+    for document in documents():
+        assert url_hotfix(document) == baseline.url_hotfix(document), document
+
+def test_render_html_matches_baseline():
+    for document in documents():
+        assert PLACEHOLDER not in document
+        assert (
+            outcome(render_html, document) ==
+            outcome(baseline.render_html, document)
+        ), document
+
+def test_literal_placeholder_is_rendered_as_text():
+    document = 'http://example.com {{ bbcode-link-0 }}'
+    link = render_html('http://example.com')
+
+    assert render_html(document) == link + ' {{ bbcode-link-0 }}'
+    assert baseline.render_html(document) == link + ' ' + link
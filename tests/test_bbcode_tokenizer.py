@@ -0,0 +1,37 @@
+"""
+Differential tests of the bbcode tokenizer against the baseline implementation.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.bbcode import formatter
+from tests.bbcode import baseline, corpus
+
+GENERATED_DOCUMENTS = 5000
+
+def documents():
+    yield from corpus.DOCUMENTS
+    yield from corpus.generate(GENERATED_DOCUMENTS)
+    yield corpus.unmatched_brackets(1000)
+    yield corpus.large_post(100_000)
+
+def test_tag_extents_match_baseline():
+    for document in documents():
+        data = document.replace('\r\n', '\n').replace('\r', '\n')
+        start = data.find('[')
+
+        while start >= 0:
+            assert (
+                formatter._tag_extent(data, start) ==
+                baseline.parser._tag_extent(data, start)
+            ), (document, start)
+            start = data.find('[', start + 1)
+
+def test_tokens_match_baseline():
+    for document in documents():
+        assert (
+            formatter.tokenize(document) ==
+            baseline.parser.tokenize(document)
+        ), document
@@ -0,0 +1,91 @@
+"""
+Differential tests of the bbcode parse tree against the baseline formatter.
+
+The tests over real posts read from the configured database and are skipped if it's unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.common.database import DBForumPost
+from app.bbcode import formatter, render_html, url_hotfix
+from app.bbcode.objects import Document
+from tests.bbcode import baseline, corpus
+
+import json
+
+GENERATED_DOCUMENTS = 5000
+SAMPLE_SIZE = 1000
+
+# Documents with a literal link placeholder are covered by test_bbcode_links
+PLACEHOLDER = '{{ bbcode-link-'
+
+def documents():
+    yield from corpus.DOCUMENTS
+    yield from corpus.generate(GENERATED_DOCUMENTS)
+    yield corpus.nested('quote', 100)
+    yield corpus.large_post(100_000)
+
+def outcome(render, document):
+    # Some tag renderers raise on malformed input, which has to happen in both implementations
+    try:
+        return render(document)
+    except ValueError as e:
+        return type(e)
+
+def round_trip(document):
+    tree = formatter.parse(url_hotfix(document))
+    data = json.loads(json.dumps(tree.serialize()))
+    return formatter.render(Document.deserialize(data))
+
+def test_strip_matches_baseline():
+    for document in documents():
+        assert formatter.strip(document) == baseline.parser.strip(document), document
+        assert formatter.strip(document, True) == baseline.parser.strip(document, True), document
+
+def test_serialized_tree_matches_baseline():
+    for document in documents():
+        expected = outcome(baseline.render_html, document)
+        assert outcome(render_html, document) == expected, document
+        assert outcome(round_trip, document) == expected, document
+
+def test_real_posts_match_baseline(session):
+    contents = session.query(DBForumPost.content) \
+        .order_by(DBForumPost.id.desc()) \
+        .limit(SAMPLE_SIZE) \
+        .scalars() \
+        .all()
+
+    if not contents:
+        pytest.skip('Database does not contain any forum posts')
+
+    for content in contents:
+        if PLACEHOLDER in content:
+            continue
+
+        expected = outcome(baseline.render_html, content)
+        assert outcome(render_html, content) == expected, content
+        assert outcome(round_trip, content) == expected, content
+
+def test_nesting_below_depth_cap_matches_baseline():
+    document = corpus.nested('b', formatter.max_tag_depth)
+    assert render_html(document) == baseline.render_html(document)
+
+def test_nesting_above_depth_cap_is_rendered_as_text():
+    depth = formatter.max_tag_depth + 72
+    document = corpus.nested('b', depth)
+    result = render_html(document)
+
+    assert formatter.max_tag_depth == 128
+    assert result.count('<b>') == 128
+    assert result.count('[b]') == 72
+    assert result.count('[/b]') == 72
+
+    # The old formatter applied its depth limit the same way, it was just never reached
+    capped = baseline.create_formatter(max_tag_depth=formatter.max_tag_depth)
+    assert result == capped.format(document)
+
+def test_deeply_nested_tree_round_trip():
+    document = corpus.nested('quote', 5000)
+    assert round_trip(document) == render_html(document)
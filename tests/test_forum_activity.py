@@ -0,0 +1,55 @@
+"""
+Checks the forum presence, which is stored in one sorted set per forum.
+
+These tests write to the configured redis under separate keys, and are skipped if it's unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.routes.forum import activity
+
+import time
+
+FORUM_ID = 1
+
+@pytest.fixture(autouse=True)
+def test_activity_key(monkeypatch, redis):
+    """Store the presence under a separate key, to keep the presence of the configured redis untouched"""
+    key = f'stern:tests:{activity.active_users_key(FORUM_ID)}'
+    monkeypatch.setattr(activity, 'active_users_key', lambda forum_id: key)
+    redis.delete(key)
+    yield key
+    redis.delete(key)
+
+def test_marked_users_are_active():
+    activity.mark_user_active(1, FORUM_ID)
+    activity.mark_user_active(2, FORUM_ID)
+
+    assert activity.is_user_active(1, FORUM_ID)
+    assert activity.is_user_active(2, FORUM_ID)
+    assert not activity.is_user_active(3, FORUM_ID)
+    assert sorted(activity.get_active_users(FORUM_ID)) == [1, 2]
+
+def test_marking_a_user_twice_keeps_one_entry(redis, test_activity_key):
+    activity.mark_user_active(1, FORUM_ID)
+    activity.mark_user_active(1, FORUM_ID)
+
+    assert redis.zcard(test_activity_key) == 1
+    assert activity.get_active_users(FORUM_ID) == [1]
+
+def test_inactive_users_are_trimmed(redis, test_activity_key):
+    last_seen = int(time.time() - activity.FORUM_ACTIVITY_EXPIRY - 1)
+    redis.zadd(test_activity_key, {1: last_seen})
+
+    assert not activity.is_user_active(1, FORUM_ID)
+    assert activity.get_active_users(FORUM_ID) == []
+
+    # Inactive users are removed, once someone else is active
+    activity.mark_user_active(2, FORUM_ID)
+    assert redis.zrange(test_activity_key, 0, -1) == [b'2']
+
+def test_presence_expires(redis, test_activity_key):
+    activity.mark_user_active(1, FORUM_ID)
+    assert 0 < redis.ttl(test_activity_key) <= activity.FORUM_ACTIVITY_EXPIRY
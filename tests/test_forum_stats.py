@@ -0,0 +1,54 @@
+"""
+Checks that the aggregated forum statistics match the per-forum
+repository functions, which the forum views used before.
+
+These tests read from the configured database and are skipped if it's unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.common.database import DBForum
+from app.common.database import forums, posts
+from app.forumstats import aggregate
+
+@pytest.fixture
+def all_forums(session):
+    results = session.query(DBForum).all()
+
+    if not results:
+        pytest.skip('Database does not contain any forums')
+
+    return results
+
+def test_topic_counts_match_repository(session, all_forums):
+    stats = aggregate(session)
+
+    for forum in all_forums:
+        forum_stats = stats.get(forum.id)
+        assert (
+            (forum_stats.topic_count if forum_stats else 0) ==
+            forums.fetch_topic_count(forum.id, session)
+        )
+
+def test_post_counts_match_repository(session, all_forums):
+    stats = aggregate(session)
+
+    for forum in all_forums:
+        forum_stats = stats.get(forum.id)
+        assert (
+            (forum_stats.post_count if forum_stats else 0) ==
+            forums.fetch_post_count(forum.id, session)
+        )
+
+def test_last_posts_match_repository(session, all_forums):
+    stats = aggregate(session)
+
+    for forum in all_forums:
+        forum_stats = stats.get(forum.id)
+        last_post = posts.fetch_last_by_forum(forum.id, session)
+        assert (
+            (forum_stats.last_post_id if forum_stats else None) ==
+            (last_post.id if last_post else None)
+        )
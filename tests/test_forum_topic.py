@@ -0,0 +1,108 @@
+"""
+Checks that the bulk loaded post metadata of topic pages matches the
+per-post repository functions, which the topic template used before.
+
+These tests read from the configured database and are skipped if it's unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.common.database import DBForumPost, DBModding
+from app.common.database import users, groups, modding
+from app.routes.forum.topic import load_post_metadata
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+SAMPLE_SIZE = 50
+
+@pytest.fixture
+def sample_posts(session):
+    # Posts with kudosu entries, and the most recent posts of the forum
+    modded_posts = session.query(DBForumPost) \
+        .filter(DBForumPost.id.in_(select(DBModding.post_id))) \
+        .order_by(DBForumPost.id.desc()) \
+        .limit(SAMPLE_SIZE) \
+        .all()
+
+    recent_posts = session.query(DBForumPost) \
+        .filter(DBForumPost.hidden == False) \
+        .order_by(DBForumPost.id.desc()) \
+        .limit(SAMPLE_SIZE) \
+        .all()
+
+    posts = list({post.id: post for post in modded_posts + recent_posts}.values())
+
+    if not posts:
+        pytest.skip('Database does not contain any forum posts')
+
+    return posts
+
+@contextmanager
+def count_queries(session: Session):
+    queries = []
+    engine = session.get_bind()
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def test_post_counts_match_repository(session, sample_posts):
+    metadata = load_post_metadata(sample_posts, None, session)
+
+    for post in sample_posts:
+        assert (
+            metadata['user_post_counts'].get(post.user_id, 0) ==
+            users.fetch_post_count(post.user_id, session=session)
+        )
+
+def test_user_groups_match_repository(session, sample_posts):
+    metadata = load_post_metadata(sample_posts, None, session)
+
+    for post in sample_posts:
+        assert (
+            [group.id for group in metadata['user_groups'].get(post.user_id, [])] ==
+            [group.id for group in groups.fetch_user_groups(post.user_id, session=session)]
+        )
+
+def test_kudosu_matches_repository(session, sample_posts):
+    # Kudosu is only loaded for beatmap topics
+    metadata = load_post_metadata(sample_posts, object(), session)
+
+    for post in sample_posts:
+        assert (
+            metadata['kudosu_totals'].get(post.id, 0) ==
+            modding.total_amount(post.id, session)
+        )
+
+        entry = modding.fetch_one_by_post(post.id, session=session)
+        bulk_entry = metadata['kudosu_entries'].get(post.id)
+
+        assert (
+            (entry.id if entry else None) ==
+            (bulk_entry.id if bulk_entry else None)
+        )
+
+def test_query_count_does_not_grow_with_posts(session, sample_posts):
+    query_counts = []
+
+    for posts in (sample_posts[:1], sample_posts):
+        # Authors would otherwise already be loaded into the session
+        session.expunge_all()
+
+        with count_queries(session) as queries:
+            load_post_metadata(posts, object(), session)
+
+        query_counts.append(len(queries))
+
+    # Authors, post counts, groups & kudosu
+    assert query_counts[0] == query_counts[1]
+    assert query_counts[1] <= 4
@@ -0,0 +1,61 @@
+"""
+Checks the format negotiation & the encoded avatar variants, using the sample avatars.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from tests.avatars import corpus
+from PIL import Image
+
+import app
+import io
+
+@pytest.mark.parametrize('accept, expected', [
+    (None, 'png'),
+    ('*/*', 'png'),
+    ('image/webp,*/*', 'webp'),
+    ('image/avif,image/webp,image/apng,*/*;q=0.8', 'avif'),
+    ('IMAGE/WEBP;q=0.9', 'webp')
+])
+def test_negotiate(accept, expected):
+    image_format = app.imaging.FORMATS[expected]
+
+    if not app.imaging.is_supported(image_format):
+        pytest.skip(f'Pillow was built without {expected} support')
+
+    assert app.imaging.negotiate(accept) is image_format
+
+def test_jpeg_is_only_a_fallback_for_opaque_images():
+    assert app.imaging.fallback_formats(corpus.transparent()) == [app.imaging.PNG]
+    assert app.imaging.fallback_formats(corpus.photo()) == [app.imaging.PNG, app.imaging.JPEG]
+
+def test_resampling_filters():
+    assert app.imaging.resampling_filter(256, 256) == Image.Resampling.BICUBIC
+    assert app.imaging.resampling_filter(256, 512) == Image.Resampling.BICUBIC
+    assert app.imaging.resampling_filter(256, 200) == Image.Resampling.BICUBIC
+    assert app.imaging.resampling_filter(256, 25) == Image.Resampling.LANCZOS
+
+def test_png_keeps_the_palette():
+    data = app.imaging.encode(corpus.pixel_art(), app.imaging.PNG)
+    assert Image.open(io.BytesIO(data)).mode == 'P'
+
+@pytest.mark.parametrize('name', corpus.AVATARS)
+def test_variants(name):
+    upload = corpus.uploads()[name]
+    variants = app.avatars.create_variants(upload)
+    transparent = app.imaging.has_transparency(Image.open(io.BytesIO(upload)))
+
+    assert set(variants) == set(app.avatars.SIZES)
+
+    for size, encoded in variants.items():
+        fields = [image_format.name for image_format in app.imaging.supported_formats()]
+        assert set(encoded) == {*fields, app.avatars.FALLBACK, app.avatars.FALLBACK_MIMETYPE}
+
+        for field in (*fields, app.avatars.FALLBACK):
+            image = Image.open(io.BytesIO(encoded[field]))
+            assert image.size == (size, size)
+
+        mimetype = encoded[app.avatars.FALLBACK_MIMETYPE].decode()
+        assert mimetype == 'image/png' or (mimetype == 'image/jpeg' and not transparent)
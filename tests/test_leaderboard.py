@@ -0,0 +1,33 @@
+"""
+Checks that redis leaderboard entries are mapped to users in leaderboard order.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+import utils
+
+def hydrate(monkeypatch, leaderboard: list, users_db: list) -> list:
+    monkeypatch.setattr(utils.users, 'fetch_many', lambda *args, **kwargs: users_db)
+    return [
+        (user.id, score)
+        for user, score in utils.hydrate_leaderboard(leaderboard, session=None)
+    ]
+
+def test_keeps_leaderboard_order(monkeypatch):
+    leaderboard = [(3, 30.0), (1, 20.0), (2, 10.0)]
+    users_db = [SimpleNamespace(id=user_id) for user_id in (1, 2, 3)]
+    assert hydrate(monkeypatch, leaderboard, users_db) == leaderboard
+
+def test_skips_missing_users(monkeypatch):
+    leaderboard = [(3, 30.0), (4, 25.0), (1, 20.0)]
+    users_db = [SimpleNamespace(id=user_id) for user_id in (1, 3)]
+    assert hydrate(monkeypatch, leaderboard, users_db) == [(3, 30.0), (1, 20.0)]
+
+def test_skips_empty_scores(monkeypatch):
+    leaderboard = [(1, 20.0), (2, 0.0)]
+    users_db = [SimpleNamespace(id=user_id) for user_id in (1, 2)]
+    assert hydrate(monkeypatch, leaderboard, users_db) == [(1, 20.0)]
@@ -0,0 +1,74 @@
+"""
+Checks that streamed replays are identical to the replays
+created by the serializer of the common package.
+
+These tests read from the configured database & storage and are skipped if they're unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.common.database import DBScore
+
+import app
+
+SAMPLE_SIZE = 20
+
+@pytest.fixture(autouse=True)
+def test_cache_keys(monkeypatch):
+    """Cache replay parts under separate keys, to keep the cache of the configured redis untouched"""
+    parts_key = app.replays.parts_key
+    keys = set()
+
+    def test_parts_key(score):
+        keys.add(key := f'stern:tests:{parts_key(score)}')
+        return key
+
+    monkeypatch.setattr(app.replays, 'parts_key', test_parts_key)
+    yield
+
+    if keys:
+        app.session.redis.delete(*keys)
+
+@pytest.fixture
+def sample_replays(session):
+    recent_scores = session.query(DBScore) \
+        .order_by(DBScore.id.desc()) \
+        .limit(SAMPLE_SIZE) \
+        .all()
+
+    replays = [
+        (score, replay)
+        for score in recent_scores
+        if (replay := app.session.storage.get_full_replay_from_score(score))
+    ]
+
+    if not replays:
+        pytest.skip('Storage does not contain any replays')
+
+    return replays
+
+def test_streamed_replay_matches_serializer(sample_replays):
+    for score, replay in sample_replays:
+        # The first request splits the replay, the second one streams the frames
+        for _ in range(2):
+            stream = app.replays.open_replay(score)
+            assert stream.length == len(replay)
+            assert b''.join(stream.iter_range()) == replay
+
+def test_streamed_ranges_match_serializer(sample_replays):
+    for score, replay in sample_replays:
+        # Cache the parts around the frames, so that the frames are streamed
+        app.replays.open_replay(score)
+        stream = app.replays.open_replay(score)
+        ranges = (
+            (0, 1),
+            (0, 100),
+            (len(replay) - 8, len(replay)),
+            (len(replay) // 3, len(replay) // 2),
+            (len(replay) - 1, len(replay))
+        )
+
+        for start, stop in ranges:
+            assert b''.join(stream.iter_range(start, stop)) == replay[start:stop]
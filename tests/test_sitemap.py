@@ -0,0 +1,86 @@
+"""
+Checks that the sitemap validators only depend on the content, so that they are the same in every worker.
+
+These tests write to the configured redis under separate keys, and are skipped if it's unavailable.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.routes.public import sitemap
+from flask import Flask
+
+@pytest.fixture(autouse=True)
+def test_last_modified_keys(monkeypatch, redis):
+    """Store the modification times under separate keys, to keep the ones of the configured redis untouched"""
+    last_modified_key = sitemap.last_modified_key
+    keys = set()
+
+    def test_key(location, etag):
+        keys.add(key := f'stern:tests:{last_modified_key(location, etag)}')
+        return key
+
+    monkeypatch.setattr(sitemap, 'last_modified_key', test_key)
+    yield
+
+    if keys:
+        redis.delete(*keys)
+
+@pytest.fixture
+def client():
+    flask = Flask(__name__)
+    flask.register_blueprint(sitemap.router)
+    return flask.test_client()
+
+def create_worker(entries):
+    return sitemap.Sitemap('/sitemap/tests.xml', lambda: list(entries))
+
+def test_workers_share_validators():
+    entries = [sitemap.SitemapEntry('/', 1.0), sitemap.SitemapEntry('/forum/', 0.9)]
+    first, second = create_worker(entries), create_worker(entries)
+
+    first.refresh()
+    second.refresh()
+
+    assert first.etag == second.etag
+    assert first.last_modified == second.last_modified
+    assert first.render() == second.render()
+
+def test_changed_content_changes_validators():
+    worker = create_worker([sitemap.SitemapEntry('/', 1.0)])
+    worker.refresh()
+    etag, last_modified = worker.etag, worker.last_modified
+
+    worker.generator = lambda: [sitemap.SitemapEntry('/download/', 0.9)]
+    worker.refreshed_at = None
+    worker.refresh()
+
+    assert worker.etag != etag
+    assert worker.last_modified >= last_modified
+
+def test_refresh_is_throttled():
+    calls = []
+    worker = sitemap.Sitemap('/sitemap/tests.xml', lambda: calls.append(1) or [sitemap.SitemapEntry('/', 1.0)])
+
+    worker.render()
+    worker.render()
+
+    assert len(calls) == 1
+
+def test_conditional_requests(client):
+    response = client.get('/sitemap/main.xml')
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert etag == f'"{sitemap.main_sitemap.etag}"'
+
+    response = client.get('/sitemap/main.xml', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    response = client.get('/sitemap.xml')
+    assert response.status_code == 200
+
+    response = client.get('/sitemap.xml', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
@@ -0,0 +1,84 @@
+"""
+Checks the local wiki mirror against a bare repository, which stands in for the wiki repository on github.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.wiki import repository
+from tests.wiki.standin import StandInRepository, generate_pages
+
+import config
+import os
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    origin = StandInRepository(str(tmp_path))
+    origin.commit(generate_pages(10), 'Initial pages')
+
+    monkeypatch.setattr(config, 'DEBUG', False)
+    monkeypatch.setattr(config, 'WIKI_REPOSITORY_URL', origin.url)
+    monkeypatch.setattr(config, 'WIKI_REPOSITORY_LOCAL_PATH', os.path.join(tmp_path, 'mirror.git'))
+    monkeypatch.setattr(config, 'WIKI_REPOSITORY_BRANCH', origin.branch)
+    monkeypatch.setattr(config, 'WIKI_REPOSITORY_PATH', 'wiki')
+
+    for name in ('repository', 'current_commit', 'update_thread'):
+        monkeypatch.setattr(repository, name, None)
+
+    monkeypatch.setattr(repository, 'index', {})
+    monkeypatch.setattr(repository, 'last_update', 0)
+
+    repository.initialize_repository()
+    yield origin
+
+    if repository.repository is not None:
+        repository.repository.close()
+
+def test_clone_indexes_all_pages(origin):
+    assert repository.is_available()
+    assert repository.current_commit.hexsha == origin.head
+    assert set(repository.index) == {
+        path.removeprefix('wiki/')
+        for path in generate_pages(10)
+    }
+    assert repository.fetch_markdown('Page 3', 'de') == '# Page 3\n\nde content of page 3.\n'
+    assert repository.fetch_markdown('Page 3', 'fr') is None
+
+def test_update_only_returns_changed_files(origin):
+    synced_commit = origin.head
+    origin.commit({
+        'wiki/Page_1/en.md': '# Page 1\n\nEdited.\n',
+        'wiki/Page_2/de.md': None,
+        'wiki/New_Page/en.md': '# New page\n',
+        'README.md': 'Outside of the wiki directory'
+    })
+
+    changed = repository.update()
+
+    assert changed == {'Page_1/en.md', 'Page_2/de.md', 'New_Page/en.md'}
+    assert repository.changed_files(synced_commit) == changed
+    assert repository.current_commit.hexsha == origin.head
+    assert repository.read_file('Page_1/en.md') == '# Page 1\n\nEdited.\n'
+    assert repository.read_file('New_Page/en.md') == '# New page\n'
+    assert repository.read_file('Page_2/de.md') is None
+    assert repository.read_file('Page_2/en.md') is not None
+
+def test_update_without_changes(origin):
+    commit = repository.current_commit
+    assert repository.update() == set()
+    assert repository.current_commit == commit
+
+def test_incremental_index_matches_full_index(origin):
+    origin.commit({'wiki/Page_4/en.md': None, 'wiki/Page_5/en.md': '# Moved\n'})
+    origin.commit({'wiki/Page_4/en.md': '# Restored\n', 'wiki/Page_6/de.md': None})
+    repository.update()
+
+    incremental = {path: blob.hexsha for path, blob in repository.index.items()}
+    repository.load_commit(repository.current_commit)
+    full = {path: blob.hexsha for path, blob in repository.index.items()}
+
+    assert incremental == full
+
+def test_unknown_commit_has_no_changed_files(origin):
+    assert repository.changed_files('0' * 40) is None
@@ -0,0 +1,92 @@
+"""
+Checks the ranking, language fallback & incremental rebuilds of the wiki search index.
+"""
+
+import pytest
+
+pytest.importorskip('app.common.database')
+
+from app.wiki import search
+from tests.wiki import corpus
+
+import os
+
+PAGES = [
+    (1, 'en', 'Ranking_Criteria', 'Ranking Criteria', '# Ranking Criteria\n\nRules for **beatmaps** to be ranked.'),
+    (2, 'en', 'Beatmap', 'Beatmap', '# Beatmap\n\nA beatmap is a level. See [[Ranking Criteria]].'),
+    (3, 'en', 'Skinning', 'Skinning', '# Skinning\n\nCustom elements, e.g. hitcircles & <b>sliders</b>.'),
+    (3, 'de', 'Skinning', 'Skins', '# Skins\n\nEigene Elemente, z.B. hitcircles.'),
+    (4, 'en', 'Hitcircle', 'Hitcircle', '# Hitcircle\n\nThe most common object in beatmaps.')
+]
+
+def build(directory, pages) -> search.SearchIndex:
+    return build_from_documents(directory, [search.index_document(*page) for page in pages])
+
+def build_from_documents(directory, documents) -> search.SearchIndex:
+    file_path = os.path.join(directory, 'wiki-search.idx')
+    search.write(file_path, documents)
+    return search.SearchIndex(file_path)
+
+@pytest.fixture
+def index(tmp_path):
+    return build(tmp_path, PAGES)
+
+def test_title_matches_rank_first(index):
+    results = index.search('beatmap', 'en', 10)
+    assert [result.page_id for result in results][:1] == [2]
+
+def test_all_words_rank_above_single_words(index):
+    results = index.search('ranking beatmap', 'en', 10)
+    assert results[0].page_id in (1, 2)
+    assert {1, 2} <= {result.page_id for result in results}
+
+def test_last_word_matches_as_prefix(index):
+    assert 4 in [result.page_id for result in index.search('hitci', 'en', 10)]
+    assert index.search('hitci beat', 'en', 10)
+
+def test_missing_translations_fall_back_to_default_language(index):
+    results = {result.page_id: result for result in index.search('hitcircle', 'de', 10)}
+
+    # Skinning has a german translation, the hitcircle page doesn't
+    assert results[3].language == 'de'
+    assert results[4].language == 'en'
+
+def test_unknown_language_and_empty_queries(index):
+    assert index.search('beatmap', 'xx', 10) == []
+    assert index.search('  ', 'en', 10) == []
+    assert index.search('nonexistent', 'en', 10) == []
+
+def test_snippets_highlight_and_escape(index):
+    result = index.search('sliders', 'en', 1)[0]
+    assert '<b>sliders</b>' in result.snippet
+    assert '&amp;' in result.snippet
+    assert result.snippet.count('<b>') == 1
+
+def test_forward_index_matches_tokenized_documents(tmp_path):
+    pages = list(corpus.generate(50))
+    index = build(tmp_path, pages)
+    forward = index.forward()
+
+    for page in pages:
+        document = search.index_document(*page)
+        assert forward[(document.page_id, document.language)] == document
+
+def test_incremental_rebuild_matches_full_rebuild(tmp_path):
+    pages = list(corpus.generate(50))
+    index = build(tmp_path / 'previous', pages)
+
+    # Reuse the unchanged documents, like update() does after a sync
+    changed = {(1, 'en'): (1, 'en', 'Changed', 'Changed', '# Changed\n\nNew content.')}
+    documents = index.forward()
+    documents.update({key: search.index_document(*page) for key, page in changed.items()})
+    incremental = build_from_documents(tmp_path / 'incremental', list(documents.values()))
+
+    full_pages = [changed.get((page[0], page[1]), page) for page in pages]
+    full = build(tmp_path / 'full', full_pages)
+
+    for query in ('changed', 'beatmap', 'ranking criteria', 'mod'):
+        for language in corpus.LANGUAGES:
+            assert (
+                incremental.search(query, language, 20) ==
+                full.search(query, language, 20)
+            )
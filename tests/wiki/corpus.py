@@ -0,0 +1,62 @@
+"""
+Wiki pages for the search tests & benchmarks.
+Pages are generated from a fixed seed, which keeps every run reproducible.
+"""
+
+from typing import Iterator, List, Tuple
+
+import random
+import string
+
+LANGUAGES = ('en', 'ru', 'de', 'pl')
+
+# Common words of the wiki, the rest of the vocabulary is made up
+WORDS = [
+    'beatmap', 'ranking', 'criteria', 'difficulty', 'hitcircle', 'slider', 'spinner',
+    'mapping', 'timing', 'offset', 'skin', 'storyboard', 'mod', 'hidden', 'hardrock',
+    'performance', 'points', 'accuracy', 'combo', 'replay', 'multiplayer', 'tournament',
+    'modding', 'nomination', 'qualified', 'loved', 'graveyard', 'osu', 'taiko', 'catch',
+    'mania', 'editor', 'snapping', 'kiai', 'hitsound', 'background', 'video', 'guideline'
+]
+
+def vocabulary(generator: random.Random, size: int) -> List[str]:
+    words = list(WORDS)
+
+    while len(words) < size:
+        length = generator.randint(3, 10)
+        words.append(''.join(generator.choices(string.ascii_lowercase, k=length)))
+
+    return words
+
+def generate(pages: int, seed: int = 0, translated: float = 0.67) -> Iterator[Tuple[int, str, str, str, str]]:
+    """Generate (page_id, language, path, title, markdown) entries, with a zipf-like word distribution"""
+    generator = random.Random(seed)
+    words = vocabulary(generator, 5000)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    def sentence(length: int) -> str:
+        return ' '.join(generator.choices(words, weights, k=length)).capitalize() + '.'
+
+    for page_id in range(1, pages + 1):
+        title = ' '.join(generator.choices(words, weights, k=generator.randint(1, 4))).title()
+        path = title.replace(' ', '_')
+
+        for language in LANGUAGES:
+            if language != 'en' and generator.random() > translated:
+                continue
+
+            sections = []
+
+            for _ in range(generator.randint(2, 6)):
+                paragraph = ' '.join(sentence(generator.randint(5, 20)) for _ in range(generator.randint(2, 8)))
+                link = generator.choice(words).title()
+                sections.append(
+                    f'## {sentence(3)}\n\n'
+                    f'{paragraph} See [[{link}]] and [the guide](/wiki/{link}).\n\n'
+                    f'![image](/wiki/img/{link}.png)\n'
+                )
+
+            if generator.random() < 0.2:
+                sections.append(f'```\n{sentence(10)}\n```\n')
+
+            yield page_id, language, path, title, f'# {title}\n\n' + '\n'.join(sections)
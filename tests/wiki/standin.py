@@ -0,0 +1,57 @@
+"""
+Local bare repositories, which stand in for the wiki repository on github.
+"""
+
+from typing import Dict
+
+from git import Actor, Repo
+
+import os
+
+AUTHOR = Actor('Wiki Tests', 'wiki@localhost')
+
+class StandInRepository:
+    """A bare repository at `url`, with a working copy that pushes commits to it"""
+
+    def __init__(self, directory: str, branch: str = 'main') -> None:
+        self.url = os.path.join(directory, 'origin.git')
+        self.branch = branch
+
+        Repo.init(self.url, bare=True, initial_branch=branch)
+        self.working_copy = Repo.init(os.path.join(directory, 'working'), initial_branch=branch)
+        self.working_copy.create_remote('origin', self.url)
+
+    @property
+    def head(self) -> str:
+        return self.working_copy.head.commit.hexsha
+
+    def commit(self, files: Dict[str, str | None], message: str = 'Update wiki') -> str:
+        """Write the given files, removing the ones without content, and push the result"""
+        root = self.working_copy.working_tree_dir
+        removed = [path for path, content in files.items() if content is None]
+        written = [path for path, content in files.items() if content is not None]
+
+        for path in written:
+            location = os.path.join(root, path)
+            os.makedirs(os.path.dirname(location), exist_ok=True)
+
+            with open(location, 'w', encoding='utf-8') as f:
+                f.write(files[path])
+
+        if removed:
+            self.working_copy.index.remove(removed, working_tree=True)
+
+        if written:
+            self.working_copy.index.add(written)
+
+        self.working_copy.index.commit(message, author=AUTHOR, committer=AUTHOR)
+        self.working_copy.remotes.origin.push(f'{self.branch}:{self.branch}')
+        return self.head
+
+def generate_pages(count: int, prefix: str = 'wiki') -> Dict[str, str]:
+    """Generate pages in english & german, the way they are laid out in the wiki repository"""
+    return {
+        f'{prefix}/Page_{index}/{language}.md': f'# Page {index}\n\n{language} content of page {index}.\n'
+        for index in range(count)
+        for language in ('en', 'de')
+    }
@@ -8,26 +8,19 @@ from flask_wtf.csrf import generate_csrf
 from flask_login import current_user
 from jinja2 import TemplateNotFound
 from sqlalchemy.orm import Session
+from typing import List, Tuple
 from PIL import Image
 
 from app.common.helpers import caching, browsers, permissions
-from app.common.database.repositories import wrapper, users
+from app.common.database.repositories import users
 from app.common.database import DBUser, DBBeatmapset
 from app.common.helpers.external import location
-from app.common.cache import leaderboards
 from app.common import constants
 
-from app.common.database import (
-    notifications,
-    repositories,
-    histories,
-    topics,
-    stats
-)
+from app.common.database import repositories
 
 import unicodedata
 import config
-import time
 import app
 import io
 import re
@@ -46,24 +39,21 @@ def render_template(template_name: str, **context) -> str:
         location=location,
         config=config
     )
-    context.update(fetch_website_stats())
+    context.update(app.context.fetch_website_stats())
 
     if not current_user.is_anonymous:
         context.update({
-            'notification_count': notifications.fetch_count(
+            'notification_count': app.context.fetch_notification_count(
                 current_user.id,
-                read=False,
                 session=context.get('session')
             )
         })
 
-        users.update(
-            current_user.id,
-            {'latest_activity': datetime.now()},
-            session=context.get('session')
-        )
+        # Queue latest_activity update
+        app.presence.touch(current_user.id)
 
-        # Update CSRF token in Redis
+        # Update CSRF token in Redis, which has to be available
+        # before the page can make its first api request
         update_csrf_token(current_user.id)
 
     return _render_template(
@@ -71,6 +61,20 @@ def render_template(template_name: str, **context) -> str:
         **context
     )
 
+def render_fragment(template_name: str, **context) -> str:
+    """Render a template without any user-specific context, e.g. for caching"""
+    context.update(
+        repositories=repositories,
+        timedelta=timedelta,
+        constants=constants,
+        datetime=datetime,
+        config=config
+    )
+    return _render_template(
+        template_name,
+        **context
+    )
+
 def render_error(
     code: int,
     type: str | None = None,
@@ -149,44 +153,25 @@ def update_csrf_token(user_id: int) -> None:
             exc_info=e
         )
 
-def on_sync_ranks_fail(e: Exception) -> None:
-    app.session.logger.error(
-        f'Failed to update user rank: {e}',
-        exc_info=e
-    )
-
-@wrapper.exception_wrapper(on_sync_ranks_fail)
-@wrapper.session_wrapper
-def sync_ranks(user: DBUser, mode: int, session: Session = ...) -> None:
-    """Sync cached rank with database"""
-    user.stats.sort(key=lambda s:s.mode)
-    user_stats = user.stats[mode]
-
-    if user_stats.playcount <= 0:
-        return
-
-    global_rank = leaderboards.global_rank(
-        user.id,
-        user_stats.mode
+def hydrate_leaderboard(
+    leaderboard: List[Tuple[int, float]],
+    *options,
+    session: Session
+) -> List[Tuple[DBUser, float]]:
+    """Map redis leaderboard entries to user objects, keeping the leaderboard order"""
+    users_db = users.fetch_many(
+        [user_id for user_id, _ in leaderboard],
+        *options,
+        session=session
     )
+    users_by_id = {user.id: user for user in users_db}
 
-    if user_stats.rank != global_rank:
-        # Database rank desynced from redis
-        stats.update(
-            user.id,
-            user_stats.mode,
-            {'rank': global_rank},
-            session=session
-        )
-        user_stats.rank = global_rank
-
-        if not config.FROZEN_RANK_UPDATES:
-            # Update rank history
-            histories.update_rank(
-                user_stats,
-                user.country,
-                session=session
-            )
+    # Users that were removed from the database are skipped
+    return [
+        (users_by_id[user_id], score)
+        for user_id, score in leaderboard
+        if score > 0 and user_id in users_by_id
+    ]
 
 def required_nominations(beatmapset: DBBeatmapset) -> bool:
     beatmap_modes = len(
@@ -207,10 +192,8 @@ def resize_image(
     target_size: int | None = None,
 ) -> bytes:
     img = Image.open(io.BytesIO(image))
-    img = img.resize((target_size, target_size))
-    image_buffer = io.BytesIO()
-    img.save(image_buffer, format='PNG')
-    return image_buffer.getvalue()
+    img = app.imaging.resize(img, target_size)
+    return app.imaging.encode(img, app.imaging.PNG)
 
 def resize_and_crop_image(
     image: bytes,
@@ -243,4 +226,4 @@ def secure_filename(filename: str) -> str:
 
 @caching.ttl_cache(ttl=60*5)
 def fetch_average_topic_views() -> int:
-    return int(topics.fetch_average_views())
+    return app.topicviews.fetch_average_views()